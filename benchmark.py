@@ -0,0 +1,185 @@
+import argparse
+import contextlib
+import io
+import json
+import platform
+import shutil
+import subprocess
+import tempfile
+import timeit
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List
+
+from constants import *
+from contract import (Info, Info2, Bids, Bids2, Subcontractors, Subcontractors2, Items, Items2, Contract, ContractRecord,
+                      read_file, map_file, split_contract, split_contract_positions, iter_split_contract)
+from experiment import Experiment
+
+
+TEST_DATA = Path('testing/data')
+BENCHMARKS_PATH = Path('benchmarks')
+BASELINE_PATH = BENCHMARKS_PATH / 'baseline.json'
+
+# portion class, fixture name, contract type: the inputs are testing/data/test_<name>_type<type>_input.txt
+MICRO_CASES = [
+    (Info, 'info', 1), (Info2, 'info', 2),
+    (Bids, 'bids', 1), (Bids2, 'bids', 2),
+    (Subcontractors, 'subcontractors', 1), (Subcontractors2, 'subcontractors', 2),
+    (Items, 'items', 1), (Items2, 'items', 2),
+]
+SPLIT_INPUT = TEST_DATA / 'doc_3073.txt'
+
+
+def _time(func, repeat: int, number: int) -> Dict[str, float]:
+    # best of repeat is the least noisy estimate, mean is kept to see the spread
+    times = [x / number for x in timeit.repeat(func, repeat=repeat, number=number)]
+    return {'best': min(times), 'mean': sum(times) / len(times), 'repeat': repeat, 'number': number}
+
+
+def micro_benchmarks(repeat: int = 5, number: int = 20) -> Dict[str, dict]:
+    """
+    Times each portion's _parse on its testing/data input (narrowed with NARROW_REGEX first, not timed), Items.parse_batch on the same input
+    and split_contract / iter_split_contract on doc_3073.txt.
+    Returns a dict: benchmark name: timings in seconds per call, with the input size and MB/s.
+    """
+    results = {}
+    for portion_class, name, contract_type in MICRO_CASES:
+        raw = read_file(TEST_DATA / f'test_{name}_type{contract_type}_input.txt')
+        # some fixtures are already narrowed down sections, NARROW_REGEX does not match them
+        texts = (portion_class(raw, 'benchmark').preprocess(portion_class.NARROW_REGEX) if portion_class.NARROW_REGEX else []) or [raw]
+
+        def parse():
+            for text in texts:
+                portion_class._parse(text, 'benchmark')
+
+        results[f'{portion_class.__name__}._parse'] = _time(parse, repeat, number) | {'bytes': len(raw)}
+        if portion_class is Items:
+            # what Items.extract runs, all the sections in one scan
+            sections = [('benchmark', text) for text in texts]
+            results['Items.parse_batch'] = _time(lambda: Items.parse_batch(sections), repeat, number) | {'bytes': len(raw)}
+
+    file_contents = read_file(SPLIT_INPUT)
+    results['split_contract'] = _time(lambda: split_contract(file_contents, '3073'), repeat, number) | {'bytes': len(file_contents)}
+    results['iter_split_contract'] = _time(lambda: list(iter_split_contract(SPLIT_INPUT, '3073')), repeat, number) | {'bytes': len(file_contents)}
+
+    for result in results.values():
+        result['mb_per_s'] = result['bytes'] / result['best'] / 1e6
+    return results
+
+
+def default_corpus() -> List[ContractRecord]:
+    """
+    The contracts of testing/data/doc_3073.txt, read in place through the contract index records (see sort_contracts(virtual=True)).
+    """
+    positions = split_contract_positions(map_file(SPLIT_INPUT), '3073')
+    return [ContractRecord('t1_' + key, 1, str(SPLIT_INPUT), start, end, True) for key, (start, end) in positions.items()]
+
+
+def macro_benchmarks(filepaths: List[Path] | List[ContractRecord] | None = None, repeat: int = 3, workers: int = 1, mapped: bool = False) -> Dict[str, dict]:
+    """
+    Times Contract.extract over all the contracts in filepaths (default_corpus if None) and a whole Experiment.run
+    (results are written to a temporary folder). Returns a dict: benchmark name: timings in seconds per pass over the corpus, with contracts/s.
+    """
+    filepaths = filepaths if filepaths is not None else default_corpus()
+
+    def extract():
+        for filepath in filepaths:
+            record = filepath if isinstance(filepath, ContractRecord) else None
+            Contract(filepath.stem, mapped=mapped, record=record).extract()
+
+    def run():
+        with tempfile.TemporaryDirectory() as tmp, contextlib.redirect_stdout(io.StringIO()):
+            experiment = Experiment(filepaths, workers=workers, mapped=mapped)
+            shutil.rmtree(experiment.results_path)
+            experiment.results_path = Path(tmp)
+            experiment.outliers_path = experiment.results_path / 'outliers'
+            experiment.run()
+
+    results = {
+        'Contract.extract': _time(extract, repeat, 1),
+        'Experiment.run': _time(run, repeat, 1) | {'workers': workers},
+    }
+    for result in results.values():
+        result['contracts'] = len(filepaths)
+        result['contracts_per_s'] = len(filepaths) / result['best']
+    return results
+
+
+def _git_commit() -> str | None:
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_benchmarks(macro: bool = True, **kwargs) -> dict:
+    results = {
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'commit': _git_commit(),
+        'python': platform.python_version(),
+        'machine': platform.platform(),
+        'benchmarks': micro_benchmarks(),
+    }
+    if macro:
+        results['benchmarks'] |= macro_benchmarks(**kwargs)
+    return results
+
+
+def save_results(results: dict, path: Path):
+    path = Path(path)
+    path.parent.mkdir(exist_ok=True, parents=True)
+    with open(path, 'w') as file:
+        json.dump(results, file, indent=2)
+
+
+def load_results(path: Path) -> dict:
+    with open(path) as file:
+        return json.load(file)
+
+
+def compare_results(results: dict, baseline: dict, tolerance: float = 0.2) -> List[str]:
+    """
+    Compares the best times of results against baseline (both from run_benchmarks), prints a table
+    and returns the names of the benchmarks that got slower by more than tolerance (0.2 = 20 %).
+    Benchmarks that are only in one of the two are skipped.
+    """
+    regressions = []
+    print(f"{'benchmark':<28}{'baseline (ms)':>15}{'now (ms)':>12}{'change':>10}")
+    for name, result in results['benchmarks'].items():
+        if name not in baseline['benchmarks']:
+            continue
+        before, now = baseline['benchmarks'][name]['best'], result['best']
+        change = now / before - 1
+        flag = ''
+        if change > tolerance:
+            regressions.append(name)
+            flag = '  <- slower'
+        print(f"{name:<28}{before * 1e3:>15.3f}{now * 1e3:>12.3f}{change:>+10.1%}{flag}")
+    return regressions
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmarks the parsers (micro) and Contract.extract / Experiment.run (macro).')
+    parser.add_argument('--micro-only', action='store_true', help='skip the macro benchmarks')
+    parser.add_argument('--workers', type=int, default=1, help='workers for Experiment.run')
+    parser.add_argument('--baseline', type=Path, default=BASELINE_PATH, help='baseline JSON to compare against')
+    parser.add_argument('--save-baseline', action='store_true', help='store these results as the new baseline')
+    parser.add_argument('--tolerance', type=float, default=0.2, help="slowdown that counts as a regression (0.2 = 20%%)")
+    args = parser.parse_args()
+
+    kwargs = {} if args.micro_only else {'workers': args.workers}
+    results = run_benchmarks(macro=not args.micro_only, **kwargs)
+    path = BENCHMARKS_PATH / f"{results['timestamp'].replace(':', '-')}.json"
+    save_results(results, path)
+    print(f'Saved benchmark results to {path}.')
+
+    if args.save_baseline:
+        save_results(results, args.baseline)
+        print(f'Saved baseline to {args.baseline}.')
+    elif args.baseline.exists():
+        regressions = compare_results(results, load_results(args.baseline), args.tolerance)
+        if regressions:
+            raise SystemExit(f'Slower than the baseline: {", ".join(regressions)}')
+    else:
+        print(f'No baseline at {args.baseline}, store one with --save-baseline.')
@@ -0,0 +1,76 @@
+import hashlib
+import inspect
+import os
+import pickle
+from pathlib import Path
+
+import contract
+from constants import *
+from rows import Row
+
+
+# code shared by all the portions, a change here changes every fingerprint
+SHARED_PARSING_CODE = (
+    contract.ContractPortionBase,
+    contract.SectionIndex,
+    contract.FixedWidthLayout,
+    contract.LineIndex,
+    contract.search_keyword,
+    contract.search_number_before,
+    contract.has_more_digits_than_non_digits,
+    Row,
+)
+
+
+def parser_fingerprint(portion_class: type) -> str:
+    """
+    Version fingerprint of a portion class (Info, Bids, Items2, ...), i.e. hash of its source code and the shared parsing code.
+    Any edit to the parser gives a new fingerprint, so results cached with the old parser are not used anymore.
+    """
+    source = ''.join(inspect.getsource(x) for x in (portion_class,) + SHARED_PARSING_CODE)
+    return hashlib.sha1(source.encode()).hexdigest()[:12]
+
+
+class ResultCache:
+    """
+    Persistent per-contract, per-portion cache of extracted rows, stored as pickle files in:
+
+        <path>/<portion class name>/<parser fingerprint>/<content hash>.pkl
+
+    The key is the content hash of the contract file (see Contract.content_hash) and the fingerprint of the parser class that produced the rows,
+    so re-running an Experiment only parses contracts or portions whose input or parser changed.
+    Files are written atomically so several worker processes can share the same cache folder.
+    """
+
+    def __init__(self, path: Path = CACHE_PATH):
+        self.path = Path(path)
+        self.hits = 0
+        self.misses = 0
+        self._fingerprints = {}
+
+    def _entry_path(self, content_hash: str, portion) -> Path:
+        portion_class = type(portion)
+        if portion_class not in self._fingerprints:
+            self._fingerprints[portion_class] = parser_fingerprint(portion_class)
+        return self.path / portion_class.__name__ / self._fingerprints[portion_class] / f'{content_hash}.pkl'
+
+    def get(self, content_hash: str, portion) -> list | None:
+        """
+        Returns cached rows or None if the portion has not been extracted with this parser version yet.
+        """
+        try:
+            with open(self._entry_path(content_hash, portion), 'rb') as file:
+                rows = pickle.load(file)
+        except (FileNotFoundError, EOFError, pickle.UnpicklingError):
+            self.misses += 1
+            return None
+        self.hits += 1
+        return rows
+
+    def put(self, content_hash: str, portion, rows: list):
+        path = self._entry_path(content_hash, portion)
+        path.parent.mkdir(exist_ok=True, parents=True)
+        tmp_path = path.with_suffix(f'.{os.getpid()}.tmp')
+        with open(tmp_path, 'wb') as file:
+            pickle.dump(rows, file, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)
@@ -58,12 +58,23 @@ SUBCONTRACTOR_LICENSE_NUMBER_PRE = "Subcontractor_License_Number_Pre"
 SUBCONTRACTOR_LICENSE_NUMBER_POST = "Subcontractor_License_Number_Post"
 WRONG_INDENTATION = "Wrong_Indentation"
 
+SOURCE_PATH = "Source_Path"
+BYTE_START = "Byte_Start"
+BYTE_END = "Byte_End"
+SPLIT = "Split"
+CLASSIFICATION = "Classification"
+BYTES_READ = "Bytes_Read"
+FILE_SIZE = "File_Size"
+
 ERROR_FILENAME = "Error_Filename"
 ERROR = "Error"
 
 RAW_DATA_PATH = Path('raw_data')
 SORTED_DATA_PATH = Path('sorted_data')
 RESULTS_PATH = Path('results')
+CACHE_PATH = Path('cache')
+STORE_PATH = RESULTS_PATH / 'results.sqlite'
+CONTRACT_INDEX_PATH = SORTED_DATA_PATH / 'contract_index.csv'
 
 RAW_DATA_PATH_LINEPRINTER = RAW_DATA_PATH / 'lineprinter'
 RAW_DATA_PATH_TABLE = RAW_DATA_PATH / 'table'
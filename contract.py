@@ -1,16 +1,60 @@
-from typing import List
+from typing import List, NamedTuple, Tuple
+from functools import cached_property
+from itertools import accumulate
+import operator
 from collections import defaultdict
+import hashlib
+import mmap
 import re
 import pandas as pd
 import re
 import shutil
+from pathlib import Path
 from constants import *
+from profiling import NULL_TIMER
+from rows import row_class, rows_to_frame
 
 
 def read_file(filepath: str):
     # must use the ISO-8859-1 encoding to avoid errors
     with open(filepath, 'r', encoding='ISO-8859-1') as file:
         return file.read()
+
+
+def map_file(filepath: str) -> mmap.mmap | bytes:
+    """
+    Alternative to read_file, memory-maps the file instead of reading it into a str. 
+    ISO-8859-1 maps one byte to one character, so bytes regexes (see bytes_regex) can be used to find the sections, 
+    and only the sections that are actually parsed need to be decoded (see decode). 
+    Note that offsets are in bytes of the raw file, i.e. before \r\n is converted to \n.
+    """
+    with open(filepath, 'rb') as file:
+        try:
+            return mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            # empty files can not be mapped
+            return b''
+
+
+def normalize_newlines(contents: bytes) -> bytes:
+    # same as universal newlines in text mode, i.e. what read_file does
+    return contents.replace(b'\r\n', b'\n').replace(b'\r', b'\n')
+
+
+def decode(contents: bytes) -> str:
+    """
+    Decodes (part of) a file from map_file into the same text read_file would return for it.
+    """
+    return normalize_newlines(contents).decode('ISO-8859-1')
+
+
+def bytes_regex(regex: str, flags=0) -> re.Pattern:
+    r"""
+    Compiles a str regex for bytes input read with map_file. In bytes patterns `\s` matches ASCII whitespace only, 
+    so it is widened to the extra ISO-8859-1 characters (\x1c-\x1f, \x85, \xa0) that `\s` matches in str, to keep the results the same.
+    Only `\s` outside of character classes is supported.
+    """
+    return re.compile(regex.replace(r'\s', r'[\s\x1c-\x1f\x85\xa0]').encode('ISO-8859-1'), flags)
     
     
 def has_more_digits_than_non_digits(s):
@@ -19,49 +63,377 @@ def has_more_digits_than_non_digits(s):
     return digit_count > non_digit_count
 
 
+def search_keyword(text: str, keyword: str, pattern: re.Pattern):
+    """
+    Same as pattern.search(text) for a pattern that starts with the literal keyword: the pattern is only tried where str.find
+    finds the keyword, instead of at every position of the text. Returns the first match or None.
+    """
+    position = text.find(keyword)
+    while position != -1:
+        match = pattern.match(text, position)
+        if match:
+            return match
+        position = text.find(keyword, position + 1)
+    return None
+
+
+def search_number_before(text: str, keyword: str) -> str:
+    r"""
+    Same as re.search(r"(\d+)\s+" + keyword, text).group(1), "" if there is no match: the digits and whitespace are read backwards
+    from each occurrence of keyword.
+    """
+    position = text.find(keyword)
+    while position != -1:
+        end = position
+        while end > 0 and text[end - 1].isspace():
+            end -= 1
+        start = end
+        while start > 0 and text[start - 1].isdecimal():
+            start -= 1
+        if start < end < position:
+            return text[start:end]
+        position = text.find(keyword, position + 1)
+    return ""
+
+
+class FixedWidthLayout:
+    """
+    Fixed-width column layout derived once from the header offsets (i.e. `r.start(n)` positions) of a section.
+    Slices lines into columns directly instead of building and matching a regex like `^(.{a})(.{b})(.+)$` for every line.
+    
+    Offsets [a, b, c] give columns line[a:b], line[b:c] and line[c:], anything before the first offset is skipped.
+    A line only fits the layout if it reaches the last column (and has at least one character in it if `tail_required`), 
+    same as the regex it replaces.
+    """
+    def __init__(self, offsets: List[int], tail_required: bool = True) -> None:
+        if any(a > b for a, b in zip(offsets, offsets[1:])):
+            raise ValueError(f'Column offsets must be increasing, got: {offsets}')
+        self.offsets = offsets
+        self.min_length = offsets[-1] + 1 if tail_required else offsets[-1]
+        self._bounds = list(zip(offsets, offsets[1:] + [None]))
+    
+    def split(self, line: str) -> tuple | None:
+        if len(line) < self.min_length:
+            return None
+        return tuple(line[start:end] for start, end in self._bounds)
+
+
+class SectionIndex:
+    """
+    Scans the file contents once and records the offsets of every section anchor (BID RANK, L I S T   O F   S U B C O N T R A C T O R S, 
+    C O N T R A C T   P R O P O S A L, page breaks, CONTINUED ON NEXT PAGE, ...). 
+    
+    Each portion then runs its NARROW_REGEX only over its own window, i.e. from the line of the first SECTION_START anchor 
+    to the end of the last SECTION_END anchor, instead of over the entire file. Anchors are the same (or looser) phrases the 
+    NARROW_REGEX patterns look for, so results are identical to a full-file findall.
+    """
+    
+    SUBCONTRACTORS_HEADER_ANCHOR = r'BIDDER\s+ID\s+NAME\s+AND\s+ADDRESS\s+(?:LICENSE\s+NUMBER)?\s+DESCRIPTION\s+OF\s+PORTION\s+OF\s+WORK\s+SUBCONTRACTED'
+    
+    # order matters, at the same position the first alternative wins (i.e. exact 'Bid Rank' before 'Bid\s+Rank')
+    ANCHORS = {
+        't1': {
+            'bid_rank': r'BID RANK',
+            'postponed': r'POSTPONED CONTRACT',
+            'subcontractors_list': r'L I S T   O F   S U B C O N T R A C T O R S',
+            'subcontractors_header': SUBCONTRACTORS_HEADER_ANCHOR,
+            'contract_proposal': r'C O N T R A C T   P R O P O S A L   O F   L O W   B I D D E R',
+            'page_break': r'\f',
+            'continued': r'CONTINUED ON NEXT PAGE',
+            'continued_spaced': r'CONTINUED\s+ON\s+NEXT\s+PAGE',
+        },
+        't2': {
+            'bid_rank': r'Bid Rank',
+            'bid_rank_spaced': r'Bid\s+Rank',
+            'postponed': r'Postponed Contract',
+            'subcontractors_list': r'LIST\s+OF\s+SUBCONTRACTORS',
+            'subcontractors_header': SUBCONTRACTORS_HEADER_ANCHOR,
+            'contract_proposal': r'Contract\s+Proposal\s+of\s+Low\s+Bidder',
+            'page_break': r'\f',
+            'continued': r'CONTINUED\s+ON\s+NEXT\s+PAGE',
+        },
+    }
+    
+    PATTERNS = {
+        contract_type: '|'.join(f'(?P<{kind}>{regex})' for kind, regex in anchors.items())
+        for contract_type, anchors in ANCHORS.items()
+    }
+    STR_PATTERNS = {contract_type: re.compile(pattern) for contract_type, pattern in PATTERNS.items()}
+    BYTES_PATTERNS = {contract_type: bytes_regex(pattern) for contract_type, pattern in PATTERNS.items()}
+    
+    def __init__(self, file_contents: str | mmap.mmap | bytes, contract_type: str) -> None:
+        """
+        file_contents can also be the bytes from map_file, offsets are the same in both cases.
+        """
+        self.file_contents = file_contents
+        self.is_str = isinstance(file_contents, str)
+        patterns = self.STR_PATTERNS if self.is_str else self.BYTES_PATTERNS
+        self.anchors = defaultdict(list)  # kind: list of (start, end)
+        for match in patterns[contract_type].finditer(file_contents):
+            self.anchors[match.lastgroup].append(match.span())
+    
+    def window(self, start_kinds: tuple | None, end_kinds: tuple | None) -> tuple[int, int] | None:
+        """
+        Returns (pos, endpos) to be used as pattern.findall(file_contents, pos, endpos), or None if a required anchor is missing.
+        """
+        pos = 0
+        if start_kinds:
+            starts = [self.anchors[kind][0][0] for kind in start_kinds if self.anchors[kind]]
+            if not starts:
+                return None
+            # start at the beginning of the line, so that patterns with (?m)^ still match
+            pos = self.file_contents.rfind('\n' if self.is_str else b'\n', 0, min(starts)) + 1
+        
+        endpos = len(self.file_contents)
+        if end_kinds:
+            ends = [self.anchors[kind][-1][1] for kind in end_kinds if self.anchors[kind]]
+            if not ends or max(ends) <= pos:
+                return None
+            endpos = max(ends)
+        return pos, endpos
+
+
+class LineIndex:
+    """
+    The lines of a section, split once, and blank (1 for the lines that are empty or whitespace only, as a bytearray computed on first use),
+    so next_line is a search for the next 0 in blank (memchr) instead of stripping lines one by one in a Python loop.
+    Built by the type 2 parsers (Bids2, Subcontractors2, Items2) for the section they parse, not once per contract: each section is only 
+    parsed once, so a contract-wide index would not save any work. There are no newline offsets or next-line table, next_line is the lookup.
+    """
+    
+    def __init__(self, text: str) -> None:
+        self.lines = text.split('\n')
+    
+    @cached_property
+    def blank(self) -> bytearray:
+        return bytearray(map(operator.not_, map(str.strip, self.lines)))
+    
+    def next_line(self, i: int) -> int:
+        """
+        The first line after line i that is not blank, len(lines) if there is none (i + 1 if that is more).
+        """
+        following = self.blank.find(0, i + 1)
+        return following if following != -1 else max(i + 1, len(self.lines))
+
+
+SPLIT_REGEX = r'[^\n]*STATE OF CALIFORNIA\s+B I D   S U M M A R Y\s+DEPARTMENT OF TRANSPORTATION'
+SPLIT_PATTERN_BYTES = bytes_regex(SPLIT_REGEX)
+
+# SPLIT_REGEX in parts: the literal is looked up with find and only its surroundings are checked, 
+# the leading [^\n]* of SPLIT_REGEX makes the regex engine try a match at every character
+SPLIT_LITERAL = 'B I D   S U M M A R Y'
+SPLIT_HEAD = 'STATE OF CALIFORNIA'
+SPLIT_TAIL_REGEX = r'\s+DEPARTMENT OF TRANSPORTATION'
+SPLIT_TAIL_PATTERN = re.compile(SPLIT_TAIL_REGEX)
+SPLIT_TAIL_PATTERN_BYTES = bytes_regex(SPLIT_TAIL_REGEX)
+# what \s matches in bytes patterns from bytes_regex, in str it is str.isspace
+SPACE_BYTES = frozenset(b' \t\n\r\x0b\x0c\x1c\x1d\x1e\x1f\x85\xa0')
+
+# iter_split_contract reads this many characters (bytes) at a time, and only checks a literal once this many follow it (or the file ended)
+SPLIT_CHUNK_SIZE = 1 << 20
+SPLIT_LOOKAHEAD = 1024
+
+
+def _split_matches(file_contents, pos: int = 0, endpos: int | None = None, previous_end: int = 0):
+    """
+    Yields (start, end) of the SPLIT_REGEX matches in file_contents (str, bytes or mmap) whose literal is within [pos, endpos),
+    same as re.finditer. previous_end is the end of the match before pos, matches don't overlap.
+    """
+    is_bytes = not isinstance(file_contents, str)
+    literal, head, newline = (SPLIT_LITERAL.encode(), SPLIT_HEAD.encode(), b'\n') if is_bytes else (SPLIT_LITERAL, SPLIT_HEAD, '\n')
+    tail_pattern = SPLIT_TAIL_PATTERN_BYTES if is_bytes else SPLIT_TAIL_PATTERN
+    endpos = len(file_contents) if endpos is None else endpos
+    
+    def is_space(i: int) -> bool:
+        return file_contents[i] in SPACE_BYTES if is_bytes else file_contents[i].isspace()
+    
+    def match_at(position: int, bound: int) -> tuple[int, int] | None:
+        # STATE OF CALIFORNIA (not before bound), then whitespace up to the literal at position, then the tail
+        head_end = position
+        while head_end > bound and is_space(head_end - 1):
+            head_end -= 1
+        head_start = head_end - len(head)
+        if head_end == position or head_start < bound or file_contents[head_start:head_end] != head:
+            return None
+        tail = tail_pattern.match(file_contents, position + len(literal))
+        return (head_start, tail.end()) if tail else None
+    
+    position = file_contents.find(literal, pos, endpos)
+    while position != -1:
+        found = match_at(position, previous_end)
+        if found is None:
+            position = file_contents.find(literal, position + 1, endpos)
+            continue
+        # [^\n]* goes back to the start of the line (but not into the previous match)
+        start = max(file_contents.rfind(newline, 0, found[0]) + 1, previous_end)
+        end = found[1]
+        # and being greedy, it takes the last STATE OF CALIFORNIA of the line that matches, the whitespace before 
+        # a later literal can go over the end of the line
+        line_end = file_contents.find(newline, start)
+        limit = len(file_contents) if line_end == -1 else line_end
+        while limit < len(file_contents) and is_space(limit):
+            limit += 1
+        later = file_contents.find(literal, position + 1, min(limit + len(literal), endpos))
+        while later != -1:
+            found = match_at(later, start)
+            if found is not None and (line_end == -1 or found[0] + len(head) <= line_end):
+                end = found[1]
+            later = file_contents.find(literal, later + 1, min(limit + len(literal), endpos))
+        previous_end = end
+        yield start, end
+        position = file_contents.find(literal, end, endpos)
+
+
+def split_contract_positions(file_contents, tag) -> dict[str, tuple[int, int]]:
+    """
+    Same as split_contract but returns a dict: new identifier: (start, end) of the partial text in file_contents.
+    For bytes from map_file these are byte offsets in the raw file.
+    """
+    # Extract and print starting positions
+    positions = [start for start, _ in _split_matches(file_contents)] + [len(file_contents)]
+    
+    return {tag + '_' + f"{i:02}": (positions[i], positions[i+1]) for i in range(len(positions) - 1)}
+
+
 def split_contract(file_contents, tag) -> dict[str, str]:
     """
     Uses phrase in the header to split the contract into multiple partial_texts. If contract_number + tag is non-original, code skips at reports an issue.
+    file_contents can also be the bytes from map_file, the partial texts are then bytes as well.
     
     Returns a dict: new identifier: new_file_contents.
     """
-    split_pattern = re.compile(r'[^\n]*STATE OF CALIFORNIA\s+B I D   S U M M A R Y\s+DEPARTMENT OF TRANSPORTATION')
-    matches = re.finditer(split_pattern, file_contents)
+    positions = split_contract_positions(file_contents, tag)
 
-    # Extract and print starting positions
-    positions = [match.start() for match in matches] + [None]
-
-    splits = {tag + '_' + f"{i:02}": '\n\n\n' + file_contents[positions[i]:positions[i+1]] for i in range(len(positions) - 1)}
+    if isinstance(file_contents, str):
+        splits = {key: '\n\n\n' + file_contents[start:end] for key, (start, end) in positions.items()}
+    else:
+        splits = {key: b'\n\n\n' + normalize_newlines(file_contents[start:end]) for key, (start, end) in positions.items()}
         
     return splits
 
+
+def iter_split_contract(filepath: str, tag: str, binary: bool = False, chunk_size: int = SPLIT_CHUNK_SIZE):
+    """
+    Streaming version of split_contract: reads the document chunk_size at a time and yields (new identifier, new_file_contents) 
+    one partial text at a time, so memory is bounded by the largest partial text instead of the whole document.
+    Yields the same as split_contract(read_file(filepath), tag).items(), or with binary=True split_contract(map_file(filepath), tag).items().
+    """
+    newline = b'\n' if binary else '\n'
+    with open(filepath, 'rb') if binary else open(filepath, 'r', encoding='ISO-8859-1') as file:
+        buffer = file.read(0)
+        start = None  # start of the current partial text in buffer
+        previous_end = scanned = 0  # end of the last match, literals before scanned were already checked
+        i = 0
+        at_end = False
+        while not at_end:
+            chunk = file.read(chunk_size)
+            at_end = not chunk
+            buffer += chunk
+            endpos = len(buffer) if at_end else max(len(buffer) - SPLIT_LOOKAHEAD, scanned)
+            for match_start, match_end in _split_matches(buffer, scanned, endpos, previous_end):
+                if start is not None:
+                    partial_text = buffer[start:match_start]
+                    yield tag + '_' + f"{i:02}", newline * 3 + (normalize_newlines(partial_text) if binary else partial_text)
+                    i += 1
+                start, previous_end = match_start, match_end
+            scanned = max(scanned, endpos - len(SPLIT_LITERAL) + 1, previous_end)
+            if start:
+                # the text before the current partial text is not needed anymore
+                buffer = buffer[start:]
+                scanned, previous_end, start = scanned - start, previous_end - start, 0
+        if start is not None:
+            yield tag + '_' + f"{i:02}", newline * 3 + (normalize_newlines(buffer[start:]) if binary else buffer[start:])
+
+
+class ContractRecord(NamedTuple):
+    """
+    Entry of the contract index made by sort_contracts(virtual=True), points to the contract text in the original raw file 
+    instead of a copy in sorted_data. Has `stem` and `name` like the Path of a sorted file, so it can be used in its place.
+    """
+    identifier: str  # i.e. 't1_3073_00'
+    contract_type: int
+    source_path: str
+    start: int  # byte offsets in the raw file
+    end: int
+    split: bool  # partial text of a multi-contract document, these start with '\n\n\n' (see split_contract)
+    
+    @property
+    def stem(self) -> str:
+        return self.identifier
+    
+    @property
+    def name(self) -> str:
+        return self.identifier + '.txt'
+    
+    def read(self, mapped: bool = False) -> str | bytes:
+        """
+        Reads only this contract's bytes from the raw file. Returns the same text as read_file of the sorted file would,
+        or (mapped=True) the raw bytes to be used in place of map_file.
+        """
+        with open(self.source_path, 'rb') as file:
+            file.seek(self.start)
+            contents = file.read(self.end - self.start)
+        if self.split:
+            contents = b'\n\n\n' + contents
+        return contents if mapped else decode(contents)
+
+
+def read_contract(filename: str, mapped: bool = False, record: ContractRecord | None = None) -> str | mmap.mmap | bytes:
+    """
+    Text of a contract the way Contract reads it: sorted_data/<filename>.txt, or the raw file of record if given.
+    With mapped=True the file is memory-mapped (see map_file).
+    """
+    if record is not None:
+        return record.read(mapped=mapped)
+    filepath = SORTED_DATA_PATH / (filename + '.txt')
+    return map_file(filepath) if mapped else read_file(filepath)
+
+
 class Contract:
-    def __init__(self, filename: str) -> None:
+    def __init__(self, filename: str, mapped: bool = False, record: ContractRecord | None = None, timer=NULL_TIMER, contents=None) -> None:
         """
         Relative_filepath, for example: 't1_<identifier>.txt' or 't2_<identifier>.txt'
+        
+        With mapped=True the file is memory-mapped (see map_file) and only the sections that portions parse get decoded.
+        With record (see ContractRecord) the text is read directly from the raw file instead of sorted_data.
+        timer (see profiling.StageTimer) records the time spent in each stage of the extraction.
+        contents is the text of the contract if it was already read (see read_contract), i.e. by a prefetching thread.
         """
-        self.filepath = SORTED_DATA_PATH / (filename + '.txt')
+        self.timer = timer
+        self.filepath = SORTED_DATA_PATH / (filename + '.txt') if record is None else Path(record.source_path)
+        self.record = record
         
         self.contract_type = filename[0:2]
         self.identifier = filename[3:]
         
-        self._file_contents = read_file(self.filepath)
+        self._content_hash = None
+        with timer.stage('read'):
+            if contents is None:
+                contents = read_contract(filename, mapped=mapped, record=record)
+        self._file_contents = None if mapped else contents
+        self._mapped_contents = contents if mapped else None
         
         if self.contract_type == 't1':
-            self.info = Info(self.file_contents, self.identifier)
-            self.bids = Bids(self.file_contents, self.identifier)
-            self.subcontractors = Subcontractors(self.file_contents, self.identifier)
-            self.items = Items(self.file_contents, self.identifier)
+            portions = (Info, Bids, Subcontractors, Items)
         elif self.contract_type == 't2':
-            self.info = Info2(self.file_contents, self.identifier)
-            self.bids = Bids2(self.file_contents, self.identifier)
-            self.subcontractors = Subcontractors2(self.file_contents, self.identifier)
-            self.items = Items2(self.file_contents, self.identifier)
+            portions = (Info2, Bids2, Subcontractors2, Items2)
         else:
             raise ValueError(f"Contract type {self.contract_type} is not supported")
         
-    def extract(self):
-        self.info.extract()
+        # single scan over the file, portions then only look at their own windows
+        with timer.stage('section_index'):
+            self.section_index = SectionIndex(contents, self.contract_type)
+        self.info, self.bids, self.subcontractors, self.items = (
+            portion(contents, self.identifier, self.section_index, timer) for portion in portions
+        )
+        
+    def extract(self, cache=None, defer_items: bool = False):
+        """
+        cache (see cache.ResultCache) is optional, portions found in it are not parsed again.
+        With defer_items=True type 1 Items that are not in the cache are not parsed (items.rows stays None), 
+        so that the caller can parse those of many contracts at once (see Items.extract_batch and experiment.process_contracts).
+        """
+        self._extract_portion(self.info, cache)
         
         if not self.info.rows:
             raise ValueError(f"Failed to extract basic info for {self.identifier}")
@@ -69,12 +441,48 @@ class Contract:
         self.postponed = int(self.info.rows[0][POSTPONED_CONTRACT])
         
         if self.postponed == 0:
-            self.bids.extract()
-            self.subcontractors.extract()
-            self.items.extract()
+            self._extract_portion(self.bids, cache)
+            self._extract_portion(self.subcontractors, cache)
+            self._extract_portion(self.items, cache, defer=defer_items and type(self.items) is Items)
+            
+    def _extract_portion(self, portion, cache, defer: bool = False):
+        if cache is None:
+            if not defer:
+                portion.extract()
+            return
+        with self.timer.stage('cache'):
+            rows = cache.get(self.content_hash, portion)
+        if rows is None:
+            if defer:
+                return
+            portion.extract()
+            with self.timer.stage('cache'):
+                cache.put(self.content_hash, portion, portion.rows)
+        else:
+            # the key is the content, the same text can come from another contract (i.e. a duplicate under a different identifier)
+            for row in rows:
+                row[IDENTIFIER] = self.identifier
+            portion.set_rows(rows)
+    
+    @property
+    def content_hash(self) -> str:
+        """
+        SHA-1 of the raw file bytes, same for both the mapped and the read_file path.
+        """
+        if self._content_hash is None:
+            if self._mapped_contents is not None:
+                contents = self._mapped_contents
+            elif self.record is not None:
+                contents = self.record.read(mapped=True)
+            else:
+                contents = self.filepath.read_bytes()
+            self._content_hash = hashlib.sha1(contents).hexdigest()
+        return self._content_hash
         
     @property
     def file_contents(self):
+        if self._file_contents is None:
+            self._file_contents = decode(self._mapped_contents[:])
         return self._file_contents
     
     def copy_file(self, to_folder):
@@ -85,49 +493,98 @@ class Contract:
 
 
 class ContractPortionBase(object):
-    def __init__(self, file_contents, identifier) -> None:
+    
+    # anchors (see SectionIndex) that delimit the part of the file where NARROW_REGEX can match, None means start/end of the file
+    SECTION_START = None
+    SECTION_END = None
+    
+    # COLUMNS are the columns of the error row (see error_row), ROW_FIELDS the fields of the extracted rows (see rows.Row) 
+    # in the order the parser sets them, which is the column order of the results
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        cls.Row = row_class(cls, cls.ROW_FIELDS)
+    
+    def __init__(self, file_contents, identifier, section_index: SectionIndex | None = None, timer=NULL_TIMER) -> None:
         self.file_contents = file_contents
         self.identifier = identifier
+        self.section_index = section_index
+        self.timer = timer
         self.rows = None
         self._df = None
     
     @property
     def df(self):
+        """
+        DataFrame of the rows, built on first access (batch runs only use rows), or a single error row if nothing was extracted.
+        """
+        if self._df is None and self.rows is not None:
+            with self.timer.stage(f'{type(self).__name__}.dataframe'):
+                self._df = rows_to_frame(self.rows) if self.rows else pd.DataFrame([self.error_row])
         return self._df
+    
+    @property
+    def error_row(self) -> dict:
+        """
+        The row that stands in for a portion that could not be extracted.
+        """
+        d = {x: '' for x in self.COLUMNS}
+        d[IDENTIFIER] = self.identifier
+        d[ERROR] = 1
+        return d
         
     def preprocess(self, regex: str) -> List[str]:
         """
         Uses regex to narrow down the file_contents to specific sections that will be returned.
         """
         pattern = re.compile(regex)
-        matches = pattern.findall(self.file_contents)
+        if self.section_index is None:
+            window = (0, len(self.file_contents))
+        else:
+            window = self.section_index.window(self.SECTION_START, self.SECTION_END)
+            if window is None:
+                return []
+            
+        if isinstance(self.file_contents, str):
+            matches = pattern.findall(self.file_contents, *window)
+        else:
+            # file is memory-mapped, decode only the window
+            pos, endpos = window
+            matches = pattern.findall(decode(self.file_contents[pos:endpos]))
         return matches if matches else []
     
     def _parse(self, text: str, identifier: str):
         raise NotImplementedError
     
     def extract(self):
-        if self.NARROW_REGEX:
-            matches = self.preprocess(self.NARROW_REGEX)
-        else:
-            matches = [self.file_contents]
+        name = type(self).__name__
+        with self.timer.stage(f'{name}.preprocess'):
+            if self.NARROW_REGEX:
+                matches = self.preprocess(self.NARROW_REGEX)
+            elif isinstance(self.file_contents, str):
+                matches = [self.file_contents]
+            else:
+                matches = [decode(self.file_contents[:])]
             
+        with self.timer.stage(f'{name}._parse'):
+            processed_lines = self._parse_sections(matches)
+        
+        self.set_rows(processed_lines)
+    
+    def _parse_sections(self, matches: list) -> list:
         processed_lines = []
         for match in matches:
             rows = self._parse(match, self.identifier)
             processed_lines.extend(rows)
+        return processed_lines
         
-        self.rows = processed_lines
-        
-        self._df = pd.DataFrame(self.rows)
-        
-        if self._df.empty:
-            d = {x: '' for x in self.COLUMNS}
-            d[IDENTIFIER] = self.identifier
-            d[ERROR] = 1
-            self._df = pd.DataFrame([d])
-            # or raise an error:
-            # raise ValueError(f"Failed to extracted info for {self.__class__.__name__} from {self.identifier}")
+    def set_rows(self, rows: list):
+        """
+        Sets the extracted rows (i.e. parsed in extract or loaded from a cache), the DataFrame is only built when df is used.
+        """
+        self.rows = rows
+        self._df = None
+        # or raise an error when there are no rows:
+        # raise ValueError(f"Failed to extracted info for {self.__class__.__name__} from {self.identifier}")
 
 
 class Info(ContractPortionBase):
@@ -136,51 +593,89 @@ class Info(ContractPortionBase):
                CONTRACT_DATE, CONTRACT_NUMBER, TOTAL_NUMBER_OF_WORKING_DAYS, CONTRACT_ITEMS, 
                CONTRACT_DESCRIPTION, PERCENT_OVER_EST, PERCENT_UNDER_EST, ENGINEERS_EST, 
                AMOUNT_OVER, AMOUNT_UNDER, CONTRACT_CODE, ERROR]
+    ROW_FIELDS = [IDENTIFIER, POSTPONED_CONTRACT, BID_OPENING_DATE, CONTRACT_DATE, CONTRACT_NUMBER, CONTRACT_CODE, 
+                  CONTRACT_ITEMS, TOTAL_NUMBER_OF_WORKING_DAYS, NUMBER_OF_BIDDERS, ENGINEERS_EST, 
+                  AMOUNT_OVER, AMOUNT_UNDER, PERCENT_OVER_EST, PERCENT_UNDER_EST, CONTRACT_DESCRIPTION, ERROR]
         
     # narrow from the beginning of the file to the first occurrence of BID RANK or POSTPONED CONTRACT
     NARROW_REGEX = r'(?s)(^.*?(?:BID RANK|POSTPONED CONTRACT))'     # TODO add |NO BIDDERS|CANCELLED CONTRACT)
+    SECTION_START = None
+    SECTION_END = ('bid_rank', 'postponed')
+    
+    # column: (keyword, pattern), a pattern is only tried where its keyword is (see search_keyword), not at every position of the header
+    KEYWORD_FIELDS = {
+        CONTRACT_NUMBER: ('CONTRACT NUMBER', re.compile(r"CONTRACT NUMBER\s+([A-Za-z0-9-]+)")),
+        CONTRACT_CODE: ('CONTRACT CODE', re.compile(r"CONTRACT CODE\s+'([^']+)'")),
+        TOTAL_NUMBER_OF_WORKING_DAYS: ('TOTAL NUMBER OF WORKING DAYS', re.compile(r"TOTAL NUMBER OF WORKING DAYS\s+(\d+)")),
+        NUMBER_OF_BIDDERS: ('NUMBER OF BIDDERS', re.compile(r"NUMBER OF BIDDERS\s+(\d+)")),
+        ENGINEERS_EST: ('ENGINEERS EST', re.compile(r"ENGINEERS EST\s+([\d,]+\.\d{2})")),
+        AMOUNT_OVER: ('AMOUNT OVER', re.compile(r"AMOUNT OVER\s+([\d,]+\.\d{2})")),
+        AMOUNT_UNDER: ('AMOUNT UNDER', re.compile(r"AMOUNT UNDER\s+([\d,]+\.\d{2})")),
+        PERCENT_OVER_EST: ('PERCENT OVER EST', re.compile(r"PERCENT OVER EST\s+(\d+.\d{2})")),
+        PERCENT_UNDER_EST: ('PERCENT UNDER EST', re.compile(r"PERCENT UNDER EST\s+(\d+.\d{2})")),
+    }
+    DATES_PATTERN = re.compile(r"BID OPENING DATE\s+(\d+\/\d+\/\d+).+\s+(\d+\/\d+\/\d+)")
     
     @staticmethod
     def _parse(text: str, identifier: str):
         
-        def _extract(regex, groups=(1,)):
-            # Search for the pattern in the text
-            match = re.search(regex, text)
-            if match:
-                if len(groups) == 1:
-                    return match.group(groups[0])
-                else:
-                    return (match.group(i) for i in groups)
-            else:
-                return ""
-        
-        row = defaultdict(str)
+        row = Info.Row()
         row[IDENTIFIER] = identifier
-        a = _extract(r"(POSTPONED CONTRACT)")
-        row[POSTPONED_CONTRACT] = int(bool(a))
-        row[BID_OPENING_DATE], row[CONTRACT_DATE] = _extract(r"BID OPENING DATE\s+(\d+\/\d+\/\d+).+\s+(\d+\/\d+\/\d+)", (1, 2))
-        row[CONTRACT_NUMBER] = _extract(r"CONTRACT NUMBER\s+([A-Za-z0-9-]+)")
-        row[CONTRACT_CODE] = _extract(r"CONTRACT CODE\s+'([^']+)'").strip()
-        row[CONTRACT_ITEMS] = _extract(r"(\d+)\s+CONTRACT ITEMS")
-        row[TOTAL_NUMBER_OF_WORKING_DAYS] = _extract(r"TOTAL NUMBER OF WORKING DAYS\s+(\d+)")
-        row[NUMBER_OF_BIDDERS] = _extract(r"NUMBER OF BIDDERS\s+(\d+)")
-        row[ENGINEERS_EST] = _extract(r"ENGINEERS EST\s+([\d,]+\.\d{2})")
-        row[AMOUNT_OVER] = _extract(r"AMOUNT OVER\s+([\d,]+\.\d{2})")
-        row[AMOUNT_UNDER] = _extract(r"AMOUNT UNDER\s+([\d,]+\.\d{2})")
-        row[PERCENT_OVER_EST] = _extract(r"PERCENT OVER EST\s+(\d+.\d{2})")
-        row[PERCENT_UNDER_EST] = _extract(r"PERCENT UNDER EST\s+(\d+.\d{2})")
-        row[CONTRACT_DESCRIPTION] = _extract(r"(?:\n)?(.*?)FEDERAL AID").strip()
+        row[POSTPONED_CONTRACT] = int('POSTPONED CONTRACT' in text)
+        dates = search_keyword(text, 'BID OPENING DATE', Info.DATES_PATTERN)
+        # a header without the dates fails here, like it always did (unpacking "")
+        row[BID_OPENING_DATE], row[CONTRACT_DATE] = dates.groups() if dates else ""
+        for column, (keyword, pattern) in Info.KEYWORD_FIELDS.items():
+            match = search_keyword(text, keyword, pattern)
+            row[column] = match.group(1) if match else ""
+        row[CONTRACT_CODE] = row[CONTRACT_CODE].strip()
+        row[CONTRACT_ITEMS] = search_number_before(text, 'CONTRACT ITEMS')
+        # same as re.search(r"(?:\n)?(.*?)FEDERAL AID", text): the line of the first FEDERAL AID up to it
+        position = text.find('FEDERAL AID')
+        row[CONTRACT_DESCRIPTION] = text[text.rfind('\n', 0, position) + 1:position].strip() if position != -1 else ""
         processed_lines = [row]
         return processed_lines
+    
+    @staticmethod
+    def parse_batch(headers: List[Tuple[str, str]]) -> pd.DataFrame:
+        """
+        _parse for many (identifier, narrowed header) at once, each field is extracted column-wise over all the headers with pandas string methods.
+        Returns the Info table, indexed by the position in headers, with the same values as _parse.
+        Headers that _parse fails on (no BID OPENING DATE line) are left out, see experiment.extract_info.
+        """
+        identifiers, texts = zip(*headers) if headers else ((), ())
+        texts = pd.Series(texts, dtype=object)
+        
+        def _extract(regex):
+            return texts.str.extract(regex).fillna('')
+        
+        dates = texts.str.extract(Info.DATES_PATTERN.pattern)
+        columns = {
+            IDENTIFIER: list(identifiers),
+            POSTPONED_CONTRACT: texts.str.contains('POSTPONED CONTRACT', regex=False).astype(int),
+            BID_OPENING_DATE: dates[0],
+            CONTRACT_DATE: dates[1],
+            CONTRACT_ITEMS: _extract(r"(\d+)\s+CONTRACT ITEMS")[0],
+            CONTRACT_DESCRIPTION: _extract(r"(?:\n)?(.*?)FEDERAL AID")[0].str.strip(),
+        }
+        # the same patterns as _parse, only applied to all the headers at once
+        columns.update({column: _extract(pattern.pattern)[0] for column, (_, pattern) in Info.KEYWORD_FIELDS.items()})
+        columns[CONTRACT_CODE] = columns[CONTRACT_CODE].str.strip()
+        df = pd.DataFrame(columns, index=texts.index)[[x for x in Info.ROW_FIELDS if x in columns]]
+        return df[dates[0].notna()]
 
 
 class Bids(ContractPortionBase):
     
     NARROW_REGEX = r"(?s)BID RANK\s+BID TOTAL\s+BIDDER ID\s+BIDDER INFORMATION\s+\(NAME\/ADDRESS\/LOCATION\)(.*?)(?=L I S T   O F   S U B C O N T R A C T O R S)"
+    SECTION_START = ('bid_rank',)
+    SECTION_END = ('subcontractors_list',)
     BIDS_FIRST_LINE_PATTERN = re.compile(r"^\s+(\d+)\s+(A\))?\s+([\d,]+\.\d{2})\s+(\d+)\s+(.+)(\d{3} \d{3}-\d{4})(.*)?")
     
     COLUMNS = [IDENTIFIER, BID_RANK, A_PLUS_B_INDICATOR, BID_TOTAL, BIDDER_ID, 
                BIDDER_NAME, BIDDER_PHONE, EXTRA, CSLB_NUMBER, HAS_THIRD_ROW, CONTRACT_NOTES, ERROR]
+    ROW_FIELDS = [IDENTIFIER, BID_RANK, A_PLUS_B_INDICATOR, BID_TOTAL, BIDDER_ID, 
+                  BIDDER_NAME, BIDDER_PHONE, EXTRA, CONTRACT_NOTES, CSLB_NUMBER, HAS_THIRD_ROW, ERROR]
     
     @staticmethod
     def _parse(text, identifier):
@@ -199,7 +694,7 @@ class Bids(ContractPortionBase):
             match = re.match(bids_pattern, lines[i])
             if match:
                 # this mean we hit the first line, lets parse it and save it
-                row = defaultdict(str)
+                row = Bids.Row()
                 row[IDENTIFIER] = identifier
                 row[BID_RANK] = match.group(1)
                 row[A_PLUS_B_INDICATOR] = 1 if match.group(2) else 0
@@ -213,14 +708,14 @@ class Bids(ContractPortionBase):
                 i += 1
                 name_starts = match.start(5)
                 name_ends = match.end(5)
-                delta = name_ends - name_starts
-                match_second_line = re.match(rf"^(.{{{name_starts}}})(.{{{delta}}})(.+)$", lines[i])
+                second_line = FixedWidthLayout([0, name_starts, name_ends]).split(lines[i])
                 
-                if match_second_line:
+                if second_line:
                     # this should be the case if second line is present
-                    row[CONTRACT_NOTES] = match_second_line.group(1).strip()
-                    row[BIDDER_NAME] += ' ' + match_second_line.group(2).rstrip()  # this is the second line of the bidder name
-                    row[CSLB_NUMBER] = match_second_line.group(3)
+                    notes, extra_name, cslb_number = second_line
+                    row[CONTRACT_NOTES] = notes.strip()
+                    row[BIDDER_NAME] += ' ' + extra_name.rstrip()  # this is the second line of the bidder name
+                    row[CSLB_NUMBER] = cslb_number
                 else:
                     # log as error:
                     raise ValueError(f'Second line is not in the standard format (notes, extra name, CLBS number, line: `{lines[i]}`')
@@ -231,8 +726,8 @@ class Bids(ContractPortionBase):
                 line = lines[i]
                 if len(line) < name_ends:
                     # this means we have a third line, so just strip and add to the name
-                    match_third_line = re.match(rf"^.{{{name_starts}}}(.+)$", lines[i])
-                    row[BIDDER_NAME] += match_third_line.group(1).strip()
+                    third_line, = FixedWidthLayout([name_starts]).split(line)
+                    row[BIDDER_NAME] += third_line.strip()
                     row[HAS_THIRD_ROW] = 1
                 else:
                     # we don't have a third row
@@ -256,9 +751,12 @@ class Bids(ContractPortionBase):
 class Subcontractors(ContractPortionBase):
     
     COLUMNS = [IDENTIFIER, BIDDER_ID, SUBCONTRACTOR_NAME, SUBCONTRACTED_LINE_ITEM, CITY, SUBCONTRACTOR_LICENSE_NUMBER, ERROR]
+    ROW_FIELDS = [IDENTIFIER, BIDDER_ID, SUBCONTRACTOR_NAME, SUBCONTRACTED_LINE_ITEM, ITEM_NUMBERS, PERCENT, CITY, SUBCONTRACTOR_LICENSE_NUMBER, ERROR]
     
     # some don't have CONTINUED ON NEXT PAGE, ugh, see below for resolution
     NARROW_REGEX = r"(?sm)^([^\S\r\n]*BIDDER ID\s+NAME AND ADDRESS\s+(?:LICENSE NUMBER)?\s+DESCRIPTION OF PORTION OF WORK SUBCONTRACTED)(.*?)(?=[^\S\r\n]*BIDDER ID NAME AND ADDRESS\s+(?:LICENSE NUMBER)?\s+DESCRIPTION OF PORTION OF WORK SUBCONTRACTED|\f|CONTINUED\s+ON\s+NEXT\s+PAGE)"
+    SECTION_START = ('subcontractors_header',)
+    SECTION_END = ('subcontractors_header', 'page_break', 'continued', 'continued_spaced')
     
     @staticmethod
     def _parse(header_and_text, identifier):
@@ -271,17 +769,18 @@ class Subcontractors(ContractPortionBase):
         lines = text.split('\n')
         
         delta = r.start(4) - r.start(2)
+        line_pattern = re.compile(rf"^\s+(\d+)?\s+(.{{{delta}}})\s+(.+)$")  # pick up 1) bidder id, 2) subcontractor name, and 3) subcontracted line item
         i = 0
         processed_lines = []
         previous_bidder_id = None
         while i < len(lines) - 1:
             line = lines[i]
-            match = re.match(rf"^\s+(\d+)?\s+(.{{{delta}}})\s+(.+)$", line)  # pick up 1) bidder id, 2) subcontractor name, and 3) subcontracted line item
+            match = line_pattern.match(line)
             if match and has_more_digits_than_non_digits(match.group(2).strip()): 
                 # stop further since we picked up a contract number for a name, this happens when there is no CONTINUED ON NEXT PAGE text
                 break
             if match: 
-                row = defaultdict(str)
+                row = Subcontractors.Row()
                 row[IDENTIFIER] = identifier
                 
                 row[BIDDER_ID] = line[r.start(1):r.end(1)].strip()
@@ -355,8 +854,11 @@ class Subcontractors(ContractPortionBase):
 class Items(ContractPortionBase):
     
     COLUMNS = [ITEM_NUMBER, ITEM_FLAG, ITEM_CODE, ITEM_DESCRIPTION, EXTRA2, ITEM_DOLLAR_AMOUNT, ERROR]
+    ROW_FIELDS = [IDENTIFIER, ITEM_NUMBER, ITEM_FLAG, ITEM_CODE, ITEM_DESCRIPTION, EXTRA2, ITEM_DOLLAR_AMOUNT, ERROR]
     
     NARROW_REGEX = r"(?s)C O N T R A C T   P R O P O S A L   O F   L O W   B I D D E R(.*?)(?=C O N T R A C T   P R O P O S A L   O F   L O W   B I D D E R|\f|CONTINUED ON NEXT PAGE)"
+    SECTION_START = ('contract_proposal',)
+    SECTION_END = ('contract_proposal', 'page_break', 'continued')
     
     @staticmethod
     def _parse(text: str, identifier: str):
@@ -382,7 +884,7 @@ class Items(ContractPortionBase):
                 if row:
                     processed_lines.append(row)
                 
-                row = defaultdict(str)
+                row = Items.Row()
                 row[IDENTIFIER] = identifier
                 row[ITEM_NUMBER] = match.group(1)
                 row[ITEM_FLAG] = match.group(2)
@@ -402,15 +904,61 @@ class Items(ContractPortionBase):
             processed_lines.append(row)  
         return processed_lines
     
+    # the line regex of _parse for many lines at once, [^\S\n] instead of \s so that a match can't go over the end of a line
+    BATCH_LINE_PATTERN = re.compile(r'(?m)^[^\S\n]+(\d+)[^\S\n]+(?:\((F|SF|S)\))?[^\S\n]*(\d+)[^\S\n]+(.{45})(.*)[^\S\n]+([\d,]+\.\d{2})')
+    
+    @staticmethod
+    def parse_batch(sections: List[Tuple[str, str]]) -> List[list]:
+        """
+        Same rows as _parse for each (identifier, text) in sections (i.e. of many contracts), returned as one list of rows per section.
+        The texts are joined and scanned by a single multiline regex, so Python only loops over the item lines and not over every line.
+        As in _parse, the line right after an item line is the second line of its description, unless it's an item line itself.
+        """
+        text = '\n'.join(x for _, x in sections)
+        # end of each section, that is the position of the newline that joins it to the next one
+        ends = [x - 1 for x in accumulate(len(x) + 1 for _, x in sections)]
+        results = [[] for _ in sections]
+        matches = list(Items.BATCH_LINE_PATTERN.finditer(text))
+        j = 0
+        for k, match in enumerate(matches):
+            while match.start() > ends[j]:
+                j += 1
+            row = Items.Row()
+            row[IDENTIFIER] = sections[j][0]
+            row[ITEM_NUMBER] = match.group(1)
+            row[ITEM_FLAG] = match.group(2)
+            row[ITEM_CODE] = match.group(3)
+            row[ITEM_DESCRIPTION] = match.group(4).strip()
+            row[ITEM_DOLLAR_AMOUNT] = match.group(6)
+            
+            line_end = text.find('\n', match.end())
+            next_start = matches[k + 1].start() if k + 1 < len(matches) else -1
+            if line_end != -1 and line_end < ends[j] and next_start != line_end + 1:
+                next_end = text.find('\n', line_end + 1, ends[j])
+                row[ITEM_DESCRIPTION] += text[line_end + 1:ends[j] if next_end == -1 else next_end].strip()
+            results[j].append(row)
+        return results
+    
+    def _parse_sections(self, matches: list) -> list:
+        return [row for rows in Items.parse_batch([(self.identifier, x) for x in matches]) for row in rows]
+    
+    @classmethod
+    def extract_batch(cls, portions: List['Items']):
+        """
+        Extracts many Items portions (i.e. of all the contracts of a batch) with a single parse_batch, same result as portion.extract() for each.
+        """
+        sections, owners = [], []
+        for portion in portions:
+            for text in portion.preprocess(cls.NARROW_REGEX):
+                sections.append((portion.identifier, text))
+                owners.append(portion)
+        rows = {id(portion): [] for portion in portions}
+        for portion, section_rows in zip(owners, cls.parse_batch(sections)):
+            rows[id(portion)].extend(section_rows)
+        for portion in portions:
+            portion.set_rows(rows[id(portion)])
+    
     
-
-def get_next_line(i, lines):
-    i += 1
-    n = len(lines)
-    while i < n and lines[i].strip() == '':
-        i += 1
-    return i
-                            
 
 class Info2(ContractPortionBase):
     
@@ -418,37 +966,64 @@ class Info2(ContractPortionBase):
                CONTRACT_DATE, CONTRACT_NUMBER, TOTAL_NUMBER_OF_WORKING_DAYS, CONTRACT_ITEMS, 
                CONTRACT_DESCRIPTION, PERCENT_OVER_EST, PERCENT_UNDER_EST, ENGINEERS_EST, 
                AMOUNT_OVER, AMOUNT_UNDER, CONTRACT_CODE, ERROR]
+    ROW_FIELDS = [IDENTIFIER, POSTPONED_CONTRACT, BID_OPENING_DATE, CONTRACT_NUMBER, CONTRACT_DATE, CONTRACT_CODE, 
+                  CONTRACT_ITEMS, TOTAL_NUMBER_OF_WORKING_DAYS, NUMBER_OF_BIDDERS, ENGINEERS_EST, 
+                  AMOUNT_OVER_UNDER, PERCENT_OVER_UNDER_EST, CONTRACT_DESCRIPTION, ERROR]
         
     # narrow from the beginning of the file to the first occurrence of BID RANK or POSTPONED CONTRACT
     NARROW_REGEX = r'(?s)(^.*?(?:Bid Rank|Postponed Contract))'  # TODO find postponed contract in the example file
+    SECTION_START = None
+    SECTION_END = ('bid_rank', 'postponed')
+    
+    # column: (keyword, pattern), see Info.KEYWORD_FIELDS
+    KEYWORD_FIELDS = {
+        BID_OPENING_DATE: ('Bid Opening Date:', re.compile(r"Bid Opening Date:\s+(\d+\/\d+\/\d+)")),
+        CONTRACT_CODE: ('Contract Code:', re.compile(r"Contract Code:(.+)")),
+        CONTRACT_ITEMS: ('Number of Items:', re.compile(r"Number of Items:\s*(\d+)")),
+        TOTAL_NUMBER_OF_WORKING_DAYS: ('Total Number of Working Days: ', re.compile(r"Total Number of Working Days: \s*(\d+)")),
+        NUMBER_OF_BIDDERS: ('Number of Bidders:', re.compile(r"Number of Bidders:\s*(\d+)")),
+        ENGINEERS_EST: ('Engineers Est:', re.compile(r"Engineers Est:\s*([\d,]+\.\d{2})")),
+        AMOUNT_OVER_UNDER: ('Overrun/Underrun:', re.compile(r"Overrun\/Underrun:\s*(-?[\d,]+\.\d{2})")),
+        PERCENT_OVER_UNDER_EST: ('Over/Under Est:', re.compile(r"Over\/Under Est:\s*(-?[\d,]+\.\d{2})\%")),
+    }
+    NUMBER_AND_DATE_PATTERN = re.compile(r"Contract Number:\s*([\w-]+)\s+(\d+\/\d+\/\d+)")
+    # the part of r"(.+)Number of Items:\s+\d+\n\s*(.*)\n" after (.+), see _search_description
+    DESCRIPTION_TAIL_PATTERN = re.compile(r"Number of Items:\s+\d+\n\s*(.*)\n")
+    
+    @staticmethod
+    def _search_description(text: str):
+        r"""
+        Same as re.search(r"(.+)Number of Items:\s+\d+\n\s*(.*)\n", text).groups(), "" if there is no match.
+        (.+) is everything from the start of the line to the last "Number of Items:" of that line that the rest of the regex matches after,
+        on the first line that has one.
+        """
+        found = None
+        line_start = -1
+        position = text.find('Number of Items:')
+        while position != -1:
+            start = text.rfind('\n', 0, position) + 1
+            if found and start != line_start:
+                break
+            tail = Info2.DESCRIPTION_TAIL_PATTERN.match(text, position) if position > start else None
+            if tail:
+                found, line_start = (text[start:position], tail.group(1)), start
+            position = text.find('Number of Items:', position + 1)
+        return found or ""
     
     @staticmethod
     def _parse(text: str, identifier: str):
         
-        def _extract(regex, groups=(1,)):
-            # Search for the pattern in the text
-            match = re.search(regex, text)
-            if match:
-                if len(groups) == 1:
-                    return match.group(groups[0])
-                else:
-                    return (match.group(i) for i in groups)
-            else:
-                return ""
-        
-        row = defaultdict(str)
+        row = Info2.Row()
         row[IDENTIFIER] = identifier
-        row[POSTPONED_CONTRACT] = int(bool(_extract(r"(Postponed Contract)")))
-        row[BID_OPENING_DATE] = _extract(r"Bid Opening Date:\s+(\d+\/\d+\/\d+)")
-        row[CONTRACT_NUMBER], row[CONTRACT_DATE] = _extract(r"Contract Number:\s*([\w-]+)\s+(\d+\/\d+\/\d+)", (1, 2))
-        row[CONTRACT_CODE] = _extract(r"Contract Code:(.+)").strip()
-        row[CONTRACT_ITEMS] = _extract(r"Number of Items:\s*(\d+)")
-        row[TOTAL_NUMBER_OF_WORKING_DAYS] = _extract(r"Total Number of Working Days: \s*(\d+)")
-        row[NUMBER_OF_BIDDERS] = _extract(r"Number of Bidders:\s*(\d+)")
-        row[ENGINEERS_EST] = _extract(r"Engineers Est:\s*([\d,]+\.\d{2})")
-        row[AMOUNT_OVER_UNDER] = _extract(r"Overrun\/Underrun:\s*(-?[\d,]+\.\d{2})")
-        row[PERCENT_OVER_UNDER_EST] = _extract(r"Over\/Under Est:\s*(-?[\d,]+\.\d{2})\%")
-        contract_description, next_line = _extract(r"(.+)Number of Items:\s+\d+\n\s*(.*)\n", (1,2))
+        row[POSTPONED_CONTRACT] = int('Postponed Contract' in text)
+        number_and_date = search_keyword(text, 'Contract Number:', Info2.NUMBER_AND_DATE_PATTERN)
+        # a header without these fails here, like it always did (unpacking "")
+        row[CONTRACT_NUMBER], row[CONTRACT_DATE] = number_and_date.groups() if number_and_date else ""
+        for column, (keyword, pattern) in Info2.KEYWORD_FIELDS.items():
+            match = search_keyword(text, keyword, pattern)
+            row[column] = match.group(1) if match else ""
+        row[CONTRACT_CODE] = row[CONTRACT_CODE].strip()
+        contract_description, next_line = Info2._search_description(text)
         row[CONTRACT_DESCRIPTION] = contract_description.strip().rsplit("  ")[-1]  # this basically picks up everything before "Number of Items" until it hits 2 spaces
         if 'Federal Aid' not in next_line:
             # this is then a second line of the description
@@ -456,16 +1031,52 @@ class Info2(ContractPortionBase):
         
         processed_lines = [row]
         return processed_lines
+    
+    @staticmethod
+    def parse_batch(headers: List[Tuple[str, str]]) -> pd.DataFrame:
+        """
+        Same as Info.parse_batch. Headers that _parse fails on (no Contract Number or Number of Items line) are left out.
+        """
+        identifiers, texts = zip(*headers) if headers else ((), ())
+        texts = pd.Series(texts, dtype=object)
+        
+        def _extract(regex):
+            return texts.str.extract(regex).fillna('')
+        
+        number_and_date = texts.str.extract(Info2.NUMBER_AND_DATE_PATTERN.pattern)
+        description = texts.str.extract(r"(.+)" + Info2.DESCRIPTION_TAIL_PATTERN.pattern)
+        # everything before "Number of Items" until 2 spaces, and the next line if it's not the Federal Aid line
+        next_line = description[1].fillna('')
+        contract_description = description[0].fillna('').str.strip().str.rsplit('  ').str[-1]
+        contract_description = contract_description.where(next_line.str.contains('Federal Aid', regex=False), 
+                                                          contract_description + ' ' + next_line.str.strip())
+        columns = {
+            IDENTIFIER: list(identifiers),
+            POSTPONED_CONTRACT: texts.str.contains('Postponed Contract', regex=False).astype(int),
+            CONTRACT_NUMBER: number_and_date[0],
+            CONTRACT_DATE: number_and_date[1],
+            CONTRACT_DESCRIPTION: contract_description,
+        }
+        columns.update({column: _extract(pattern.pattern)[0] for column, (_, pattern) in Info2.KEYWORD_FIELDS.items()})
+        columns[CONTRACT_CODE] = columns[CONTRACT_CODE].str.strip()
+        df = pd.DataFrame(columns, index=texts.index)[[x for x in Info2.ROW_FIELDS if x in columns]]
+        return df[number_and_date[0].notna() & description[0].notna()]
 
 
 class Bids2(ContractPortionBase):
     
     NARROW_REGEX = r"(?s)Bid\s+Rank\s+Bid\s+Total\s+Bidder\s+Id\s+Bidder\s+Information\s+\(Name\/Address\/Location\)(.*?)(?=Contract\s+Proposal\s+of\s+Low\s+Bidder)"
+    SECTION_START = ('bid_rank', 'bid_rank_spaced')
+    SECTION_END = ('contract_proposal',)
     
     BIDS_FIRST_LINE_PATTERN = re.compile(r"(\d+)\s+(A\))?\s+(?:\$([\d,]+\.\d{2}))?\s+(\w+)\s+(.*?)(?=Phone|$)")
+    CSLB_LINE_PATTERN = re.compile(r"CSLB#\s*(\w+)(.*)?")
+    A_PLUS_B_LINE_PATTERN = re.compile(r".*(?:A\+B\)|A\+ADD\))\s+(?:\$([\d,]+\.\d{2}))?")
     
     COLUMNS = [IDENTIFIER, BID_RANK, A_PLUS_B_INDICATOR, BID_TOTAL, BIDDER_ID, 
                BIDDER_NAME, BIDDER_PHONE, EXTRA, CSLB_NUMBER, HAS_THIRD_ROW, CONTRACT_NOTES, ERROR]
+    ROW_FIELDS = [IDENTIFIER, BID_RANK, A_PLUS_B_INDICATOR, BID_TOTAL, BIDDER_ID, 
+                  BIDDER_NAME, HAS_THIRD_ROW, CSLB_NUMBER, CONTRACT_NOTES, ERROR]
     
     @staticmethod
     def _parse(text, identifier):
@@ -484,7 +1095,8 @@ class Bids2(ContractPortionBase):
         
         """
         bids_pattern = Bids2.BIDS_FIRST_LINE_PATTERN
-        lines = text.split('\n')
+        line_index = LineIndex(text)
+        lines = line_index.lines
         
         i = 0
         n = len(lines)
@@ -492,9 +1104,10 @@ class Bids2(ContractPortionBase):
         
         def find_next_bid(i, lines):
             while i < n:
-                match = re.match(bids_pattern, lines[i])
+                match = bids_pattern.match(lines[i])
                 if not match or (match and match.start(1) != 0):
-                    i += 1
+                    # a bid starts with its rank, blank lines are skipped
+                    i = line_index.next_line(i)
                 else:
                     break
             return i, match
@@ -503,7 +1116,7 @@ class Bids2(ContractPortionBase):
 
         # this is the first line now
         while i < n:
-            row = defaultdict(str)
+            row = Bids2.Row()
             row[IDENTIFIER] = identifier
             row[BID_RANK] = match.group(1)
             row[A_PLUS_B_INDICATOR] = 1 if match.group(2) else 0
@@ -513,35 +1126,35 @@ class Bids2(ContractPortionBase):
             
             name_starts = match.start(5)
             name_ends = match.end(5)
-            delta = name_ends - name_starts
+            extra_name_layout = FixedWidthLayout([name_starts])
             
             # moving onto the next line:    
-            i = get_next_line(i, lines)
+            i = line_index.next_line(i)
             
             name_lines_counter = 1
             while len(lines[i]) < name_ends:
                 name_lines_counter += 1
                 # this is the second/third etc. line of the bidder name
-                match_extra_name = re.match(rf"(?m)^.{{{name_starts}}}(.+)$", lines[i])
-                row[BIDDER_NAME] += ' ' + match_extra_name.group(1)  
-                i = get_next_line(i, lines)
+                extra_name, = extra_name_layout.split(lines[i])
+                row[BIDDER_NAME] += ' ' + extra_name
+                i = line_index.next_line(i)
                 if name_lines_counter == 3:
                     row[HAS_THIRD_ROW] = 1
                 elif name_lines_counter > 3: 
                     raise ValueError(f'For {identifier}, there are more then 3 lines.')
                     
-            match_cslb_line = re.search(r"CSLB#\s*(\w+)(.*)?", lines[i])
+            match_cslb_line = Bids2.CSLB_LINE_PATTERN.search(lines[i])
             if not match_cslb_line:
                 raise ValueError(f'For {identifier}, could not find CSLB line for BID_RANK number: {row[BID_RANK]}')
             
             row[CSLB_NUMBER] = match_cslb_line.group(1)
             row[CONTRACT_NOTES] = match_cslb_line.group(2).strip()
             
-            i = get_next_line(i, lines)
+            i = line_index.next_line(i)
             
             # if there is A) then there must be A+B here (or "A+ADD)"), if it's not there we raise an error
             if row[A_PLUS_B_INDICATOR]:
-                match_a_plus_b = re.match(r".*(?:A\+B\)|A\+ADD\))\s+(?:\$([\d,]+\.\d{2}))?", lines[i])
+                match_a_plus_b = Bids2.A_PLUS_B_LINE_PATTERN.match(lines[i])
                 if match_a_plus_b:
                     if match_a_plus_b.group(1):
                         row[BID_TOTAL] = match_a_plus_b.group(1)
@@ -561,9 +1174,13 @@ class Bids2(ContractPortionBase):
 class Subcontractors2(ContractPortionBase):
     
     COLUMNS = [IDENTIFIER, BIDDER_ID, SUBCONTRACTOR_NAME, SUBCONTRACTED_LINE_ITEM, CITY, SUBCONTRACTOR_LICENSE_NUMBER, ERROR]
+    ROW_FIELDS = [IDENTIFIER, BIDDER_ID, SUBCONTRACTOR_NAME, SUBCONTRACTED_LINE_ITEM, ITEM_NUMBERS, PERCENT, CITY, SUBCONTRACTOR_LICENSE_NUMBER_POST, 
+                  WRONG_INDENTATION, SUBCONTRACTOR_LICENSE_NUMBER_PRE, SUBCONTRACTOR_LICENSE_NUMBER, HAS_THIRD_ROW, ERROR]
     SUBCONTRACTORS_FIRST_LINE_REGEX = r"[^\S\r\n]*(BIDDER\s+ID)\s+(NAME\s+AND\s+ADDRESS)\s+(LICENSE\s+NUMBER)?\s+(DESCRIPTION\s+OF\s+PORTION\s+OF\s+WORK\s+SUBCONTRACTED)"
     
     NARROW_REGEX = r"(?sm)^([^\S\r\n]*BIDDER\s+ID\s+NAME\s+AND\s+ADDRESS\s+(?:LICENSE\s+NUMBER)?\s+DESCRIPTION\s+OF\s+PORTION\s+OF\s+WORK\s+SUBCONTRACTED)(.*?)(?=[^\S\r\n]*LIST\s+OF\s+SUBCONTRACTORS|\f|CONTINUED\s+ON\s+NEXT\s+PAGE)"
+    SECTION_START = ('subcontractors_header',)
+    SECTION_END = ('subcontractors_list', 'page_break', 'continued')
     
     @staticmethod
     def _parse(header_and_text, identifier):
@@ -573,33 +1190,33 @@ class Subcontractors2(ContractPortionBase):
         
         header, text = header_and_text
         r = re.match(Subcontractors2.SUBCONTRACTORS_FIRST_LINE_REGEX, header)
-        lines = text.split('\n')
+        line_index = LineIndex(text)
+        lines = line_index.lines
         
-        start0 = r.start(1)
-        delta1 = r.start(2) - r.start(1)
-        delta2 = r.start(4) - r.start(2)  # see testing/data_type_2/test_subcontractors_input.txt for some long names
+        # bidder id, name and address, rest of the line (see testing/data_type_2/test_subcontractors_input.txt for some long names)
+        layout = FixedWidthLayout([r.start(1), r.start(2), r.start(4)])
         i = 0
         processed_lines = []
         row = None
         while i < len(lines):
             line = lines[i]
-            match = re.match(rf"^.{{{start0}}}(.{{{delta1}}})(.{{{delta2}}})(.+)$", line)
-            if match and match.group(1).strip() == '' and match.group(2).strip() == '' and match.group(3).strip() != '':
+            columns = layout.split(line)
+            if columns and columns[0].strip() == '' and columns[1].strip() == '' and columns[2].strip() != '':
                 # this means we have a third row
                 row[HAS_THIRD_ROW] = 1
-                row[SUBCONTRACTED_LINE_ITEM] += ' ' + match.group(3).strip()
+                row[SUBCONTRACTED_LINE_ITEM] += ' ' + columns[2].strip()
                 processed_lines.append(row)
-            elif match:  
+            elif columns:  
                 # this means we have a first row
                 if row:
                     # save the previous row
                     processed_lines.append(row)
-                row = defaultdict(str)
+                row = Subcontractors2.Row()
                 row[IDENTIFIER] = identifier
                 
-                row[BIDDER_ID] = match.group(1).strip()
-                row[SUBCONTRACTOR_NAME] = match.group(2).strip()
-                row[SUBCONTRACTED_LINE_ITEM] = match.group(3)
+                row[BIDDER_ID] = columns[0].strip()
+                row[SUBCONTRACTOR_NAME] = columns[1].strip()
+                row[SUBCONTRACTED_LINE_ITEM] = columns[2]
                 
                 if not any([x in row[SUBCONTRACTED_LINE_ITEM] for x in ("PER BID ITEM", "WORK AS DESCRIBED BY BID ITEM(S) LISTED")]):
                     # attempt parsing
@@ -609,7 +1226,7 @@ class Subcontractors2(ContractPortionBase):
                         if matches3.group(2):
                             row[PERCENT] = matches3.group(2).replace("%", "")
                 
-                i = get_next_line(i, lines)
+                i = line_index.next_line(i)
                 line = lines[i]
                     
                 if r.group(3) is not None:  # there is a LICENSE NUMBER column
@@ -675,8 +1292,12 @@ class Subcontractors2(ContractPortionBase):
 class Items2(ContractPortionBase):
     
     COLUMNS = [ITEM_NUMBER, ITEM_FLAG, ITEM_CODE, ITEM_DESCRIPTION, EXTRA2, ITEM_DOLLAR_AMOUNT, ERROR]
+    ROW_FIELDS = [IDENTIFIER, ITEM_NUMBER, ITEM_FLAG, ITEM_CODE, ITEM_DESCRIPTION, EXTRA2, ITEM_DOLLAR_AMOUNT, ERROR]
     
     NARROW_REGEX = r"(?s)Contract\s+Proposal\s+of\s+Low\s+Bidder(.*?)(?=Contract\s+Proposal\s+of\s+Low\s+Bidder|\f|CONTINUED\s+ON\s+NEXT\s+PAGE)"
+    SECTION_START = ('contract_proposal',)
+    SECTION_END = ('contract_proposal', 'page_break', 'continued')
+    ITEM_FIRST_LINE_PATTERN = re.compile(r'^\s*(\d+)\s+(?:(F|SF|S))?\s*(\d+)\s+(.+)')
     
     @staticmethod
     def _parse(text: str, identifier: str):
@@ -684,17 +1305,18 @@ class Items2(ContractPortionBase):
         Parses a table from a text line by line.
         """
         
-        lines = text.split('\n')
+        line_index = LineIndex(text)
+        lines = line_index.lines
         
-        i =  get_next_line(0, lines)
+        i =  line_index.next_line(0)
         
         header = lines[i]
         match = re.match(r'.*(Unit).*(Amount)', header)
         start_unit = match.start(1)
         start_amount = match.start(2)
-        delta_amount_to_unit = start_amount - start_unit
+        layouts = {}  # one layout per start of the item description, those are few per section
 
-        i =  get_next_line(i, lines)
+        i =  line_index.next_line(i)
         
         n = len(lines)
         processed_lines = []
@@ -702,7 +1324,7 @@ class Items2(ContractPortionBase):
         first_line = False
         while i < n:
             line = lines[i]
-            match1 = re.match(r'^\s*(\d+)\s+(?:(F|SF|S))?\s*(\d+)\s+(.+)', line)  # collects until ITEM DESCRIPTION
+            match1 = Items2.ITEM_FIRST_LINE_PATTERN.match(line)  # collects until ITEM DESCRIPTION
             if match1:
                 # this mean we hit the first line, lets parse it and save it
                 # but first we need to save any previous line to precessed_lines
@@ -710,15 +1332,17 @@ class Items2(ContractPortionBase):
                     processed_lines.append(row)
                 
                 start_item_description = match1.start(4)
+                if start_item_description not in layouts:
+                    layouts[start_item_description] = FixedWidthLayout([start_item_description, start_unit, start_amount], tail_required=False)
                 # collects Item Description, Extra, Item Dollar Amount
-                match2 = re.match(rf'^.{{{start_item_description}}}(.{{{start_unit - start_item_description}}}).{{{delta_amount_to_unit}}}(.*)$', line)
-                row = defaultdict(str)
+                item_description, _, item_dollar_amount = layouts[start_item_description].split(line)
+                row = Items2.Row()
                 row[IDENTIFIER] = identifier
                 row[ITEM_NUMBER] = match1.group(1)
                 row[ITEM_FLAG] = match1.group(2)
                 row[ITEM_CODE] = match1.group(3)
-                row[ITEM_DESCRIPTION] = match2.group(1).strip()
-                row[ITEM_DOLLAR_AMOUNT] = match2.group(2)
+                row[ITEM_DESCRIPTION] = item_description.strip()
+                row[ITEM_DOLLAR_AMOUNT] = item_dollar_amount
                 first_line = True
             elif row and first_line:
                 # this means we might have a second line, lets parse it 
@@ -726,7 +1350,7 @@ class Items2(ContractPortionBase):
                     line = line[start_item_description:start_unit]  # we don't need any extra text
                 row[ITEM_DESCRIPTION] += ' ' + line.strip()
                 first_line = False
-            i = get_next_line(i, lines)
+            i = line_index.next_line(i)
         
         # save the last line
         if row:
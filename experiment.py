@@ -1,15 +1,34 @@
 import random
 from typing import List, Tuple, Dict
 import shutil
-from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from multiprocessing import Pipe, Process
+from multiprocessing.connection import wait
+from functools import partial
+from collections import deque
+from contextlib import nullcontext
+from itertools import islice
 from datetime import datetime
 from pathlib import Path
+import mmap
+import os
 import re
+import time
+import cProfile
+import json
+import pstats
 from tqdm import tqdm
 import pandas as pd
 
 from constants import *
-from contract import Contract, split_contract, read_file
+from contract import (Contract, ContractRecord, Info, Info2, Items, decode, split_contract_positions, read_file, map_file, bytes_regex,
+                      read_contract, iter_split_contract)
+from writers import StreamingWriter, TABLE_NAMES, csv_to_parquet, csv_to_excel
+from joins import write_subcontracted_items
+from cache import ResultCache
+from store import ResultStore
+from rows import rows_to_frame
+from profiling import StageTimer, NULL_TIMER, write_profile_report, print_profile_report
 
 
 def parse_filename(filename:str) -> Tuple[str, str]:
@@ -27,10 +46,131 @@ def check_lineprinter_table_files():
     assert [x.name for x in filepaths_lineprinter] == [x.name for x in filepaths_table]
     
     
-def sort_contracts():
+CONTRACT_NUMBER_REGEX = r"CONTRACT NUMBER\s+([A-Za-z0-9-]+)"
+CONTRACT_NUMBER_PATTERN_BYTES = bytes_regex(CONTRACT_NUMBER_REGEX)
+CONTRACT_NUMBER_LITERAL = b'CONTRACT NUMBER'
+TRAILING_SPACE_PATTERN_BYTES = bytes_regex(r'\s*')
+CONTRACT_NUMBER_TOKEN_PATTERN_BYTES = re.compile(rb'[A-Za-z0-9-]*')
+
+# classify_file reads the first CLASSIFY_PREFIX bytes of a file, and CLASSIFY_CHUNK_SIZE at a time after that if still undecided
+CLASSIFY_PREFIX = 1 << 16
+CLASSIFY_CHUNK_SIZE = 1 << 20
+# threads reading ahead in serial runs (see Experiment prefetch), reading is I/O bound so a few are enough
+PREFETCH_THREADS = 4
+
+
+def classify_file(filepath: Path, limit: int = 2) -> Tuple[int, int]:
+    """
+    Counts the CONTRACT_NUMBER_REGEX matches in a raw file, reading it from the start and stopping as soon as limit matches are found,
+    i.e. a multi-contract document is known to be one after its second contract header. 
+    Files with fewer matches (single contracts, type 2) have to be read to the end, in chunks and without decoding.
+    Returns (number of matches, at most limit; bytes read). The count is the same as len(re.findall(CONTRACT_NUMBER_REGEX, read_file(filepath))) up to limit.
+    """
+    matches = bytes_read = 0
+    buffer = b''
+    in_token = False  # the last match reached the end of the chunk, its contract number may go on in the next one
+    with open(filepath, 'rb') as file:
+        chunk = file.read(CLASSIFY_PREFIX)
+        while chunk:
+            bytes_read += len(chunk)
+            if in_token:
+                # the contract number is greedy, it can take the start of what follows (even the next CONTRACT of a CONTRACT NUMBER)
+                skip = CONTRACT_NUMBER_TOKEN_PATTERN_BYTES.match(chunk).end()
+                in_token = skip == len(chunk)
+                chunk = chunk[skip:]
+            buffer += chunk
+            end = 0
+            for match in CONTRACT_NUMBER_PATTERN_BYTES.finditer(buffer):
+                matches += 1
+                end = match.end()
+                if matches == limit:
+                    return matches, bytes_read
+            if end and end == len(buffer):
+                in_token = True
+            # carry over what could still become a match: a split literal, or a literal followed only by whitespace so far
+            carry = max(end, len(buffer) - len(CONTRACT_NUMBER_LITERAL) + 1)
+            candidate = buffer.rfind(CONTRACT_NUMBER_LITERAL, end)
+            if candidate != -1 and TRAILING_SPACE_PATTERN_BYTES.match(buffer, candidate + len(CONTRACT_NUMBER_LITERAL)).end() == len(buffer):
+                carry = min(carry, candidate)
+            buffer = buffer[carry:]
+            chunk = file.read(CLASSIFY_CHUNK_SIZE)
+    return matches, bytes_read
+
+
+def _sort_file(filepath: Path, index: int, mapped: bool = False, virtual: bool = False) -> Tuple[List[Tuple[str, int, ContractRecord | None]], dict]:
+    """
+    Classifies (see classify_file) and splits a single raw file for sort_contracts, can run in a worker process. 
+    Returns its contracts in order as (identifier, contract type, record), record only with virtual=True, and a row for the classification report.
+    Contracts are written to SORTED_DATA_PATH / _sorted_tmp_name(identifier, index), sort_contracts then keeps the first of duplicated 
+    identifiers (files are done in any order by the workers, but duplicates must be resolved in the order of the files).
+    """
+    destination_path = SORTED_DATA_PATH
+    tag = filepath.stem.split('_')[-1]
+    
+    matches, bytes_read = classify_file(filepath)
+    size = filepath.stat().st_size
+    report = {FILENAME: filepath.stem, CLASSIFICATION: ('type2', 'single', 'multiple')[matches], BYTES_READ: bytes_read, FILE_SIZE: size}
+    
+    contracts = []
+    if matches == 1:
+        # single contract files
+        identifier = 't1_' + tag
+        if virtual:
+            contracts.append((identifier, 1, ContractRecord(identifier, 1, str(filepath), 0, size, False)))
+        else:
+            shutil.copy(filepath.parent / filepath.name, destination_path / _sorted_tmp_name(identifier, index))
+            contracts.append((identifier, 1, None))
+    
+    elif matches > 1:
+        # these are multiple contract files, partial texts are written one at a time (see iter_split_contract), not all kept in memory
+        if virtual:
+            # the file has contracts, so it is not empty and can be mapped; the mapping is only needed to find the positions
+            with map_file(filepath) as contents:
+                splits = split_contract_positions(contents, tag).items()
+        else:
+            splits = iter_split_contract(filepath, tag, binary=mapped)
+        for key, new_file_contents in splits:
+            identifier = 't1_' + key
+            if virtual:
+                start, end = new_file_contents
+                contracts.append((identifier, 1, ContractRecord(identifier, 1, str(filepath), start, end, True)))
+            else:
+                with open(destination_path / _sorted_tmp_name(identifier, index), 'wb' if mapped else 'w') as output_file:
+                    output_file.write(new_file_contents)
+                contracts.append((identifier, 1, None))
+    
+    elif matches == 0:
+        # these are type2 contracts
+        identifier = 't2_' + tag
+        if virtual:
+            source_path = RAW_DATA_PATH_TABLE / filepath.name
+            contracts.append((identifier, 2, ContractRecord(identifier, 2, str(source_path), 0, source_path.stat().st_size, False)))
+        else:
+            shutil.copy(RAW_DATA_PATH_TABLE / filepath.name, destination_path / _sorted_tmp_name(identifier, index))
+            contracts.append((identifier, 2, None))
+    return contracts, report
+
+
+def _sorted_tmp_name(identifier: str, index: int) -> str:
+    # hidden, so get_contract_filepaths never picks up the leftovers of an interrupted run
+    return f'.{identifier}.{index}.tmp'
+
+
+def sort_contracts(mapped: bool = False, virtual: bool = False, workers: int = 1):
     """
     Goes through all the files and sorts them accordingly into 3 types. Saves contract types and other info to a CSV file.
+    
+    Files are classified by reading them as bytes, only as far as needed (see classify_file).
+    With mapped=True multi-contract documents are split as bytes (memory-mapped), split contracts are written without decoding.
+    With virtual=True nothing is copied to sorted_data, only the index of where each contract is in the raw files 
+    (CONTRACT_INDEX_PATH, see ContractRecord and get_contract_records). Implies mapped=True since the index has byte offsets.
+    With workers > 1 files are classified, split and copied in a pool of worker processes, 
+    duplicated identifiers are still resolved in the order of the files so the results are the same as with workers=1.
+    How each file was classified and how much of it had to be read for that is saved to classification.csv (see classify_file).
     """
+    if workers < 1:
+        raise ValueError('workers must be at least 1.')
+    mapped = mapped or virtual
     check_lineprinter_table_files()
 
     filepaths_lineprinter = list(RAW_DATA_PATH_LINEPRINTER.glob('*.txt'))
@@ -44,82 +184,60 @@ def sort_contracts():
     
     destination_path.mkdir(exist_ok=True, parents=True) 
 
-    contract_number_regex = re.compile(r"CONTRACT NUMBER\s+([A-Za-z0-9-]+)")
-
     contract_types = []
+    records = []
+    classification = []
     
     cache = set()
     
-    for filepath in tqdm(filepaths):
-        row = defaultdict(str)
-        
-        filestem = filepath.stem
-        row[FILENAME] = filestem
-        
-        tag = filestem.split('_')[-1]
-        row[TAG] = tag
+    sort_file = partial(_sort_file, mapped=mapped, virtual=virtual)
+    with ProcessPoolExecutor(max_workers=workers) if workers > 1 else nullcontext() as executor:
+        if executor:
+            chunksize = max(1, min(100, len(filepaths) // (4 * workers)))
+            results = executor.map(sort_file, filepaths, range(len(filepaths)), chunksize=chunksize)
+        else:
+            results = map(sort_file, filepaths, range(len(filepaths)))
         
-        file_contents = read_file(filepath)
-        matches = re.findall(contract_number_regex, file_contents)
-
-        if len(matches) == 1:
-            # single contract files
-            row[IDENTIFIER] = 't1_' + tag
-            row[CONTRACT_TYPE] = 1
-            if row[IDENTIFIER] in cache:
-                print(f'Duplicated identifier: {row[IDENTIFIER]}.')
-                continue
-            cache.add(row[IDENTIFIER])
-            if row[IDENTIFIER].strip() == '':
-                print(f'Empty identifier: {row[IDENTIFIER]}.')
-
-            shutil.copy(filepath.parent / filepath.name, destination_path / (row[IDENTIFIER] + '.txt'))
-            contract_types.append(row)
-            
-        elif len(matches) > 1:
-            # these are multiple contract files
-            for key, new_file_contents in split_contract(file_contents, tag).items():
-                identifier = 't1_' + key
+        for index, (filepath, (contracts, report)) in enumerate(zip(tqdm(filepaths), results)):
+            classification.append(report)
+            for identifier, contract_type, record in contracts:
+                tmp_path = destination_path / _sorted_tmp_name(identifier, index)
                 if identifier in cache:
                     print(f'Duplicated identifier: {identifier}.')
+                    if not virtual:
+                        tmp_path.unlink()
                     continue
-                cache.add(identifier)
-                
-                new_row = row.copy()
-                
-                new_row[IDENTIFIER] = identifier        
-                new_row[CONTRACT_TYPE] = 1
-                
+                # type 2 identifiers were never added, kept that way so that the results don't change
+                if contract_type == 1:
+                    cache.add(identifier)
                 if identifier.strip() == '':
-                    print(f'Empty identifier: {row[IDENTIFIER]}.')
- 
-                with open(destination_path / (new_row[IDENTIFIER] + '.txt'), 'w') as output_file:
-                    output_file.write(new_file_contents)
+                    print(f'Empty identifier: {identifier}.')
                 
-                contract_types.append(new_row)
-        
-        elif len(matches) == 0:
-            # these are type2 contracts
-            row[IDENTIFIER] = 't2_' + tag
-            row[CONTRACT_TYPE] = 2
-            
-            if row[IDENTIFIER] in cache:
-                print(f'Duplicated identifier: {row[IDENTIFIER]}.')
-                continue
-            
-            if row[IDENTIFIER].strip() == '':
-                print(f'Empty identifier: {row[IDENTIFIER]}.')
-            shutil.copy(RAW_DATA_PATH_TABLE / filepath.name, destination_path / (row[IDENTIFIER] + '.txt'))
-            contract_types.append(row)
+                if virtual:
+                    records.append(record)
+                else:
+                    os.replace(tmp_path, destination_path / (identifier + '.txt'))
+                contract_types.append({FILENAME: filepath.stem, TAG: filepath.stem.split('_')[-1], IDENTIFIER: identifier, CONTRACT_TYPE: contract_type})
+
+    if virtual:
+        df = pd.DataFrame(records, columns=ContractRecord._fields)
+        df.columns = [IDENTIFIER, CONTRACT_TYPE, SOURCE_PATH, BYTE_START, BYTE_END, SPLIT]
+        df.to_csv(CONTRACT_INDEX_PATH, index=False)
 
     df = pd.DataFrame(contract_types)
     df.set_index('Filename', inplace=True)
     RESULTS_PATH.mkdir(exist_ok=True, parents=True)
     contract_types_path = RESULTS_PATH / 'contract_types.csv'
     df.to_csv(contract_types_path, index=True)
+    df = pd.DataFrame(classification, columns=[FILENAME, CLASSIFICATION, BYTES_READ, FILE_SIZE])
+    df.to_csv(RESULTS_PATH / 'classification.csv', index=False)
     
-    print(f'Saved contracts to {destination_path}.')
+    if virtual:
+        print(f'Saved contract index to {CONTRACT_INDEX_PATH}.')
+    else:
+        print(f'Saved contracts to {destination_path}.')
     print(f"Generated {contract_types_path} (not used in the code).")
+    print(f"Classification read {df[BYTES_READ].sum() / 1e6:.1f} of {df[FILE_SIZE].sum() / 1e6:.1f} MB, see {RESULTS_PATH / 'classification.csv'}.")
     
 
 def get_contract_types() -> Tuple[pd.DataFrame, Dict[str, int]]:
@@ -149,17 +267,272 @@ def get_contract_filepaths(contract_type: int, num_contracts=None, seed=42) -> L
     return filepaths
 
 
+def load_contract_index() -> Dict[str, ContractRecord]:
+    """
+    Reads the index made by sort_contracts(virtual=True), returns a dict: identifier: ContractRecord.
+    """
+    df = pd.read_csv(CONTRACT_INDEX_PATH, dtype={IDENTIFIER: str, SOURCE_PATH: str})
+    return {row[0]: ContractRecord(row[0], int(row[1]), row[2], int(row[3]), int(row[4]), bool(row[5])) 
+            for row in df[[IDENTIFIER, CONTRACT_TYPE, SOURCE_PATH, BYTE_START, BYTE_END, SPLIT]].itertuples(index=False)}
+
+
+def get_contract_records(contract_type: int, num_contracts=None, seed=42) -> List[ContractRecord]:
+    """
+    Same as get_contract_filepaths but for the index made by sort_contracts(virtual=True), 
+    the records can be passed to Experiment in place of filepaths.
+    """
+    if contract_type not in (1, 2):
+        raise ValueError('contract_type must be 1 or 2.')
+    records = [x for x in load_contract_index().values() if x.contract_type == contract_type]
+    
+    if seed:
+        random.seed(seed)
+    if num_contracts:
+        records = random.sample(records, num_contracts)
+    return records
+
+
+def extract_info(filepaths: List[Path] | List[ContractRecord], mapped: bool = False) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """
+    Extracts only the Info table of all the contracts in filepaths, a lot faster than an Experiment when that is all you need: 
+    each file is only narrowed down to its header (Info.NARROW_REGEX, no SectionIndex and no other portions) 
+    and then all the headers are parsed at once, field by field (see Info.parse_batch and Info2.parse_batch).
+    Returns the Info and Errors tables, with the same rows as an Experiment would give (in the order of filepaths).
+    """
+    narrow_regexes = {'t1': Info.NARROW_REGEX, 't2': Info2.NARROW_REGEX}
+    if mapped:
+        narrow_regexes = {key: bytes_regex(value) for key, value in narrow_regexes.items()}
+    else:
+        narrow_regexes = {key: re.compile(value) for key, value in narrow_regexes.items()}
+    
+    headers = {'t1': [], 't2': []}  # contract type: (identifier, header)
+    positions = {'t1': [], 't2': []}  # contract type: index in filepaths
+    errors = {}
+    for i, filepath in enumerate(tqdm(filepaths)):
+        contract_type = filepath.stem[:2]
+        identifier = filepath.stem[3:]
+        try:
+            if contract_type not in narrow_regexes:
+                raise ValueError(f"Contract type {contract_type} is not supported")
+            if isinstance(filepath, ContractRecord):
+                contents = filepath.read(mapped=mapped)
+            else:
+                contents = map_file(filepath) if mapped else read_file(filepath)
+            # the mapping is closed once the header is copied out of it
+            with contents if isinstance(contents, mmap.mmap) else nullcontext():
+                match = narrow_regexes[contract_type].search(contents)
+                if match is None:
+                    raise ValueError(f"Failed to extract basic info for {identifier}")
+                header = decode(match.group(1)) if mapped else match.group(1)
+        except Exception as e:
+            errors[i] = {IDENTIFIER: filepath.stem, ERROR: str(e), CONTRACT_TYPE: contract_type}
+            continue
+        headers[contract_type].append((identifier, header))
+        positions[contract_type].append(i)
+    
+    frames = []
+    for contract_type, portion in (('t1', Info), ('t2', Info2)):
+        df = portion.parse_batch(headers[contract_type])
+        # headers the batch could not parse go through _parse, for the same error as a single contract
+        for j in sorted(set(range(len(headers[contract_type]))) - set(df.index)):
+            identifier, header = headers[contract_type][j]
+            i = positions[contract_type][j]
+            try:
+                portion._parse(header, identifier)
+            except Exception as e:
+                errors[i] = {IDENTIFIER: filepaths[i].stem, ERROR: str(e), CONTRACT_TYPE: contract_type}
+        if len(df):
+            df.index = [positions[contract_type][j] for j in df.index]
+            frames.append(df)
+    
+    # columns in the order of first appearance, as with rows of both contract types in one table
+    frames.sort(key=lambda df: df.index.min())
+    info = pd.concat(frames, sort=False).sort_index().reset_index(drop=True) if frames else pd.DataFrame()
+    errors = pd.DataFrame([errors[i] for i in sorted(errors)])
+    return info, errors
+
+
+def process_contract(filepath: Path | ContractRecord, mapped: bool = False, cache: ResultCache | None = None, 
+                     profile: bool = False, contents=None, defer_items: bool = False) -> Tuple[Contract | None, Dict[str, list], Dict[str, int]]:
+    """
+    Extracts a single contract and returns the contract together with its rows, keyed by table name, and stats (i.e. cache hits/misses).
+    With profile=True stats also has the wall time of the whole contract ('total') and of each stage ('times', 'counts', see profiling.StageTimer).
+    contents is the already read text of the contract (see read_ahead), None to read it here.
+    With defer_items=True type 1 Items are left to the caller, tables['Items'] is then None (see process_contracts).
+    Any exception is caught and returned as an Errors row, so this can also run in a worker process.
+    """
+    contract_type = filepath.stem[:2]
+    tables = {'Info': [], 'Bids': [], 'Subcontractors': [], 'Items': [], 'Errors': []}
+    stats = {}
+    contract = None
+    hits, misses = (cache.hits, cache.misses) if cache else (0, 0)
+    timer = StageTimer() if profile else NULL_TIMER
+    start = time.perf_counter()
+    try:
+        record = filepath if isinstance(filepath, ContractRecord) else None
+        contract = Contract(filepath.stem, mapped=mapped, record=record, timer=timer, contents=contents)
+        contract.extract(cache=cache, defer_items=defer_items)
+    except Exception as e:
+        tables['Errors'].append({CONTRACT_TYPE: contract_type, IDENTIFIER: filepath.stem, ERROR: str(e)})
+    else:
+        tables['Info'] = contract.info.rows
+        if not contract.postponed: 
+            tables['Subcontractors'] = contract.subcontractors.rows
+            tables['Bids'] = contract.bids.rows
+            tables['Items'] = contract.items.rows
+    
+    if cache:
+        stats['cache_hits'] = cache.hits - hits
+        stats['cache_misses'] = cache.misses - misses
+    if profile:
+        stats['total'] = time.perf_counter() - start
+        stats['times'] = dict(timer.times)
+        stats['counts'] = dict(timer.counts)
+    return contract, tables, stats
+
+
+def process_contracts(contracts: List[Tuple[Path | ContractRecord, object]], mapped: bool = False, cache: ResultCache | None = None, 
+                      profile: bool = False) -> List[Tuple[Contract | None, Dict[str, list], Dict[str, int]]]:
+    """
+    Same as process_contract for each (filepath, contents) in contracts, but the type 1 Items tables of all of them are parsed 
+    at once with a single scan (see Items.extract_batch), instead of contract by contract. Items of a contract come from the cache as usual.
+    If the batch fails, its contracts are parsed one by one, so that the error ends up in Errors of the contract that caused it.
+    With profile=True the time of the batch is not in the stats of the contracts.
+    """
+    results = [process_contract(filepath, mapped=mapped, cache=cache, profile=profile, contents=contents, defer_items=True) 
+               for filepath, contents in contracts]
+    deferred = [(contract, tables) for contract, tables, _ in results if tables['Items'] is None]
+    try:
+        Items.extract_batch([contract.items for contract, _ in deferred])
+    except Exception:
+        for contract, _ in deferred:
+            contract.items.rows = None
+    for (filepath, _), (contract, tables, _) in zip(contracts, results):
+        if tables['Items'] is not None:
+            continue
+        try:
+            if contract.items.rows is None:
+                contract.items.extract()
+        except Exception as e:
+            for name in tables:
+                tables[name] = []
+            tables['Errors'].append({CONTRACT_TYPE: filepath.stem[:2], IDENTIFIER: filepath.stem, ERROR: str(e)})
+            continue
+        if cache:
+            cache.put(contract.content_hash, contract.items, contract.items.rows)
+        tables['Items'] = contract.items.rows
+    return results
+
+
+def read_ahead(filepath: Path | ContractRecord, mapped: bool = False) -> str | mmap.mmap | bytes:
+    """
+    Reads a contract for process_contract(contents=...), runs on the prefetch threads of an Experiment.
+    A memory-mapped file is only read when its pages are touched, so the kernel is asked to read it in right away.
+    """
+    record = filepath if isinstance(filepath, ContractRecord) else None
+    contents = read_contract(filepath.stem, mapped=mapped, record=record)
+    if isinstance(contents, mmap.mmap) and hasattr(mmap, 'MADV_WILLNEED'):
+        contents.madvise(mmap.MADV_WILLNEED)
+    return contents
+
+
+_worker_caches = {}
+
+
+def _process_contract_in_worker(filepath: Path | ContractRecord, mapped: bool = False, cache_path: Path | None = None, 
+                                profile: bool = False) -> Tuple[Dict[str, list], Dict[str, int]]:
+    # Contract objects are not sent back from worker processes, rows are all we need
+    cache = None
+    if cache_path is not None:
+        # one cache per worker process, so parser fingerprints are computed only once
+        if cache_path not in _worker_caches:
+            _worker_caches[cache_path] = ResultCache(cache_path)
+        cache = _worker_caches[cache_path]
+    _, tables, stats = process_contract(filepath, mapped=mapped, cache=cache, profile=profile)
+    return tables, stats
+
+
+def _watchdog_worker(connection, mapped: bool = False, cache_path: Path | None = None, profile: bool = False):
+    # receives one contract at a time, so the watchdog always knows what each worker is doing and since when
+    while True:
+        filepath = connection.recv()
+        if filepath is None:
+            break
+        connection.send(_process_contract_in_worker(filepath, mapped=mapped, cache_path=cache_path, profile=profile))
+
+
+def _failed_contract(filepath: Path | ContractRecord, error: Exception, seconds: float) -> Tuple[Dict[str, list], Dict[str, int]]:
+    # same tables as process_contract returns when extraction raises
+    tables = {'Info': [], 'Bids': [], 'Subcontractors': [], 'Items': [], 'Errors': []}
+    tables['Errors'].append({CONTRACT_TYPE: filepath.stem[:2], IDENTIFIER: filepath.stem, ERROR: error})
+    return tables, {'total': seconds, 'times': {}, 'counts': {}}
+
+
 class Experiment:
     """
     Run extraction on contracts provided in filepaths.
     The results will be saved in a folder results using timestamp.
+    
+    Use workers > 1 to extract contracts in a pool of worker processes, results are merged back in the order of filepaths 
+    so the output is identical to a serial run.
+    Use mapped=True to read contracts with memory-mapping (see contract.map_file).
+    Use stream=True to write rows to the CSV files in chunks of chunk_size rows while running (see writers.StreamingWriter), 
+    instead of keeping all the rows in memory until the end, results.xlsx is then made from the CSV files.
+    Use excel=False to only write the CSV files and skip results.xlsx, the slowest part of writing, 
+    it can be made later from the CSV files with writers.csv_to_excel (or python writers.py <results folder>).
+    Use parquet=True to also write typed <name>.parquet files (amounts in integer cents, real dates, see writers.to_typed), requires pyarrow.
+    Use store=True (or a path to the database) to also insert the rows into a SQLite database shared by all experiments, 
+    with indexes for lookups by identifier, contract number, bidder ID, CSLB number and item code (see store.ResultStore).
+    Use subcontracted_items=True to also write Subcontracted_Items.csv, the subcontractors joined with the items they cover (see joins.subcontracted_items).
+    Use cache=True (or a path to the cache folder) to reuse results of unchanged contracts and parsers from previous runs (see cache.ResultCache).
+    filepaths can also be records from get_contract_records, contracts are then read directly from the raw files (see sort_contracts(virtual=True)).
+    Use timeout (seconds) to give every contract a time budget: contracts are then extracted in watchdog worker processes (workers of them, 
+    also when workers=1) and a worker that goes over the budget is killed and replaced, the contract ends up in Errors and outliers like any other failure.
+    Use profile=True to time every stage of every contract (reading, narrowing, parsing, DataFrames, cache) and the writing of the results,
+    the report is saved to profile.json and slowest_contracts.csv (see profiling.write_profile_report).
+    Use cprofile=True to also run cProfile and save the stats to profile.pstats (open with pstats or snakeviz), 
+    with workers > 1 it only sees the main process, that is the merging and writing.
+    Use prefetch (number of contracts) to read the next contracts on a pool of threads while the current one is parsed, 
+    and to copy the outliers in the background, so reading overlaps with parsing (helps on network or cold storage). 
+    Only used in serial runs, worker processes already read and parse side by side.
+    Use items_batch (number of contracts) to parse the type 1 item tables of that many contracts at once, with a single regex scan 
+    over all of them (see process_contracts and Items.extract_batch). Only used in serial runs, the results are the same.
     """
     
-    def __init__(self, filepaths: str | List[Path]):
+    def __init__(self, filepaths: str | List[Path] | List[ContractRecord], workers: int = 1, mapped: bool = False, stream: bool = False, chunk_size: int = 10000, 
+                 parquet: bool = False, cache: bool | Path = False, profile: bool = False, cprofile: bool = False, timeout: float | None = None,
+                 prefetch: int = 0, subcontracted_items: bool = False, store: bool | Path = False, excel: bool = True, items_batch: int = 0):
         if isinstance(filepaths, str):
             self.filepaths = [Path(SORTED_DATA_PATH / (filepaths + '.txt'))]
         else:
             self.filepaths = filepaths
+        
+        if workers < 1:
+            raise ValueError('workers must be at least 1.')
+        self.workers = workers
+        self.mapped = mapped
+        self.stream = stream
+        self.chunk_size = chunk_size
+        self.parquet = parquet
+        if cache is True:
+            cache = CACHE_PATH
+        self.cache_path = Path(cache) if cache else None
+        self.profile = profile
+        self.cprofile = cprofile
+        if timeout is not None and timeout <= 0:
+            raise ValueError('timeout must be positive.')
+        self.timeout = timeout
+        if prefetch < 0:
+            raise ValueError('prefetch must not be negative.')
+        self.prefetch = prefetch
+        if items_batch < 0:
+            raise ValueError('items_batch must not be negative.')
+        self.items_batch = items_batch
+        self.subcontracted_items = subcontracted_items
+        if store is True:
+            store = STORE_PATH
+        self.store_path = Path(store) if store else None
+        self.excel = excel
             
         self.timestamp = datetime.strftime(datetime.now(), '%m-%d-%Y-%H:%M:%S')
         self.make_results_path()
@@ -186,11 +559,142 @@ class Experiment:
         
         # Create the results folders
         self.results_path.mkdir(exist_ok=True, parents=True)
+        
+    def _read_ahead(self, io_pool: ThreadPoolExecutor | None):
+        """
+        Yields (filepath, contents) in the order of self.filepaths. With io_pool, up to self.prefetch contracts are being read 
+        on it ahead of the one yielded, contents is None if there is no io_pool or the read failed (process_contract then reads it and reports the error).
+        """
+        if io_pool is None:
+            for filepath in self.filepaths:
+                yield filepath, None
+            return
+        filepaths = iter(self.filepaths)
+        pending = deque((filepath, io_pool.submit(read_ahead, filepath, self.mapped)) for filepath in islice(filepaths, self.prefetch))
+        while pending:
+            filepath, future = pending.popleft()
+            for next_filepath in islice(filepaths, 1):
+                pending.append((next_filepath, io_pool.submit(read_ahead, next_filepath, self.mapped)))
+            try:
+                contents = future.result()
+            except Exception:
+                contents = None
+            yield filepath, contents
+
+    def _process_all(self, io_pool: ThreadPoolExecutor | None = None):
+        """
+        Yields (filepath, tables, stats) in the order of self.filepaths, either serially or from a pool of worker processes.
+        io_pool is used to prefetch the contracts of serial runs (see _read_ahead).
+        """
+        if self.timeout is not None:
+            yield from self._process_with_watchdog()
+        elif self.workers == 1 or len(self.filepaths) == 1:
+            cache = ResultCache(self.cache_path) if self.cache_path else None
+            contracts = self._read_ahead(io_pool)
+            if self.items_batch:
+                while batch := list(islice(contracts, self.items_batch)):
+                    for (filepath, _), (contract, tables, stats) in zip(batch, process_contracts(batch, self.mapped, cache, self.profile)):
+                        if len(self.filepaths) == 1:
+                            self.contract = contract
+                        yield filepath, tables, stats
+                return
+            for filepath, contents in contracts:
+                contract, tables, stats = process_contract(filepath, mapped=self.mapped, cache=cache, profile=self.profile, contents=contents)
+                if len(self.filepaths) == 1:
+                    self.contract = contract
+                yield filepath, tables, stats
+        else:
+            # executor.map keeps the input order, chunksize cuts down on inter-process communication
+            chunksize = max(1, min(100, len(self.filepaths) // (4 * self.workers)))
+            with ProcessPoolExecutor(max_workers=self.workers) as executor:
+                worker = partial(_process_contract_in_worker, mapped=self.mapped, cache_path=self.cache_path, profile=self.profile)
+                for filepath, (tables, stats) in zip(self.filepaths, executor.map(worker, self.filepaths, chunksize=chunksize)):
+                    yield filepath, tables, stats
+
+    def _start_watchdog_worker(self) -> Tuple[Process, object]:
+        connection, child_connection = Pipe()
+        process = Process(target=_watchdog_worker, args=(child_connection, self.mapped, self.cache_path, self.profile), daemon=True)
+        process.start()
+        child_connection.close()
+        return process, connection
+
+    def _process_with_watchdog(self):
+        """
+        Same as _process_all, but contracts are handed out one by one to worker processes and a contract that runs 
+        longer than self.timeout is aborted by killing its worker (a runaway regex can't be interrupted otherwise).
+        Workers that die (i.e. out of memory) are replaced the same way.
+        """
+        n = len(self.filepaths)
+        workers = [self._start_watchdog_worker() for _ in range(min(self.workers, n))]
+        busy = {}  # worker: (index of the contract, start time)
+        done = {}  # index of the contract: (tables, stats), until it's its turn to be yielded
+        next_task = next_result = 0
+        try:
+            while next_result < n:
+                for worker, (_, connection) in enumerate(workers):
+                    if worker not in busy and next_task < n:
+                        connection.send(self.filepaths[next_task])
+                        busy[worker] = (next_task, time.perf_counter())
+                        next_task += 1
+                
+                first_deadline = min(start for _, start in busy.values()) + self.timeout
+                ready = wait([workers[worker][1] for worker in busy], timeout=max(0, first_deadline - time.perf_counter()))
+                
+                for worker, (index, start) in list(busy.items()):
+                    process, connection = workers[worker]
+                    filepath = self.filepaths[index]
+                    if connection in ready:
+                        try:
+                            done[index] = connection.recv()
+                        except (EOFError, OSError):
+                            process.join()
+                            connection.close()
+                            done[index] = _failed_contract(filepath, RuntimeError(f'Worker died (exit code {process.exitcode})'), time.perf_counter() - start)
+                            workers[worker] = self._start_watchdog_worker()
+                    elif time.perf_counter() - start >= self.timeout:
+                        process.kill()
+                        process.join()
+                        connection.close()
+                        done[index] = _failed_contract(filepath, TimeoutError(f'Timed out after {self.timeout} s'), time.perf_counter() - start)
+                        workers[worker] = self._start_watchdog_worker()
+                    else:
+                        continue
+                    del busy[worker]
+                
+                while next_result in done:
+                    tables, stats = done.pop(next_result)
+                    yield self.filepaths[next_result], tables, stats
+                    next_result += 1
+        finally:
+            for process, connection in workers:
+                try:
+                    connection.send(None)
+                except OSError:
+                    pass
+            for process, connection in workers:
+                process.join(timeout=1)
+                if process.is_alive():
+                    process.kill()
+                connection.close()
 
     def run(self):
         """
         Run a batch or a single file (by making `files` a single element list).
         """
+        if not self.cprofile:
+            self._run()
+            return
+        profiler = cProfile.Profile()
+        profiler.enable()
+        try:
+            self._run()
+        finally:
+            profiler.disable()
+            profiler.dump_stats(self.results_path / 'profile.pstats')
+            pstats.Stats(profiler).sort_stats('cumulative').print_stats(20)
+            print(f"Saved cProfile stats to: {self.results_path / 'profile.pstats'}.")
+    
+    def _run(self):
         
         # there is some overhead when appending to a DataFrame rather then creating a list and then converting to DataFrame, the only reason I don't annoying part is ffill 
         self.info = []
@@ -199,50 +703,109 @@ class Experiment:
         self.items = []
         self.errors = []
         
+        in_memory = dict(zip(TABLE_NAMES, (self.info, self.bids, self.subcontractors, self.items, self.errors)))
+        writer = StreamingWriter(self.results_path, self.chunk_size) if self.stream else None
+        
         n = len(self.filepaths)
+        store = ResultStore(self.store_path, self.chunk_size) if self.store_path else None
+        if store:
+            settings = {'workers': self.workers, 'mapped': self.mapped, 'cache': str(self.cache_path) if self.cache_path else None, 'timeout': self.timeout}
+            store.start_run(self.timestamp, self.results_path, n, json.dumps(settings))
+        self.cache_hits = 0
+        self.cache_misses = 0
+        timer = StageTimer() if self.profile else NULL_TIMER
+        contract_profiles = []
         
-        for i, filepath in enumerate(self.filepaths):
-            contract_type = filepath.stem[:2]
-
-            if i % 100 == 0:
-                print(f"Processing {i+1}/{n} ... ")
-            try:
-                contract = Contract(filepath.stem)
-                
-                if len(self.filepaths) == 1:
-                    self.contract = contract
-                    
-                contract.extract()
-                
-                self.info.extend(contract.info.rows)
-                if not contract.postponed: 
-                    self.subcontractors.extend(contract.subcontractors.rows)
-                    self.bids.extend(contract.bids.rows)
-                    self.items.extend(contract.items.rows)
-                
-            except Exception as e:
-                print({CONTRACT_TYPE: contract_type, IDENTIFIER: filepath.stem, ERROR: e})
-                self.errors.append([{IDENTIFIER: filepath.stem, ERROR: str(e), CONTRACT_TYPE: contract_type}])
-                self.outliers_path.mkdir(exist_ok=True, parents=True)
-                shutil.copy(filepath, self.outliers_path / filepath.name)
+        io_pool = ThreadPoolExecutor(max_workers=min(self.prefetch, PREFETCH_THREADS)) if self.prefetch else None
+        outlier_copies = []
+        
+        with timer.stage('processing'), io_pool or nullcontext():
+            for i, (filepath, tables, stats) in enumerate(self._process_all(io_pool)):
+                self.cache_hits += stats.get('cache_hits', 0)
+                self.cache_misses += stats.get('cache_misses', 0)
+                if self.profile:
+                    contract_profiles.append({IDENTIFIER: filepath.stem, CONTRACT_TYPE: filepath.stem[:2], 
+                                              'total': stats['total'], 'times': stats['times'], 'counts': stats['counts']})
+                if i % 100 == 0:
+                    print(f"Processing {i+1}/{n} ... ")
+            
+                for j, error in enumerate(tables['Errors']):
+                    print(error)
+                    tables['Errors'][j] = {IDENTIFIER: error[IDENTIFIER], ERROR: str(error[ERROR]), CONTRACT_TYPE: error[CONTRACT_TYPE]}
+                    if io_pool:
+                        outlier_copies.append(io_pool.submit(self.copy_outlier, filepath))
+                    else:
+                        self.copy_outlier(filepath)
+            
+                for name in TABLE_NAMES:
+                    if writer:
+                        writer.write(name, tables[name])
+                    else:
+                        in_memory[name].extend(tables[name])
+                    if store:
+                        store.write(name, tables[name])
+            
+            for future in outlier_copies:
+                future.result()
                 
         print(f"Done processing {n} files.")
+        if store:
+            with timer.stage('store'):
+                store.finish_run()
+                store.close()
+            print(f"Saved rows to: {self.store_path} (run {store.run_id}).")
+        if self.cache_path:
+            print(f"Cache: {self.cache_hits} hits, {self.cache_misses} misses (portions).")
+        
+        with timer.stage('writing'):
+            if writer:
+                print("Writing to disk, please wait ...")
+                writer.close()
+                if self.excel:
+                    self.write_excel()
+                print(f"Saved data to: {self.results_path}.")
+            else:
+                self.write_to_disk()
+        
+        if self.subcontracted_items:
+            with timer.stage('subcontracted_items'):
+                write_subcontracted_items(self.results_path)
         
-        self.write_to_disk()
+        if self.parquet:
+            with timer.stage('parquet'):
+                csv_to_parquet(self.results_path)
+        
+        if self.profile:
+            report = write_profile_report(self.results_path, contract_profiles, dict(timer.times))
+            print_profile_report(report)
+            print(f"Saved profile to: {self.results_path / 'profile.json'}.")
                 
+    def copy_outlier(self, filepath: Path | ContractRecord):
+        # contracts that end up in Errors are copied to the outliers folder to look into
+        self.outliers_path.mkdir(exist_ok=True, parents=True)
+        if isinstance(filepath, ContractRecord):
+            (self.outliers_path / filepath.name).write_bytes(filepath.read(mapped=True))
+        else:
+            shutil.copy(filepath, self.outliers_path / filepath.name)
+    
     # def write_to_disk(self, df: pd.DataFrame | List, name: str):
     def write_to_disk(self):
         print("Writing to disk, please wait ...")
         
-        # Create a Pandas Excel writer using openpyxl as the engine
-        with pd.ExcelWriter(self.results_path / 'results.xlsx', engine='openpyxl') as writer:
-            for obj, name in zip((self.info, self.bids, self.subcontractors, self.items, self.errors), ('Info', 'Bids', 'Subcontractors', 'Items', 'Errors')):
-                obj = pd.DataFrame(obj)
-                if obj.empty:
-                    continue
-                else:
-                    print(f'Writing {name} ...')
-                # Write the DataFrame to a new sheet in the Excel file using the file name as the sheet name
-                obj.to_csv(self.results_path / f'{name}.csv', index=False)
-                obj.to_excel(writer, sheet_name=name, index=False)
+        for obj, name in zip((self.info, self.bids, self.subcontractors, self.items, self.errors), ('Info', 'Bids', 'Subcontractors', 'Items', 'Errors')):
+            obj = rows_to_frame(obj)
+            if obj.empty:
+                continue
+            else:
+                print(f'Writing {name} ...')
+            obj.to_csv(self.results_path / f'{name}.csv', index=False)
+        if self.excel:
+            # made from the CSV files, so it is the same as the one of a streaming run
+            self.write_excel()
         print(f"Saved data to: {self.results_path}.")
+        
+    def write_excel(self):
+        """
+        Makes results.xlsx from the CSV files already written to results_path (i.e. by a streaming run), see writers.csv_to_excel.
+        """
+        csv_to_excel(self.results_path)
@@ -0,0 +1,79 @@
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from constants import *
+
+
+SUBCONTRACTED_ITEMS = 'Subcontracted_Items'
+
+# a single item number or a range, Item_Numbers look like " 6 - 8 , 13 - 15 " (THRU and AND already replaced by the parsers)
+ITEM_RANGE_REGEX = r'(\d+)(?:\s*-\s*(\d+))?'
+
+SUBCONTRACTOR_COLUMNS = [IDENTIFIER, BIDDER_ID, SUBCONTRACTOR_NAME]
+ITEM_COLUMNS = [ITEM_CODE, ITEM_DESCRIPTION, ITEM_DOLLAR_AMOUNT]
+
+
+def expand_item_numbers(subcontractors: pd.DataFrame) -> pd.DataFrame:
+    """
+    Long format of the Subcontractors table: one row per subcontractor and item number it covers, ranges expanded
+    (" 6 - 8 , 13 " gives 6, 7, 8 and 13). The index is the index of the subcontractor row, like DataFrame.explode.
+    Subcontractors without Item_Numbers are left out. All of it is vectorized, there is no Python loop over the rows.
+    """
+    if ITEM_NUMBERS not in subcontractors:
+        return pd.DataFrame(columns=SUBCONTRACTOR_COLUMNS + [ITEM_NUMBER], dtype=object).astype({ITEM_NUMBER: 'int64'})
+
+    ranges = subcontractors[ITEM_NUMBERS].dropna().astype(str).str.extractall(ITEM_RANGE_REGEX)
+    start = ranges[0].astype('int64').to_numpy()
+    end = pd.to_numeric(ranges[1]).fillna(ranges[0].astype('int64')).astype('int64').to_numpy()
+    # a reversed range (i.e. "8 - 6") is kept as its first number only
+    lengths = np.where(end >= start, end - start + 1, 1)
+
+    # start of each range repeated for each of its numbers, plus the position inside the range
+    offsets = np.arange(lengths.sum()) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+    rows = np.repeat(ranges.index.get_level_values(0).to_numpy(), lengths)
+
+    columns = [column for column in SUBCONTRACTOR_COLUMNS if column in subcontractors]
+    long = subcontractors.loc[rows, columns]
+    long[ITEM_NUMBER] = np.repeat(start, lengths) + offsets
+    return long
+
+
+def index_items(items: pd.DataFrame) -> pd.DataFrame:
+    """
+    The Items table indexed on (Identifier, Item_Number), item numbers as integers (type 2 contracts pad them with zeros, "0074").
+    Rows without a numeric item number are left out.
+    """
+    items = items.assign(**{ITEM_NUMBER: pd.to_numeric(items[ITEM_NUMBER], errors='coerce')})
+    items = items[items[ITEM_NUMBER].notna()].astype({ITEM_NUMBER: 'int64'})
+    columns = [column for column in ITEM_COLUMNS if column in items]
+    return items.set_index([IDENTIFIER, ITEM_NUMBER])[columns].sort_index()
+
+
+def subcontracted_items(subcontractors: pd.DataFrame, items: pd.DataFrame) -> pd.DataFrame:
+    """
+    Joins the subcontractors with the items they cover (see expand_item_numbers and index_items) in one merge over all the contracts:
+    one row per subcontractor and item, with the code, description and dollar amount of the item.
+    Item numbers that are not in the Items of the contract are kept, with empty item columns.
+    """
+    long = expand_item_numbers(subcontractors)
+    joined = long.merge(index_items(items), how='left', left_on=[IDENTIFIER, ITEM_NUMBER], right_index=True, sort=False)
+    return joined.reset_index(drop=True)
+
+
+def write_subcontracted_items(results_path: Path) -> Path | None:
+    """
+    Makes <results_path>/Subcontracted_Items.csv from the Subcontractors and Items CSV files of an experiment.
+    Returns its path, None if there are no subcontractors or items.
+    """
+    results_path = Path(results_path)
+    subcontractors_path, items_path = results_path / 'Subcontractors.csv', results_path / 'Items.csv'
+    if not subcontractors_path.exists() or not items_path.exists():
+        return None
+    print(f'Writing {SUBCONTRACTED_ITEMS} ...')
+    subcontractors = pd.read_csv(subcontractors_path, dtype=str)
+    items = pd.read_csv(items_path, dtype=str)
+    path = results_path / f'{SUBCONTRACTED_ITEMS}.csv'
+    subcontracted_items(subcontractors, items).to_csv(path, index=False)
+    return path
@@ -0,0 +1,98 @@
+import json
+import time
+from collections import defaultdict
+from contextlib import contextmanager, nullcontext
+from pathlib import Path
+from typing import Dict, List
+
+import pandas as pd
+
+from constants import *
+
+
+SLOWEST_CONTRACTS = 50
+
+
+class StageTimer:
+    """
+    Accumulates wall time (seconds) and call counts per stage, i.e.:
+
+        timer = StageTimer()
+        with timer.stage('Items._parse'):
+            ...
+
+    Contract and the portions record 'read', 'section_index', '<Portion>.preprocess', '<Portion>._parse', 'cache'
+    and '<Portion>.dataframe' (only when the DataFrame of a portion is used).
+    """
+
+    def __init__(self):
+        self.times: Dict[str, float] = defaultdict(float)
+        self.counts: Dict[str, int] = defaultdict(int)
+
+    @contextmanager
+    def stage(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.times[name] += time.perf_counter() - start
+            self.counts[name] += 1
+
+
+class NullTimer:
+    """
+    Used when nothing is profiled, stages cost next to nothing.
+    """
+
+    def stage(self, name: str):
+        return nullcontext()
+
+
+NULL_TIMER = NullTimer()
+
+
+def write_profile_report(results_path: Path, contracts: List[dict], experiment_times: Dict[str, float]) -> dict:
+    """
+    contracts: one dict per contract with IDENTIFIER, CONTRACT_TYPE, 'total' and the 'times'/'counts' of its StageTimer.
+    experiment_times: wall time of the experiment level stages (i.e. processing, writing csv/excel).
+
+    Writes to results_path:
+        profile.json                per stage totals over all the contracts (time, calls, share of the contract time), experiment stages
+        slowest_contracts.csv       the SLOWEST_CONTRACTS slowest contracts with their time per stage
+    Returns the report written to profile.json.
+    """
+    results_path = Path(results_path)
+    times, counts = defaultdict(float), defaultdict(int)
+    for contract in contracts:
+        for name, seconds in contract['times'].items():
+            times[name] += seconds
+            counts[name] += contract['counts'][name]
+    contracts_total = sum(contract['total'] for contract in contracts)
+
+    stages = {
+        name: {'time': times[name], 'calls': counts[name], 'share': times[name] / contracts_total if contracts_total else 0.0}
+        for name in sorted(times, key=times.get, reverse=True)
+    }
+    report = {
+        'contracts': len(contracts),
+        'contracts_time': contracts_total,
+        'mean_contract_time': contracts_total / len(contracts) if contracts else 0.0,
+        'stages': stages,
+        'experiment': experiment_times,
+    }
+    with open(results_path / 'profile.json', 'w') as file:
+        json.dump(report, file, indent=2)
+
+    slowest = sorted(contracts, key=lambda x: x['total'], reverse=True)[:SLOWEST_CONTRACTS]
+    df = pd.DataFrame([{IDENTIFIER: x[IDENTIFIER], CONTRACT_TYPE: x[CONTRACT_TYPE], 'total': x['total']} | x['times'] for x in slowest])
+    df.to_csv(results_path / 'slowest_contracts.csv', index=False)
+    return report
+
+
+def print_profile_report(report: dict, top: int = 10):
+    print(f"Profile of {report['contracts']} contracts, {report['mean_contract_time'] * 1e3:.2f} ms per contract:")
+    print(f"{'stage':<32}{'time (s)':>10}{'calls':>10}{'share':>8}")
+    for name, stage in list(report['stages'].items())[:top]:
+        print(f"{name:<32}{stage['time']:>10.3f}{stage['calls']:>10}{stage['share']:>8.1%}")
+    for name, seconds in report['experiment'].items():
+        print(f"{name:<32}{seconds:>10.3f}")
@@ -0,0 +1,194 @@
+from collections import defaultdict
+from collections.abc import ItemsView, KeysView, Mapping, MutableMapping, ValuesView
+from operator import attrgetter
+from typing import Iterable, List
+
+import numpy as np
+import pandas as pd
+
+
+class _Missing:
+    # value of the fields of a Row that were never set
+    def __repr__(self) -> str:
+        return 'MISSING'
+
+    def __reduce__(self) -> str:
+        return 'MISSING'
+
+
+MISSING = _Missing()
+
+
+class Row(dict):
+    """
+    Compact row of a results table, a drop-in for the defaultdict(str) rows the parsers used to build.
+
+    Each column is a slot, the values are not stored in the dict itself (it stays empty), so a row takes a fraction of the memory 
+    of a dict with the same columns. Fields that were never set are missing, like keys of a dict, and reading one gives '' (and sets it) 
+    like defaultdict(str). Iteration follows FIELDS, the schema of the table, so the column order does not depend on the order the parser sets them.
+    
+    Row is a dict subclass so that pd.DataFrame(rows) keeps the column order (pandas sorts the columns of other mappings), 
+    every dict method that would see the empty dict is overridden with the mapping methods. C code that reads the dict directly 
+    (i.e. json.dumps) sees an empty dict, convert with dict(row) first. Subclasses are made with row_class.
+    """
+
+    __slots__ = ()
+    FIELDS: tuple = ()
+    _FIELD_SET: frozenset = frozenset()
+
+    def __init__(self):
+        for field in self.FIELDS:
+            setattr(self, field, MISSING)
+
+    def __getitem__(self, key: str):
+        if key not in self._FIELD_SET:
+            raise KeyError(key)
+        value = getattr(self, key)
+        if value is MISSING:
+            setattr(self, key, '')
+            return ''
+        return value
+
+    def __setitem__(self, key: str, value):
+        if key not in self._FIELD_SET:
+            raise KeyError(f'{key} is not a column of {type(self).__qualname__}')
+        setattr(self, key, value)
+
+    def __delitem__(self, key: str):
+        if key not in self:
+            raise KeyError(key)
+        setattr(self, key, MISSING)
+
+    def __iter__(self):
+        for field in self.FIELDS:
+            if getattr(self, field) is not MISSING:
+                yield field
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self)
+
+    def __contains__(self, key) -> bool:
+        return key in self._FIELD_SET and getattr(self, key) is not MISSING
+
+    def get(self, key: str, default=None):
+        # unlike __getitem__ this does not set missing fields (same as defaultdict.get)
+        if key not in self._FIELD_SET:
+            return default
+        value = getattr(self, key)
+        return default if value is MISSING else value
+
+    def keys(self):
+        return KeysView(self)
+
+    def items(self):
+        return ItemsView(self)
+
+    def values(self):
+        return ValuesView(self)
+
+    __eq__ = Mapping.__eq__
+    __reversed__ = None
+
+    def __ne__(self, other) -> bool:
+        equal = self.__eq__(other)
+        return equal if equal is NotImplemented else not equal
+    pop = MutableMapping.pop
+    popitem = MutableMapping.popitem
+    clear = MutableMapping.clear
+    update = MutableMapping.update
+    setdefault = MutableMapping.setdefault
+
+    def copy(self) -> 'Row':
+        row = type(self)()
+        row.update(self)
+        return row
+
+    def __or__(self, other):
+        return dict(self) | other if isinstance(other, dict) else NotImplemented
+
+    def __ror__(self, other):
+        return other | dict(self) if isinstance(other, dict) else NotImplemented
+
+    def __ior__(self, other):
+        self.update(other)
+        return self
+
+    def __reduce__(self):
+        # only the fields that are set, i.e. cache files stay small
+        return type(self), (), dict(self.items())
+
+    def __setstate__(self, state: dict):
+        self.__init__()
+        for key, value in state.items():
+            setattr(self, key, value)
+
+    def __repr__(self) -> str:
+        return f'{type(self).__qualname__}({dict(self.items())})'
+
+
+def row_class(owner: type, fields: Iterable[str]) -> type:
+    """
+    Makes the Row subclass for the rows of owner (i.e. a portion class), stored as owner.Row so that rows can be pickled
+    (cache, worker processes). fields are the column names, they must be valid identifiers.
+    """
+    fields = tuple(dict.fromkeys(fields))
+    return type('Row', (Row,), {
+        '__slots__': fields,
+        '__module__': owner.__module__,
+        '__qualname__': f'{owner.__qualname__}.Row',
+        'FIELDS': fields,
+        '_FIELD_SET': frozenset(fields),
+    })
+
+
+def columns_of(rows: List[Row | dict]) -> List[str]:
+    """
+    Columns of rows in the order of first appearance (each row in its own order), same as the columns of pd.DataFrame(list of dicts).
+    Only the rows where a column first appears decide the order, those are found field by field for each Row type,
+    so this does not go through every field of every row.
+    """
+    first = {}  # index of a row where a column first appears: None
+    row_types = defaultdict(list)  # Row type: indices of its rows
+    for i, row in enumerate(rows):
+        if type(row) is dict:
+            first[i] = None
+        else:
+            row_types[type(row)].append(i)
+    for row_type, indices in row_types.items():
+        first_row = rows[indices[0]]
+        first[indices[0]] = None
+        group = None
+        for field in row_type.FIELDS:
+            if getattr(first_row, field) is not MISSING:
+                continue
+            # only fields missing in the first row need a scan, most often they are never set at all
+            group = group or [rows[i] for i in indices]
+            values = list(map(attrgetter(field), group))
+            if values.count(MISSING) < len(values):
+                first[next(i for i, value in zip(indices, values) if value is not MISSING)] = None
+
+    columns = {}
+    for i in sorted(first):
+        for column in rows[i]:
+            columns[column] = None
+    return list(columns)
+
+
+def rows_to_frame(rows: List[Row | dict]) -> pd.DataFrame:
+    """
+    Same as pd.DataFrame(rows) for dict rows, but built column by column in one go (see columns_of), missing values are NaN. 
+    Works for Row and dict rows (i.e. Errors), rows of a table can be of several Row types (i.e. Items and Items2 rows).
+    """
+    row_types = set(map(type, rows))
+    data = {}
+    for column in columns_of(rows):
+        if len(row_types) == 1 and dict not in row_types:
+            values = list(map(attrgetter(column), rows))
+        elif dict not in row_types:
+            values = [getattr(row, column, MISSING) for row in rows]
+        else:
+            values = [row.get(column, MISSING) if type(row) is dict else getattr(row, column, MISSING) for row in rows]
+        if values.count(MISSING):
+            values = [np.nan if value is MISSING else value for value in values]
+        data[column] = values
+    return pd.DataFrame(data, index=pd.RangeIndex(len(rows)))
@@ -0,0 +1,237 @@
+import argparse
+import asyncio
+import http.client
+import json
+import random
+import socket
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+from constants import *
+from experiment import process_contract, load_contract_index
+
+
+DEFAULT_PORT = 8765
+# a batch is sent to the workers when it has BATCH_SIZE requests or BATCH_WAIT seconds after its first request
+BATCH_SIZE = 16
+BATCH_WAIT = 0.005
+TABLES = ('Info', 'Bids', 'Subcontractors', 'Items', 'Errors')
+
+_contract_index = None
+
+
+def _warm_worker():
+    # compiles the regexes and runs every parser once, so that the first request is as fast as the others
+    from synthetic import SyntheticContract
+    synthetic = SyntheticContract(random.Random(0), postponed=False)
+    for contract_type, text in ((1, synthetic.type1()), (2, synthetic.type2())):
+        process_contract(Path(f't{contract_type}_warmup.txt'), contents=text)
+
+
+def check_identifier(identifier) -> str:
+    """
+    Raises a ValueError if identifier is not a contract identifier (a string without path separators), so that a request can't read files
+    outside of sorted_data. Returns the identifier.
+    """
+    if not isinstance(identifier, str) or not identifier:
+        raise ValueError('every request needs an identifier')
+    if any(x in identifier for x in ('/', '\\', '\0')):
+        raise ValueError(f'invalid identifier {identifier!r}')
+    return identifier
+
+
+def extract_request(request: dict) -> Dict[str, List[dict]]:
+    """
+    Extracts one request: {"identifier": "t1_<tag>"} reads the contract from the contract index (see sort_contracts(virtual=True))
+    if there is one, else from sorted_data, {"identifier": ..., "text": ...} extracts the given text (the identifier only gives the contract type).
+    Returns the rows of the tables (TABLES) as plain dicts, errors as rows of Errors like in an Experiment.
+    """
+    global _contract_index
+    identifier = check_identifier(request['identifier'])
+    text = request.get('text')
+    if text is None and _contract_index is None:
+        _contract_index = load_contract_index() if CONTRACT_INDEX_PATH.exists() else {}
+    if text is None and identifier in _contract_index:
+        filepath = _contract_index[identifier]
+    else:
+        filepath = SORTED_DATA_PATH / (identifier + '.txt')
+
+    _, tables, _ = process_contract(filepath, contents=text)
+    for error in tables['Errors']:
+        error[ERROR] = str(error[ERROR])
+    return {name: [dict(row) for row in tables[name]] for name in TABLES}
+
+
+def extract_batch(requests: List[dict]) -> List[Dict[str, List[dict]]]:
+    return [extract_request(request) for request in requests]
+
+
+class ExtractionService:
+    """
+    Local extraction service: an asyncio HTTP server (on a TCP port or a Unix socket) in front of a pool of warm worker processes,
+    so repeated extractions don't pay for starting Python, importing pandas and compiling the regexes.
+
+        POST /extract   {"identifier": "t1_<tag>"} or {"identifier": "t1_<tag>", "text": "..."}, or a list of those
+                        returns {"Info": [...], "Bids": [...], "Subcontractors": [...], "Items": [...], "Errors": [...]} (a list for a list)
+        GET /health     {"status": "ok", "workers": n}
+
+    Concurrent requests are batched (BATCH_SIZE, BATCH_WAIT) so that a worker gets several contracts per round trip.
+    Run with python service.py (see --help), query with extract_remote.
+    """
+
+    def __init__(self, workers: int = 2, batch_size: int = BATCH_SIZE, batch_wait: float = BATCH_WAIT):
+        if workers < 1:
+            raise ValueError('workers must be at least 1.')
+        self.workers = workers
+        self.batch_size = batch_size
+        self.batch_wait = batch_wait
+        self.executor = None
+        self.queue = None
+        # batches in the workers, references are kept so they are not garbage collected while running
+        self._tasks = set()
+
+    async def start(self):
+        self.executor = ProcessPoolExecutor(max_workers=self.workers, initializer=_warm_worker)
+        # start (and warm) all the workers now instead of on the first requests
+        await asyncio.gather(*(asyncio.wrap_future(self.executor.submit(extract_batch, [])) for _ in range(self.workers)))
+        self.queue = asyncio.Queue()
+        self._batcher = asyncio.create_task(self._batch_requests())
+
+    async def close(self):
+        self._batcher.cancel()
+        for task in self._tasks:
+            task.cancel()
+        self.executor.shutdown(cancel_futures=True)
+
+    async def extract(self, request: dict) -> Dict[str, List[dict]]:
+        future = asyncio.get_running_loop().create_future()
+        await self.queue.put((request, future))
+        return await future
+
+    async def _batch_requests(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self.queue.get()]
+            deadline = loop.time() + self.batch_wait
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(await asyncio.wait_for(self.queue.get(), max(0, deadline - loop.time())))
+                except asyncio.TimeoutError:
+                    break
+            # split over the workers, a batch sent as a whole would be extracted by a single worker; 
+            # several batches can be in the workers at the same time
+            size = -(-len(batch) // self.workers)
+            for i in range(0, len(batch), size):
+                task = asyncio.create_task(self._run_batch(batch[i:i + size]))
+                self._tasks.add(task)
+                task.add_done_callback(self._tasks.discard)
+
+    async def _run_batch(self, batch: List[Tuple[dict, asyncio.Future]]):
+        try:
+            results = await asyncio.wrap_future(self.executor.submit(extract_batch, [request for request, _ in batch]))
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        for (_, future), result in zip(batch, results):
+            if not future.done():
+                future.set_result(result)
+
+    async def handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        # HTTP/1.1 with keep-alive, just enough for http.client, curl and requests
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line.strip():
+                    break
+                method, path, _ = request_line.decode('latin-1').split(' ', 2)
+                headers = {}
+                while (line := await reader.readline()) not in (b'\r\n', b'\n', b''):
+                    name, _, value = line.decode('latin-1').partition(':')
+                    headers[name.strip().lower()] = value.strip()
+                body = await reader.readexactly(int(headers.get('content-length', 0)))
+
+                status, response = await self._respond(method, path, body)
+                payload = json.dumps(response).encode()
+                writer.write(f'HTTP/1.1 {status}\r\nContent-Type: application/json\r\nContent-Length: {len(payload)}\r\n\r\n'.encode() + payload)
+                await writer.drain()
+                if headers.get('connection', '').lower() == 'close':
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    async def _respond(self, method: str, path: str, body: bytes) -> Tuple[str, object]:
+        if method == 'GET' and path == '/health':
+            return '200 OK', {'status': 'ok', 'workers': self.workers}
+        if method != 'POST' or path != '/extract':
+            return '404 Not Found', {'error': f'{method} {path} not found'}
+        try:
+            requests = json.loads(body)
+            single = isinstance(requests, dict)
+            requests = [requests] if single else requests
+            if not isinstance(requests, list) or not all(isinstance(x, dict) for x in requests):
+                raise ValueError('every request needs an identifier')
+            for request in requests:
+                check_identifier(request.get('identifier'))
+        except ValueError as e:
+            return '400 Bad Request', {'error': str(e)}
+        results = await asyncio.gather(*(self.extract(request) for request in requests))
+        return '200 OK', results[0] if single else results
+
+    async def serve(self, host: str = '127.0.0.1', port: int = DEFAULT_PORT, unix_path: str | None = None):
+        await self.start()
+        if unix_path:
+            server = await asyncio.start_unix_server(self.handle_connection, path=unix_path)
+        else:
+            server = await asyncio.start_server(self.handle_connection, host, port)
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            await self.close()
+
+
+class _UnixHTTPConnection(http.client.HTTPConnection):
+    def __init__(self, path: str, timeout: float):
+        super().__init__('localhost', timeout=timeout)
+        self.unix_path = path
+
+    def connect(self):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.settimeout(self.timeout)
+        self.sock.connect(self.unix_path)
+
+
+def extract_remote(identifier: str | None = None, text: str | None = None, requests: List[dict] | None = None, host: str = '127.0.0.1',
+                   port: int = DEFAULT_PORT, unix_path: str | None = None, timeout: float = 60) -> dict | List[dict]:
+    """
+    Client for ExtractionService, i.e. extract_remote('t1_1234') or extract_remote('t1_x', text=...),
+    or extract_remote(requests=[{'identifier': ...}, ...]) for several contracts in one call.
+    """
+    body = requests if requests is not None else {'identifier': identifier} | ({'text': text} if text is not None else {})
+    connection = _UnixHTTPConnection(unix_path, timeout) if unix_path else http.client.HTTPConnection(host, port, timeout=timeout)
+    try:
+        connection.request('POST', '/extract', json.dumps(body), {'Content-Type': 'application/json'})
+        response = connection.getresponse()
+        result = json.loads(response.read())
+    finally:
+        connection.close()
+    if response.status != 200:
+        raise RuntimeError(f"Extraction service: {response.status} {result.get('error', '')}")
+    return result
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Local extraction service, keeps warm parsers in worker processes (see ExtractionService).')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+    parser.add_argument('--unix', help='listen on this Unix socket instead of a TCP port')
+    parser.add_argument('--workers', type=int, default=2, help='worker processes')
+    args = parser.parse_args()
+
+    print(f"Serving on {args.unix or f'{args.host}:{args.port}'} with {args.workers} workers ...")
+    asyncio.run(ExtractionService(args.workers).serve(args.host, args.port, args.unix))
@@ -0,0 +1,144 @@
+import sqlite3
+from collections import defaultdict
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List
+
+import pandas as pd
+
+from constants import *
+from rows import columns_of
+
+
+# columns that get an index in every table that has them, what lookups are usually by
+INDEXED_COLUMNS = [IDENTIFIER, CONTRACT_NUMBER, BIDDER_ID, CSLB_NUMBER, ITEM_CODE]
+
+RUN_COLUMNS = {
+    'run_id': 'INTEGER PRIMARY KEY AUTOINCREMENT',
+    'timestamp': 'TEXT',
+    'results_path': 'TEXT',
+    'contracts': 'INTEGER',
+    'settings': 'TEXT',
+    'started': 'TEXT',
+    'finished': 'TEXT',
+}
+
+
+def _quote(name: str) -> str:
+    return '"' + name.replace('"', '""') + '"'
+
+
+class ResultStore:
+    """
+    SQLite database of extraction results, shared by any number of experiments (one row per experiment in the runs table):
+
+        store = ResultStore()
+        store.lookup('Bids', BIDDER_ID, '12345')        # DataFrame, all the runs unless run_id is given
+        store.query('SELECT * FROM Items WHERE run_id = ?', (3,))
+
+    Every results table (Info, Bids, ...) gets a run_id column, columns are added as they first appear (same as the CSV files)
+    and indexes are made on run_id and the INDEXED_COLUMNS the table has.
+    Rows are buffered and inserted chunk_size at a time, one transaction per chunk.
+    """
+
+    def __init__(self, path: Path = STORE_PATH, chunk_size: int = 10000):
+        self.path = Path(path)
+        self.path.parent.mkdir(exist_ok=True, parents=True)
+        self.chunk_size = chunk_size
+        self.connection = sqlite3.connect(self.path)
+        # readers (i.e. lookups from a notebook) don't block a running experiment
+        self.connection.execute('PRAGMA journal_mode=WAL')
+        self.connection.execute('PRAGMA synchronous=NORMAL')
+        columns = ', '.join(f'{name} {kind}' for name, kind in RUN_COLUMNS.items())
+        with self.connection:
+            self.connection.execute(f'CREATE TABLE IF NOT EXISTS runs ({columns})')
+        self.run_id = None
+        self.buffers: Dict[str, List[dict]] = defaultdict(list)
+        self._columns: Dict[str, set] = {}  # table name: its columns in the database
+
+    def start_run(self, timestamp: str, results_path: Path, contracts: int, settings: str = '') -> int:
+        """
+        Adds a run to the runs table, rows written from now on belong to it. Returns its run_id.
+        """
+        with self.connection:
+            cursor = self.connection.execute(
+                'INSERT INTO runs (timestamp, results_path, contracts, settings, started) VALUES (?, ?, ?, ?, ?)',
+                (timestamp, str(results_path), contracts, settings, datetime.now().isoformat(timespec='seconds')))
+        self.run_id = cursor.lastrowid
+        return self.run_id
+
+    def write(self, name: str, rows: List[dict]):
+        buffer = self.buffers[name]
+        buffer.extend(rows)
+        if len(buffer) >= self.chunk_size:
+            self.flush(name)
+
+    def _table_columns(self, name: str) -> set:
+        if name not in self._columns:
+            self._columns[name] = {x[1] for x in self.connection.execute(f'PRAGMA table_info({_quote(name)})')}
+        return self._columns[name]
+
+    def _add_columns(self, name: str, columns: List[str]):
+        existing = self._table_columns(name)
+        if not existing:
+            self.connection.execute(f'CREATE TABLE {_quote(name)} (run_id INTEGER NOT NULL)')
+            self.connection.execute(f'CREATE INDEX {_quote(f"ix_{name}_run_id")} ON {_quote(name)} (run_id)')
+            existing.add('run_id')
+        for column in columns:
+            if column in existing:
+                continue
+            self.connection.execute(f'ALTER TABLE {_quote(name)} ADD COLUMN {_quote(column)}')
+            if column in INDEXED_COLUMNS:
+                self.connection.execute(f'CREATE INDEX {_quote(f"ix_{name}_{column}")} ON {_quote(name)} ({_quote(column)})')
+            existing.add(column)
+
+    def flush(self, name: str):
+        rows = self.buffers[name]
+        if not rows:
+            return
+        if self.run_id is None:
+            raise RuntimeError('start_run must be called before writing rows.')
+        columns = columns_of(rows)
+        placeholders = ', '.join('?' * (len(columns) + 1))
+        sql = f'INSERT INTO {_quote(name)} (run_id, {", ".join(map(_quote, columns))}) VALUES ({placeholders})'
+        try:
+            with self.connection:
+                self._add_columns(name, columns)
+                # .get so that defaultdict rows don't grow
+                self.connection.executemany(sql, ((self.run_id, *[row.get(column) for column in columns]) for row in rows))
+        except sqlite3.Error:
+            # columns are read again from the database next time
+            self._columns.pop(name, None)
+            raise
+        rows.clear()
+
+    def finish_run(self):
+        """
+        Inserts what is left in the buffers and marks the run as finished.
+        """
+        for name in list(self.buffers):
+            self.flush(name)
+        with self.connection:
+            self.connection.execute('UPDATE runs SET finished = ? WHERE run_id = ?',
+                                    (datetime.now().isoformat(timespec='seconds'), self.run_id))
+
+    def close(self):
+        self.connection.close()
+
+    def query(self, sql: str, params: tuple = ()) -> pd.DataFrame:
+        return pd.read_sql_query(sql, self.connection, params=params)
+
+    def runs(self) -> pd.DataFrame:
+        return self.query('SELECT * FROM runs ORDER BY run_id')
+
+    def lookup(self, name: str, column: str, value, run_id: int | None = None) -> pd.DataFrame:
+        """
+        Rows of table name where column equals value (i.e. lookup('Bids', CSLB_NUMBER, '123456')), of run_id or of all the runs.
+        Fast for INDEXED_COLUMNS. Values are stored as extracted, that is as strings.
+        """
+        sql = f'SELECT * FROM {_quote(name)} WHERE {_quote(column)} = ?'
+        params = (value,)
+        if run_id is not None:
+            sql += ' AND run_id = ?'
+            params += (run_id,)
+        return self.query(sql, params)
@@ -0,0 +1,588 @@
+import argparse
+import random
+from datetime import date, timedelta
+from pathlib import Path
+from typing import Callable, List, Tuple
+
+import pandas as pd
+from tqdm import tqdm
+
+from constants import *
+
+
+# vocabulary for the generated contracts, loosely based on testing/data
+COMPANY_WORDS = ['PAVE', 'TECH', 'GRIFFITH', 'SULLY', 'MILLER', 'GRANITE', 'PACIFIC', 'SIERRA', 'VALLEY', 'COAST', 'GOLDEN', 'STATE',
+                 'RASMUSSEN', 'SHEA', 'MERCER', 'FRASER', 'BRUTOCO', 'DESERT', 'SUMMIT', 'REDWOOD', 'CASCADE', 'MOJAVE', 'HARBOR', 'DELTA']
+COMPANY_SUFFIXES = ['INC', 'CO INC', 'COMPANY', 'CONSTRUCTION INC', 'CONTRACTING CO', 'ENGINEERING INC', 'CORPORATION', 'PAVING INC']
+STREETS = ['LAGUNA DRIVE', 'KAISER AVENUE', 'FULTON COURT', 'LIVINGSTON AVENUE', 'BLOOMFIELD AVE', 'WRIGHT AVENUE', 'SKYWAY',
+           'BREA CANYON ROAD', 'DINSMORE DR', 'INDUSTRIAL WAY', 'ZANKER ROAD', 'PELICAN WAY']
+CITIES = [('CARLSBAD', '92008'), ('IRVINE', '92614'), ('CORONA', '92878'), ('VALENCIA', '91355'), ('REDDING', '96001'), ('CHICO', '95928'),
+          ('FRESNO', '93706'), ('SACRAMENTO', '95814'), ('ANAHEIM', '92803'), ('WALNUT', '91789'), ('ARCATA', '95521'), ('SAN JOSE', '95134')]
+COUNTIES = [('LA', 'LOS ANGELES'), ('SD', 'SAN DIEGO'), ('HUM', 'HUMBOLDT'), ('SAC', 'SACRAMENTO'), ('FRE', 'FRESNO'), ('SHA', 'SHASTA'),
+            ('ORA', 'ORANGE'), ('RIV', 'RIVERSIDE'), ('SBD', 'SAN BERNARDINO'), ('TRI', 'TRINITY')]
+WORK = ['PROFILE GRIND AND REPLACE PAVEMENT', 'SEAL COAT', 'CULVERT REPLACEMENT', 'BRIDGE DECK REHABILITATION', 'SIGNAL UPGRADE',
+        'COLD PLANE AND OVERLAY', 'GUARDRAIL UPGRADE', 'STORM WATER TREATMENT', 'SLOPE STABILIZATION', 'LANDSCAPE REPLACEMENT']
+SUBCONTRACTED_WORK = ['STRIPING AND MARKERS', 'ELECTRICAL', 'TRAFFIC CONTROL', 'GRINDING', 'CONSTRUCTION AREA SIGNS', 'TRUCKING',
+                      'EROSION CONTROL', 'SURVEYING', 'ASPHALT AND PCC TESTING', 'COLD PLANING']
+# item code, description, unit
+ITEMS = [
+    ('070012', 'PROGRESS SCHEDULE (CRITICAL PATH METHOD)', 'LS'),
+    ('070018', 'TIME-RELATED OVERHEAD', 'WDAY'),
+    ('074016', 'CONSTRUCTION SITE MANAGEMENT', 'LS'),
+    ('074017', 'PREPARE WATER POLLUTION CONTROL PROGRAM', 'LS'),
+    ('074042', 'TEMPORARY CONCRETE WASHOUT (PORTABLE)', 'LS'),
+    ('120090', 'CONSTRUCTION AREA SIGNS', 'LS'),
+    ('120100', 'TRAFFIC CONTROL SYSTEM', 'LS'),
+    ('128652', 'PORTABLE CHANGEABLE MESSAGE SIGN', 'EA'),
+    ('153103', 'COLD PLANE ASPHALT CONCRETE PAVEMENT', 'SQYD'),
+    ('190101', 'ROADWAY EXCAVATION', 'CY'),
+    ('190110', 'LEAD COMPLIANCE PLAN', 'LS'),
+    ('260203', 'CLASS 2 AGGREGATE BASE', 'CY'),
+    ('390132', 'HOT MIX ASPHALT (TYPE A)', 'TON'),
+    ('390140', 'RUBBERIZED HOT MIX ASPHALT (GAP GRADED)', 'TON'),
+    ('397005', 'TACK COAT', 'TON'),
+    ('401108', 'REPLACE CONCRETE PAVEMENT (RAPID STRENGTH CONCRETE)', 'CY'),
+    ('420201', 'GRIND EXISTING CONCRETE PAVEMENT', 'SQYD'),
+    ('510053', 'STRUCTURAL CONCRETE, BRIDGE DECK', 'CY'),
+    ('520102', 'BAR REINFORCING STEEL (BRIDGE)', 'LB'),
+    ('641008', '24" CORRUGATED STEEL PIPE (.138" THICK)', 'LF'),
+    ('802580', "12' CHAIN LINK GATE (TYPE CL-6)", 'EA'),
+    ('832001', 'METAL BEAM GUARD RAILING', 'LF'),
+    ('840504', '4" THERMOPLASTIC TRAFFIC STRIPE', 'LF'),
+    ('840515', 'THERMOPLASTIC PAVEMENT MARKING', 'SQFT'),
+    ('846007', '6" THERMOPLASTIC TRAFFIC STRIPE (ENHANCED WET NIGHT VISIBILITY) (BROKEN 36-12)', 'LF'),
+    ('850111', 'PAVEMENT MARKER (RETROREFLECTIVE)', 'EA'),
+    ('860090', 'MAINTAINING EXISTING TRAFFIC MANAGEMENT SYSTEM ELEMENTS DURING CONSTRUCTION', 'LS'),
+    ('020548', 'INDUCTIVE LOOP DETECTOR (REPLACEMENT)', 'EA'),
+]
+MOBILIZATION = ('999990', 'MOBILIZATION', 'LS')
+ALPHANUMERIC = '0123456789ABCDEFGHJKLMNPQRSTUVWXYZ'
+
+NUMBER_OF_SUBCONTRACTORS = 'Number_of_Subcontractors'
+
+T1_LINES_PER_PAGE = 60
+T2_LINES_PER_PAGE = 64
+
+
+def _line(*fields: Tuple[int, str]) -> str:
+    """
+    Builds a fixed-width line from (column, text) fields. A field that would overlap the next one is cut,
+    so columns are always where the parsers expect them and fields are separated by at least one space.
+    """
+    line = ''
+    for column, text in fields:
+        if column > 0 and len(line) >= column:
+            line = line[:column - 1]
+        line = line.ljust(column) + text
+    return line
+
+
+def _right(end: int, text: str) -> Tuple[int, str]:
+    # right-aligned field ending at column end
+    return end - len(text), text
+
+
+def _money(amount: float) -> str:
+    return f'{amount:,.2f}'
+
+
+def _wrap(text: str, width: int) -> List[str]:
+    lines = ['']
+    for word in text.split():
+        if lines[-1] and len(lines[-1]) + 1 + len(word) > width:
+            lines.append('')
+        lines[-1] = f'{lines[-1]} {word}'.strip()
+    return lines
+
+
+class _Pages:
+    """
+    Collects lines into pages of at most lines_per_page lines, header(page_number, title) gives the first lines of every page.
+    Every page ends with a form feed, like pdftotext output.
+    """
+
+    def __init__(self, header: Callable[[int, str], List[str]], lines_per_page: int, separator: str):
+        self.header = header
+        self.lines_per_page = lines_per_page
+        self.separator = separator
+        self.pages: List[List[str]] = []
+
+    def new_page(self, title: str = ''):
+        self.pages.append(self.header(len(self.pages) + 1, title))
+
+    def fits(self, n: int) -> bool:
+        return len(self.pages[-1]) + n <= self.lines_per_page
+
+    def add(self, lines: List[str]):
+        self.pages[-1].extend(lines)
+
+    def text(self) -> str:
+        return ''.join('\n'.join(page) + self.separator for page in self.pages)
+
+
+class SyntheticContract:
+    """
+    Randomly generated contract (bidders, items, subcontractors) that can be rendered as a type 1 (lineprinter)
+    or a type 2 (table) text in the layouts the parsers expect. The generated values are kept as attributes so
+    the extracted results can be checked against them (see manifest_row).
+    """
+
+    def __init__(self, rng: random.Random, num_bidders: int | None = None, num_items: int | None = None,
+                 a_plus_b: bool | None = None, postponed: bool | None = None):
+        self.rng = rng
+        self.district = rng.randint(1, 12)
+        self.contract_number = f'{self.district:02}-' + ''.join(rng.choice(ALPHANUMERIC) for _ in range(6))
+        self.county_code, self.county = rng.choice(COUNTIES)
+        self.route = rng.randint(1, 405)
+        self.work = rng.choice(WORK)
+        self.contract_code = rng.choice('ABCFH')
+        self.bid_opening_date = date(2005, 1, 1) + timedelta(days=rng.randint(0, 18 * 365))
+        self.contract_date = self.bid_opening_date + timedelta(days=rng.randint(0, 30))
+        self.working_days = rng.randint(10, 400)
+        self.postponed = rng.random() < 0.02 if postponed is None else postponed
+        self.a_plus_b = rng.random() < 0.1 if a_plus_b is None else a_plus_b
+
+        num_items = num_items or min(int(rng.lognormvariate(3.2, 0.8)) + 2, 400)
+        self.items = self._make_items(num_items)
+        total = sum(x['amount'] for x in self.items)
+        self.engineers_est = round(total * rng.uniform(0.8, 1.25), 2)
+
+        num_bidders = 0 if self.postponed else (num_bidders or rng.randint(1, 12))
+        self.bidders = self._make_bidders(num_bidders, total)
+        self.subcontractors = [self._make_subcontractors(bidder) for bidder in self.bidders]
+
+    def _company(self) -> str:
+        return ' '.join(self.rng.sample(COMPANY_WORDS, self.rng.randint(1, 3))) + ' ' + self.rng.choice(COMPANY_SUFFIXES)
+
+    def _make_items(self, num_items: int) -> List[dict]:
+        rng = self.rng
+        items = []
+        for i, (code, description, unit) in enumerate(rng.choices(ITEMS, k=num_items - 1) + [MOBILIZATION]):
+            if unit == 'LS':
+                quantity, price = None, round(min(rng.lognormvariate(9, 1.5), 900000), -2) + 100
+                amount = price
+            else:
+                quantity = min(int(rng.lognormvariate(5, 1.5)) + 1, 99999)
+                price = round(min(rng.lognormvariate(2.5, 1.5), 9000 / quantity ** 0.5), 2) + 0.1
+                amount = round(quantity * price, 2)
+            flag = rng.choice(['F', 'S', 'SF']) if rng.random() < 0.05 else ''
+            items.append({'number': i + 1, 'flag': flag, 'code': code, 'description': description, 'unit': unit,
+                          'quantity': quantity, 'price': price, 'amount': amount})
+        return items
+
+    def _make_bidders(self, num_bidders: int, low_total: float) -> List[dict]:
+        rng = self.rng
+        totals = sorted([low_total] + [round(low_total * rng.uniform(1.0, 1.5), 2) for _ in range(num_bidders - 1)])[:num_bidders]
+        bidders = []
+        ids = rng.sample(range(1, num_bidders + 1), num_bidders)
+        for rank, (total, bidder_id) in enumerate(zip(totals, ids), 1):
+            city, zip_code = rng.choice(CITIES)
+            bidder = {
+                'rank': rank, 'total': total, 'id': bidder_id, 'vendor_id': f'VC{rng.randint(0, 10 ** 10):010}',
+                'name': self._company(), 'extra_name': self._company() if rng.random() < 0.15 else '',
+                'phone': f'{rng.randint(200, 999)} {rng.randint(200, 999)}-{rng.randint(0, 9999):04}',
+                'cslb': f'{rng.randint(0, 10 ** 8):08}', 'address': f'{rng.randint(1, 99999)} {rng.choice(STREETS)}',
+                'city': f'{city} CA  {zip_code}', 'notes': rng.choice(['', '', '', 'SB PREF CLAIMED', 'NSB PREF CLAIMED']),
+            }
+            if self.a_plus_b:
+                bidder['days'] = rng.randint(20, 200)
+                # the B) part (days x daily rate) stays a fraction of the bid so that A) is positive
+                rate = int(total * rng.uniform(0.05, 0.3) / bidder['days'])
+                bidder['rate'] = max(rate - rate % 100 if rate >= 1000 else rate, 1)
+                bidder['a_total'] = round(total - bidder['days'] * bidder['rate'], 2)
+            bidders.append(bidder)
+        return bidders
+
+    def _make_subcontractors(self, bidder: dict) -> List[dict]:
+        rng = self.rng
+        subcontractors = []
+        for _ in range(rng.choice([0, 0, 1, 2, 3, 4, 6])):
+            numbers = sorted(rng.sample(range(1, len(self.items) + 1), min(len(self.items), rng.randint(1, 3))))
+            if rng.random() < 0.3:
+                work = rng.choice(SUBCONTRACTED_WORK)
+            elif len(numbers) == 1:
+                work = f'ITEM {numbers[0]}'
+            else:
+                work = f'ITEMS {", ".join(map(str, numbers[:-1]))} AND {numbers[-1]}'
+            if rng.random() < 0.2:
+                work += ' (PARTIAL)'
+            city, _ = rng.choice(CITIES)
+            subcontractors.append({'name': self._company(), 'city': f'{city} CA', 'license': f'{rng.randint(100000, 1099999)}', 'work': work})
+        return subcontractors
+
+    @property
+    def num_subcontractors(self) -> int:
+        return sum(len(x) for x in self.subcontractors)
+
+    def manifest_row(self, identifier: str, filename: str, contract_type: int) -> dict:
+        return {
+            IDENTIFIER: identifier, FILENAME: filename, CONTRACT_TYPE: contract_type, CONTRACT_NUMBER: self.contract_number,
+            POSTPONED_CONTRACT: int(self.postponed), A_PLUS_B_INDICATOR: int(self.a_plus_b), NUMBER_OF_BIDDERS: len(self.bidders),
+            CONTRACT_ITEMS: len(self.items), NUMBER_OF_SUBCONTRACTORS: self.num_subcontractors,
+            BID_TOTAL: _money(self.bidders[0]['total']) if self.bidders else '',
+        }
+
+    # type 1 (lineprinter)
+
+    def type1(self) -> str:
+        opening, contract_date = self.bid_opening_date.strftime('%m/%d/%y'), self.contract_date.strftime('%m/%d/%y')
+        location = f'{self.district:02}-{self.county_code}-{self.route}-0'
+
+        def header(page_number: int, title: str) -> List[str]:
+            if page_number == 1:
+                return self._type1_first_page()
+            lines = [
+                _line((9, self.contract_number), (114, 'BID211')),
+                _line((9, location), (28, title), (114, f'PAGE {page_number:>2}')),
+                _line((9, opening), (114, contract_date)),
+            ]
+            if title.startswith('L I S T'):
+                lines[1] = _line((9, location), (114, f'PAGE {page_number:>2}'))
+                lines += [_line((43, title)), '', '']
+            return lines + ['']
+
+        pages = _Pages(header, T1_LINES_PER_PAGE, '\n\f\n')
+        pages.new_page()
+        if self.postponed:
+            pages.add(['', _line((35, 'POSTPONED CONTRACT')), ''])
+            return pages.text()
+
+        pages.add([
+            _line((14, 'BID RANK'), (29, 'BID TOTAL'), (41, 'BIDDER ID'), (59, 'BIDDER INFORMATION  (NAME/ADDRESS/LOCATION)')),
+            _line((14, '--------'), (28, '-----------'), (41, '---------'), (59, '-' * 49)),
+            '',
+        ])
+        for bidder in self.bidders:
+            lines = self._type1_bidder(bidder)
+            if not pages.fits(len(lines)):
+                pages.new_page()
+            pages.add(lines)
+
+        self._type1_subcontractors(pages)
+        self._type1_items(pages)
+        return pages.text()
+
+    def _type1_first_page(self) -> List[str]:
+        rng = self.rng
+        description = _wrap(f'IN {self.county} COUNTY IN {self.county_code} ON RTE {self.route} FROM {rng.randint(1, 50)}.{rng.randint(0, 9)} '
+                            f'MILE SOUTH OF {rng.choice(STREETS)} TO {rng.choice(STREETS)}', 40)
+        description += [''] * (4 - len(description))
+        difference = self.bidders[0]['total'] - self.engineers_est if self.bidders else 0
+        over_under = 'OVER' if difference >= 0 else 'UNDER'
+        return [
+            _line((18, 'STATE OF CALIFORNIA'), (49, 'B I D   S U M M A R Y'), (77, 'DEPARTMENT OF TRANSPORTATION'), (115, 'BID211')),
+            _line((119, 'PAGE  1')),
+            _line((4, 'BID OPENING DATE'), (24, self.bid_opening_date.strftime('%m/%d/%y')), (52, description[0]),
+                  (99, self.contract_date.strftime('%m/%d/%y'))),
+            _line((4, 'CONTRACT NUMBER'), (24, self.contract_number), (52, description[1]), (105, f"CONTRACT CODE '{self.contract_code} '")),
+            _line((4, 'LOCATION'), (24, f'{self.district:02}-{self.county_code}-{self.route}-0.0/{rng.randint(1, 40)}.{rng.randint(0, 9)}'),
+                  (52, description[2]), _right(108, str(len(self.items))), (109, 'CONTRACT ITEMS')),
+            _line((52, description[3])).rstrip(),
+            '',
+            _line((52, self.work), (94, 'FEDERAL AID  ' + rng.choice(['NONE', 'ACIM-2101-(803)E', 'STPL-5924(078)']))),
+            '', '', '',
+            _line((13, 'DB GOALS:   DISADVANTAGED BUSINESS ENTERPRISE -  3.0%')),
+            _line((0, 'PROPOSALS ISSUED'), (19, f'{rng.randint(len(self.bidders), 40)}'), (25, 'FUND TOTAL   HM1'), (57, '0'),
+                  (83, 'TOTAL NUMBER OF WORKING DAYS'), _right(117, str(self.working_days))),
+            '',
+            _line((0, 'NUMBER OF BIDDERS'), (19, str(len(self.bidders))), (24, 'ENGINEERS EST'), _right(55, _money(self.engineers_est)),
+                  (57, f'AMOUNT {over_under}'), _right(86, _money(abs(difference))),
+                  (94, f'PERCENT {over_under} EST'), (113, f'{abs(difference) / self.engineers_est * 100:.2f}')),
+            '',
+        ]
+
+    def _type1_bidder(self, bidder: dict) -> List[str]:
+        first = [_right(19, str(bidder['rank']))]
+        if self.a_plus_b:
+            first += [(20, 'A)'), _right(40, _money(bidder['a_total']))]
+        else:
+            first += [_right(40, _money(bidder['total']))]
+        first += [_right(45, str(bidder['id'])), (59, bidder['name'][:36]), (97, bidder['phone'])]
+        if bidder['notes']:
+            first.append((111, bidder['notes']))
+        lines = [_line(*first), _line((59, bidder['extra_name'][:36]), (97, bidder['cslb']))]
+        address = _line((59, bidder['address']), (93, 'FAX ' + bidder['phone']))
+        if self.a_plus_b:
+            lines += [
+                _line((23, 'B)'), (27, f"{bidder['days']} DAYS X {bidder['rate']:>6}"), (59, bidder['address']), (93, 'FAX ' + bidder['phone'])),
+                _line((22, '-' * 20)),
+                _line((21, 'A+B)'), _right(40, _money(bidder['total'])), (59, bidder['city'])),
+            ]
+        else:
+            lines += [address, _line((59, bidder['city']))]
+        return lines + ['']
+
+    def _type1_subcontractors(self, pages: _Pages):
+        title = 'L I S T   O F   S U B C O N T R A C T O R S'
+        header = [
+            _line((0, 'BIDDER ID'), (10, 'NAME AND ADDRESS'), (70, 'DESCRIPTION OF PORTION OF WORK SUBCONTRACTED')),
+            _line((0, '_' * 9), (10, '_' * 60), (71, '_' * 60)),
+            '',
+        ]
+        pages.new_page(title)
+        for bidder, subcontractors in zip(self.bidders, self.subcontractors):
+            if not subcontractors:
+                continue
+            if not pages.fits(len(header) + 3):
+                pages.new_page(title)
+            pages.add(header)
+            bidder_id = f"{bidder['id']:02}"
+            for i, subcontractor in enumerate(subcontractors):
+                if not pages.fits(3):
+                    pages.add(['CONTINUED ON NEXT PAGE'])
+                    pages.new_page(title)
+                    pages.add(header)
+                    i = 0
+                rows = [
+                    _line((3, bidder_id if i == 0 else ''), (10, subcontractor['name']), (71, subcontractor['work'])),
+                    _line((10, subcontractor['city'])),
+                    '',
+                ]
+                pages.add(rows)
+            pages.add([''])
+
+    def _type1_items(self, pages: _Pages):
+        title = 'C O N T R A C T   P R O P O S A L   O F   L O W   B I D D E R'
+        header = [
+            '',
+            '-' * 132,
+            _line((4, 'ITEM'), (14, 'ITEM'), (69, 'UNIT OF'), (81, 'ESTIMATED')),
+            _line((5, 'NO.'), (14, 'CODE'), (34, 'ITEM DESCRIPTION'), (69, 'MEASURE'), (81, 'QUANTITY'), (99, 'BID'), (116, 'AMOUNT')),
+            '-' * 132,
+            '',
+        ]
+        pages.new_page(title)
+        pages.add(header)
+        for item in self.items:
+            description = _wrap(item['description'], 45)
+            if not pages.fits(len(description)):
+                pages.new_page(title)
+                pages.add(header)
+            fields = [_right(7, str(item['number']))]
+            if item['flag']:
+                fields.append((8, f"({item['flag']})"))
+            fields += [(13 if item['flag'] else 12, item['code']), (24, description[0]), (71, item['unit'])]
+            if item['quantity'] is None:
+                fields += [(78, 'LUMP SUM')]
+            else:
+                fields += [_right(85, f"{item['quantity']:,}")]
+            price = _money(item['price'])
+            fields += [_right(101, price[1:] if price.startswith('0.') else price), _right(118, _money(item['amount']))]
+            pages.add([_line(*fields)] + [_line((24, x)) for x in description[1:]])
+        pages.add(['', _line((97, 'TOTAL'), _right(118, _money(self.bidders[0]['total'])))])
+
+    # type 2 (table)
+
+    def type2(self) -> str:
+        opening, contract_date = self.bid_opening_date.strftime('%m/%d/%Y'), self.contract_date.strftime('%m/%d/%Y')
+
+        def header(page_number: int, title: str) -> List[str]:
+            if page_number == 1:
+                return self._type2_first_page()
+            return [
+                _line((0, 'Bid Opening Date:'), (19, opening), (133, f'Page {page_number}')),
+                '',
+                _line((0, 'Contract Number:'), (19, self.contract_number), (133, contract_date)),
+                '',
+            ]
+
+        pages = _Pages(header, T2_LINES_PER_PAGE, '\n\f')
+        pages.new_page()
+        if self.postponed:
+            pages.add([_line((40, 'Postponed Contract')), ''])
+            return pages.text()
+
+        for bidder in self.bidders:
+            lines = self._type2_bidder(bidder)
+            if not pages.fits(len(lines)):
+                pages.new_page()
+            pages.add(lines)
+
+        self._type2_subcontractors(pages)
+        self._type2_items(pages)
+        return pages.text()
+
+    def _type2_first_page(self) -> List[str]:
+        rng = self.rng
+        description = _wrap(f'{self.county} COUNTY IN {self.county_code} ON ROUTE {self.route} FROM {rng.randint(1, 50)}.{rng.randint(0, 9)} '
+                            f'MILE SOUTH OF {rng.choice(STREETS)} TO {rng.choice(STREETS)}', 56)
+        difference = self.bidders[0]['total'] - self.engineers_est if self.bidders else 0
+        lines = [
+            '',
+            _line((52, 'State of California Department of Transportation')),
+            '',
+            _line((70, 'Bid Summary')),
+            '',
+            _line((0, 'Bid Opening Date:'), (18, self.bid_opening_date.strftime('%m/%d/%Y')), (147, 'Page 1')),
+            '',
+            _line((0, 'Contract Number:'), (20, self.contract_number), (141, self.contract_date.strftime('%m/%d/%Y'))),
+            '',
+            _line((0, 'Project ID:'), (20, f'{rng.randint(0, 10 ** 10):010}'), (41, description[0]), (106, f'Contract Code:        {self.contract_code}')),
+            '',
+        ]
+        for line in description[1:]:
+            lines += [_line((41, line)), '']
+        lines += [
+            _line((0, f'Location: {self.district:02}-{self.county_code.title()}-{self.route}-{rng.randint(0, 40)}.{rng.randint(0, 9)}'),
+                  (41, self.work.capitalize()), (106, f'Number of Items:      {len(self.items)}')),
+            '',
+            _line((0, 'DBE - 22.0%'), (106, 'Federal Aid #1: ' + rng.choice(['NONE', 'ACIM-0056(360)E', 'ACST-ER-31S4(004)E']))),
+            '',
+            _line((0, f'Proposals Issued:   {rng.randint(len(self.bidders), 40)}'), (31, f'Total Number of Working Days:  {self.working_days}'),
+                  (71, 'Overrun/Underrun:'), (89, _money(difference))),
+            '',
+            _line((0, f'Number of Bidders:  {len(self.bidders)}'), (31, 'Engineers Est:'), _right(69, _money(self.engineers_est)),
+                  (71, '% Over/Under Est:'), (89, f'{difference / self.engineers_est * 100:.2f}%')),
+            '',
+        ]
+        if not self.postponed:
+            lines += [_line((0, 'Bid Rank'), (20, 'Bid Total'), (41, 'Bidder Id'), (55, 'Bidder Information (Name/Address/Location)')), '', '']
+        return lines
+
+    def _type2_bidder(self, bidder: dict) -> List[str]:
+        if self.a_plus_b:
+            return [
+                _line((0, str(bidder['rank'])), (13, 'A)'), (23, '$' + _money(bidder['a_total'])), (38, bidder['vendor_id']),
+                      (59, bidder['name'][:50]), (111, 'Phone  (' + bidder['phone'].replace(' ', ')'))),
+                '',
+                _line((13, 'B)'), (20, f"{bidder['days']} Days * {bidder['rate']}"), (59, bidder['address']),
+                      (111, f"CSLB#  {bidder['cslb']}"), (133, bidder['notes'])).rstrip(),
+                '',
+                _line((13, 'A+B)'), (23, '$' + _money(bidder['total'])), (59, bidder['city'])),
+                '',
+            ]
+        lines = [
+            _line((0, str(bidder['rank'])), _right(34, '$' + _money(bidder['total'])), (35, bidder['vendor_id']), (49, bidder['name'][:58]),
+                  (109, 'Phone  (' + bidder['phone'].replace(' ', ')'))),
+            '',
+        ]
+        if bidder['extra_name']:
+            lines += [_line((49, bidder['extra_name'])), '']
+        lines += [
+            _line((49, bidder['address']), (109, f"CSLB#  {bidder['cslb']}"), (131, bidder['notes'])).rstrip(),
+            '',
+            _line((49, bidder['city'])),
+            '',
+        ]
+        return lines
+
+    def _type2_subcontractors(self, pages: _Pages):
+        header = [
+            '',
+            _line((55, 'LIST OF SUBCONTRACTORS')),
+            '',
+            _line((0, 'BIDDER ID'), (22, 'NAME AND ADDRESS'), (55, 'LICENSE NUMBER'), (73, 'DESCRIPTION OF PORTION OF WORK SUBCONTRACTED')),
+            '',
+        ]
+        if not self.num_subcontractors:
+            return
+        pages.new_page()
+        for bidder, subcontractors in zip(self.bidders, self.subcontractors):
+            if not subcontractors:
+                continue
+            if not pages.fits(len(header) + 4):
+                pages.new_page()
+            pages.add(header)
+            for subcontractor in subcontractors:
+                if not pages.fits(4):
+                    pages.new_page()
+                    pages.add(header)
+                pages.add([
+                    _line((0, bidder['vendor_id']), (22, subcontractor['name'][:32]), (73, subcontractor['work'])),
+                    '',
+                    _line((22, subcontractor['city']), (55, subcontractor['license'])),
+                    '',
+                ])
+
+    def _type2_items(self, pages: _Pages):
+        header = [
+            '',
+            _line((56, 'Contract Proposal of Low Bidder')),
+            '',
+            _line((0, 'Item'), (6, 'Item'), (40, 'Item Description'), (91, 'Unit of'), (100, 'Estimated'), (111, 'Bid'), (126, 'Amount')),
+            '',
+            _line((0, 'No.'), (6, 'Code'), (91, 'Measure'), (100, 'Quantity')),
+            '',
+        ]
+        pages.new_page()
+        pages.add(header)
+        for item in self.items:
+            description = _wrap(item['description'], 70)
+            if not pages.fits(2 * len(description)):
+                pages.new_page()
+                pages.add(header)
+            fields = [(0, f"{item['number']:04}")]
+            if item['flag']:
+                fields.append((6, item['flag']))
+            fields += [(10 if item['flag'] else 6, item['code']), (19, description[0]), (91, item['unit'])]
+            fields += [(100, 'LUMP SUM' if item['quantity'] is None else f"{item['quantity']:,}.0")]
+            fields += [(111, _money(item['price'])), (126, _money(item['amount']))]
+            pages.add([_line(*fields), ''])
+            for line in description[1:]:
+                pages.add([_line((19, line)), ''])
+        pages.add([_line((117, 'A)'), (127, _money(self.bidders[0]['a_total' if self.a_plus_b else 'total'])))])
+
+
+def generate_corpus(num_contracts: int, path: Path = RAW_DATA_PATH, seed: int = 42, type2_share: float = 0.3, doc_share: float = 0.2,
+                    contracts_per_doc: Tuple[int, int] = (2, 30)) -> pd.DataFrame:
+    """
+    Writes num_contracts synthetic contracts in the raw_data layout that sort_contracts expects:
+
+        <path>/lineprinter/<name>.pdf_<tag>.txt    type 1 contracts (and the lineprinter version of type 2)
+        <path>/table/<name>.pdf_<tag>.txt          type 2 contracts (and the table version of type 1)
+        <path>/doc/<name>.pdf_<tag>.txt            multi-contract type 1 documents, contracts_per_doc contracts each
+
+    About type2_share of the contracts are type 2 and doc_share of them end up in doc files.
+    Returns (and saves to <path>/manifest.csv) one row per contract with the identifier sort_contracts will give it
+    and the generated values (contract number, number of bidders, items and subcontractors, low bid total, ...).
+    """
+    rng = random.Random(seed)
+    path = Path(path)
+    # chance that a file is a doc file, so that about doc_share of the contracts are in doc files
+    mean_per_doc = sum(contracts_per_doc) / 2
+    doc_chance = doc_share / (mean_per_doc * (1 - doc_share) + doc_share)
+    for folder in ('lineprinter', 'table', 'doc'):
+        (path / folder).mkdir(exist_ok=True, parents=True)
+
+    manifest = []
+    tag = 100000
+    progress = tqdm(total=num_contracts)
+    while len(manifest) < num_contracts:
+        tag += 1
+        left = num_contracts - len(manifest)
+        filename = f'{rng.randint(1, 12):02}-{"".join(rng.choice(ALPHANUMERIC) for _ in range(6))}.pdf_{tag}'
+        if left >= contracts_per_doc[0] and rng.random() < doc_chance:
+            # multi-contract document, split by sort_contracts into t1_<tag>_00, t1_<tag>_01, ...
+            contracts = [SyntheticContract(rng) for _ in range(min(left, rng.randint(*contracts_per_doc)))]
+            with open(path / 'doc' / f'{filename}.txt', 'w', encoding='ISO-8859-1') as file:
+                file.write('\n\n\n' + ''.join(x.type1() for x in contracts))
+            manifest += [x.manifest_row(f't1_{tag}_{i:02}', filename, 1) for i, x in enumerate(contracts)]
+            progress.update(len(contracts))
+            continue
+
+        contract = SyntheticContract(rng)
+        contract_type = 2 if rng.random() < type2_share else 1
+        # both renderings of the same pdf exist, sort_contracts tells the type from the lineprinter one
+        text = contract.type2() if contract_type == 2 else contract.type1()
+        for folder in ('lineprinter', 'table'):
+            with open(path / folder / f'{filename}.txt', 'w', encoding='ISO-8859-1') as file:
+                file.write(text)
+        manifest.append(contract.manifest_row(f't{contract_type}_{tag}', filename, contract_type))
+        progress.update(1)
+    progress.close()
+
+    df = pd.DataFrame(manifest)
+    df.to_csv(path / 'manifest.csv', index=False)
+    print(f'Generated {num_contracts} contracts in {path}.')
+    return df
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Generates a synthetic corpus of contracts in raw_data for scale testing.')
+    parser.add_argument('num_contracts', type=int)
+    parser.add_argument('--path', type=Path, default=RAW_DATA_PATH, help='where to write the lineprinter/table/doc folders')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--type2-share', type=float, default=0.3, help='share of type 2 contracts')
+    parser.add_argument('--doc-share', type=float, default=0.2, help='share of contracts in multi-contract doc files')
+    args = parser.parse_args()
+    generate_corpus(args.num_contracts, args.path, args.seed, args.type2_share, args.doc_share)
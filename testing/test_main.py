@@ -2,8 +2,30 @@ from pathlib import Path
 import pandas as pd
 import numpy as np
 import re
+import asyncio
+import random
+import shutil
+import threading
+import time
+import multiprocessing
+import pytest
 
-from contract import Info, Info2, Bids, Bids2, Subcontractors, Subcontractors2, Items, Items2, Contract, read_file, split_contract
+from benchmark import compare_results
+from experiment import Experiment, extract_info, sort_contracts, classify_file, process_contract, CONTRACT_NUMBER_REGEX
+from service import ExtractionService, extract_remote
+from cache import ResultCache
+from store import ResultStore
+from profiling import StageTimer, write_profile_report
+import pickle
+from concurrent.futures import ThreadPoolExecutor
+from rows import rows_to_frame
+from synthetic import SyntheticContract, generate_corpus
+from writers import StreamingWriter, to_typed, write_excel, csv_to_excel
+from openpyxl import load_workbook
+from joins import expand_item_numbers, subcontracted_items
+from constants import (CONTRACT_NUMBER, NUMBER_OF_BIDDERS, IDENTIFIER, CONTRACT_TYPE, ERROR, BIDDER_ID, SUBCONTRACTOR_NAME, ITEM_NUMBERS, 
+                       ITEM_NUMBER, ITEM_DOLLAR_AMOUNT, ITEM_CODE, BID_TOTAL)
+from contract import Info, Info2, Bids, Bids2, Subcontractors, Subcontractors2, Items, Items2, Contract, FixedWidthLayout, SectionIndex, read_file, map_file, decode, split_contract, split_contract_positions, ContractRecord, iter_split_contract, search_keyword, search_number_before, LineIndex
 
 NA_VALUES = [None, "None", '', 'N/A', np.nan, 'nan']
 TEST_DATA = Path('testing/data')
@@ -87,6 +109,533 @@ def test_split_contract():
     file_contents = read_file(TEST_DATA / 'doc_3073.txt')
     a = split_contract(file_contents, '3073')
     assert len(a) == 28
+    # same partial texts when read a chunk at a time, also when chunks end in the middle of a header
+    assert dict(iter_split_contract(TEST_DATA / 'doc_3073.txt', '3073', chunk_size=5000)) == a
+    mapped = split_contract(map_file(TEST_DATA / 'doc_3073.txt'), '3073')
+    assert dict(iter_split_contract(TEST_DATA / 'doc_3073.txt', '3073', binary=True, chunk_size=5000)) == mapped
+    # header twice on a line is one match, like the regex
+    text = 'x\nSTATE OF CALIFORNIA B I D   S U M M A R Y DEPARTMENT OF TRANSPORTATION STATE OF CALIFORNIA B I D   S U M M A R Y\nDEPARTMENT OF TRANSPORTATION\ny'
+    assert list(split_contract_positions(text, 't').values()) == [(2, len(text))]
+    
+
+
+def test_fixed_width_layout():
+    # same as re.match(r"^(.{2})(.{3})(.+)$", line)
+    layout = FixedWidthLayout([0, 2, 5])
+    assert layout.split('ab cdef') == ('ab', ' cd', 'ef')
+    assert layout.split('ab cd') is None
+    assert FixedWidthLayout([0, 2, 5], tail_required=False).split('ab cd') == ('ab', ' cd', '')
+    
+
+
+def test_section_index():
+    # narrowing through the section index must give the same matches as running NARROW_REGEX over the whole file
+    file_contents = read_file(TEST_DATA / 'doc_3073.txt')
+    section_index = SectionIndex(file_contents, 't1')
+    for portion in (Info, Bids, Subcontractors, Items):
+        expected = portion(file_contents, 'test').preprocess(portion.NARROW_REGEX)
+        assert portion(file_contents, 'test', section_index).preprocess(portion.NARROW_REGEX) == expected
+    
+
+
+def test_mapped_reader():
+    file_contents = read_file(TEST_DATA / 'doc_3073.txt')
+    mapped_contents = map_file(TEST_DATA / 'doc_3073.txt')
+    assert decode(mapped_contents[:]) == file_contents
+    
+    splits = split_contract(file_contents, '3073')
+    mapped_splits = split_contract(mapped_contents, '3073')
+    assert {key: decode(value) for key, value in mapped_splits.items()} == splits
+    
+    section_index = SectionIndex(mapped_contents, 't1')
+    for portion in (Info, Bids, Subcontractors, Items):
+        expected = portion(file_contents, 'test').preprocess(portion.NARROW_REGEX)
+        assert portion(mapped_contents, 'test', section_index).preprocess(portion.NARROW_REGEX) == expected
+    
+
+
+def test_contract_record():
+    # virtual split: reading through the byte offsets gives the same text as the split files
+    filepath = TEST_DATA / 'doc_3073.txt'
+    splits = split_contract(read_file(filepath), '3073')
+    positions = split_contract_positions(map_file(filepath), '3073')
+    assert positions.keys() == splits.keys()
+    for key, (start, end) in positions.items():
+        assert ContractRecord('t1_' + key, 1, str(filepath), start, end, True).read() == splits[key]
+    
+
+
+def test_streaming_writer(tmp_path):
+    # columns differ between rows, output must be the same as writing all the rows at once
+    rows = [{'a': '1', 'b': 'x'}, {'a': '2'}, {'a': '3', 'c': 'y, z'}, {'b': 'w', 'a': '4'}]
+    writer = StreamingWriter(tmp_path, chunk_size=2)
+    for row in rows:
+        writer.write('Items', [row])
+    writer.close()
+    assert (tmp_path / 'Items.csv').read_text() == pd.DataFrame(rows).to_csv(index=False)
+    assert not (tmp_path / 'Items.csv.part').exists()
+    
+
+
+def test_to_typed():
+    df = pd.DataFrame({'Bid_Total': ['1,234,567.89', '-687,097.50', None, 'N/A'], 
+                       'Bid_Opening_Date': ['03/14/19', '03/14/2019', None, 'x'],
+                       'Number_of_Bidders': ['6', '1.0', None, ''],
+                       'Bidder_Name': ['A', None, 'B', 'C']}, dtype=str)
+    typed = to_typed(df)
+    assert typed['Bid_Total'].tolist() == [123456789, -68709750, pd.NA, pd.NA]
+    assert typed['Bid_Opening_Date'].tolist()[:2] == [pd.Timestamp('2019-03-14')] * 2
+    assert typed['Bid_Opening_Date'].isna().tolist() == [False, False, True, True]
+    assert typed['Number_of_Bidders'].tolist() == [6, 1, pd.NA, pd.NA]
+    assert str(typed['Bidder_Name'].dtype) == 'string'
+    
+
+
+def test_result_cache(tmp_path):
+    cache = ResultCache(tmp_path)
+    raw = read_test_file('items', 1)
+    items = Items(raw, 'test')
+    assert cache.get('abc', items) is None
+    items.extract()
+    cache.put('abc', items, items.rows)
+    assert cache.get('abc', items) == items.rows
+    assert cache.get('abc', Items2(raw, 'test')) is None  # different parser
+    assert (cache.hits, cache.misses) == (1, 2)
+    
+    
+def test_result_cache_identifiers(tmp_path, monkeypatch):
+    # the same text under two identifiers: the second one is a cache hit but must keep its own identifier
+    filepath = TEST_DATA / 'doc_3073.txt'
+    start, end = next(iter(split_contract_positions(map_file(filepath), '3073').values()))
+    text = map_file(filepath)[start:end]
+    records = []
+    for identifier in ('t1_first', 't1_second'):
+        (tmp_path / f'{identifier}.txt').write_bytes(text)
+        records.append(ContractRecord(identifier, 1, str(tmp_path / f'{identifier}.txt'), 0, len(text), False))
+    monkeypatch.chdir(tmp_path)
+    
+    experiment = Experiment(records, cache=True)
+    results = list(experiment._process_all())
+    assert [stats['cache_hits'] for _, _, stats in results] == [0, 4]
+    for record, (_, tables, _) in zip(records, results):
+        rows = [row for name in ('Info', 'Bids', 'Subcontractors', 'Items') for row in tables[name]]
+        assert rows and {row[IDENTIFIER] for row in rows} == {record.identifier[3:]}
+
+
+def test_compare_benchmarks():
+    baseline = {'benchmarks': {'Items._parse': {'best': 1.0}, 'Bids._parse': {'best': 1.0}, 'split_contract': {'best': 1.0}}}
+    results = {'benchmarks': {'Items._parse': {'best': 1.5}, 'Bids._parse': {'best': 1.1}, 'Contract.extract': {'best': 9.0}}}
+    assert compare_results(results, baseline, tolerance=0.2) == ['Items._parse']
+    
+
+
+def test_synthetic_contract(tmp_path):
+    # generated contracts must parse back to the generated values
+    rng = random.Random(0)
+    for i in range(4):
+        synthetic = SyntheticContract(rng, postponed=False)
+        for contract_type, text in ((1, synthetic.type1()), (2, synthetic.type2())):
+            filepath = tmp_path / f't{contract_type}_{i}.txt'
+            filepath.write_text(text, encoding='ISO-8859-1')
+            record = ContractRecord(filepath.stem, contract_type, str(filepath), 0, filepath.stat().st_size, False)
+            contract = Contract(record.identifier, record=record)
+            contract.extract()
+            assert contract.info.rows[0][CONTRACT_NUMBER] == synthetic.contract_number
+            assert contract.info.rows[0][NUMBER_OF_BIDDERS] == str(len(synthetic.bidders))
+            assert len(contract.bids.rows) == len(synthetic.bidders)
+            assert len(contract.items.rows) == len(synthetic.items)
+    
+
+
+def test_profile_report(tmp_path):
+    filepath = TEST_DATA / 'doc_3073.txt'
+    positions = split_contract_positions(map_file(filepath), '3073')
+    contracts = []
+    for key, (start, end) in list(positions.items())[:3]:
+        timer = StageTimer()
+        with timer.stage('total'):
+            Contract('t1_' + key, record=ContractRecord('t1_' + key, 1, str(filepath), start, end, True), timer=timer).extract()
+        total = timer.times.pop('total')
+        contracts.append({IDENTIFIER: key, CONTRACT_TYPE: 't1', 'total': total, 'times': timer.times, 'counts': timer.counts})
+    assert {'read', 'section_index', 'Info._parse', 'Items.preprocess', 'Bids._parse'} <= set(timer.times)
+    report = write_profile_report(tmp_path, contracts, {'processing': 1.0})
+    assert report['stages']['Info._parse']['calls'] == 3
+    assert len(pd.read_csv(tmp_path / 'slowest_contracts.csv')) == 3
+    
+
+
+def test_watchdog_timeout(tmp_path, monkeypatch):
+    # a contract stuck in a parser is aborted, the others are extracted as usual
+    filepath = (TEST_DATA / 'doc_3073.txt').resolve()
+    positions = split_contract_positions(map_file(filepath), '3073')
+    records = [ContractRecord('t1_' + key, 1, str(filepath), start, end, True) for key, (start, end) in list(positions.items())[:3]]
+    stuck = records[1].identifier[3:]
+    parse = Bids._parse
+
+    def slow_parse(text, identifier):
+        while identifier == stuck:
+            pass
+        return parse(text, identifier)
+
+    monkeypatch.setattr(Bids, '_parse', staticmethod(slow_parse))
+    # the patched parser only reaches the watchdog worker if it is forked (spawn imports contract.py again)
+    if 'fork' not in multiprocessing.get_all_start_methods():
+        pytest.skip('needs the fork start method')
+    monkeypatch.setattr('experiment.Process', multiprocessing.get_context('fork').Process)
+    monkeypatch.chdir(tmp_path)
+    results = list(Experiment(records, workers=2, timeout=1)._process_all())
+    assert [filepath for filepath, _, _ in results] == records
+    assert [len(tables['Errors']) for _, tables, _ in results] == [0, 1, 0]
+    assert isinstance(results[1][1]['Errors'][0][ERROR], TimeoutError)
+    assert results[2][1]['Bids']
+    
+
+
+def test_parallel_matches_serial(tmp_path, monkeypatch):
+    filepath = (TEST_DATA / 'doc_3073.txt').resolve()
+    positions = split_contract_positions(map_file(filepath), '3073')
+    records = [ContractRecord('t1_' + key, 1, str(filepath), start, end, True) for key, (start, end) in positions.items()]
+    # an empty contract fails, its error comes back from the worker as a string
+    records.append(ContractRecord('t1_3073_empty', 1, str(filepath), 0, 0, True))
+    monkeypatch.chdir(tmp_path)
+    
+    def run(workers):
+        return [(filepath, {name: [dict(row) for row in rows] for name, rows in tables.items()}) 
+                for filepath, tables, _ in Experiment(records, workers=workers)._process_all()]
+    
+    serial, parallel = run(1), run(2)
+    assert parallel == serial
+    assert [filepath for filepath, _ in parallel] == records
+    errors = parallel[-1][1]['Errors']
+    assert len(errors) == 1 and isinstance(errors[0][ERROR], str)
+    assert sum(len(tables['Bids']) for _, tables in parallel) > 0
+
+
+def test_lazy_dataframe():
+    sc = Subcontractors(read_test_file('subcontractors', 1), 'test')
+    sc.extract()
+    assert sc._df is None
+    assert len(sc.df) == len(sc.rows) > 0
+    # nothing extracted: a single error row, only built when asked for
+    bids = Bids('nothing to see here', 'test')
+    bids.extract()
+    assert bids.rows == [] and bids._df is None
+    assert bids.df[ERROR][0] == 1
+    assert list(bids.df.columns) == Bids.COLUMNS
+    
+
+
+def test_rows():
+    # rows behave like the defaultdict(str) rows they replace
+    row = Bids.Row()
+    row['Identifier'] = 'test'
+    row['Bidder_Name'] += 'A'
+    assert dict(row) == {'Identifier': 'test', 'Bidder_Name': 'A'}
+    assert row.get('Bid_Total') is None and 'Bid_Total' not in row
+    assert pickle.loads(pickle.dumps(row)) == row
+    rows = Subcontractors._parse(Subcontractors(read_test_file('subcontractors', 1), 'test').preprocess(Subcontractors.NARROW_REGEX)[0], 'test')
+    rows += Items._parse(read_test_file('items', 1), 'test')
+    assert rows_to_frame(rows).equals(pd.DataFrame([dict(x) for x in rows]))
+    # the columns are in the order the parser sets them, as in the frames built from defaultdict(str) rows, 
+    # also with pd.DataFrame(rows) (pandas sorts the columns of mappings that are not dicts)
+    text = ("   BIDDER ID NAME AND ADDRESS" + ' ' * 44 + "DESCRIPTION OF PORTION OF WORK SUBCONTRACTED\n\n"
+            "      02     APPLY A LINE INC" + ' ' * 45 + "ITEMS 6 THRU 8 (10%)\n             ANDERSON CA\n\n\f")
+    sc = Subcontractors(text, 'test')
+    sc.extract()
+    columns = [IDENTIFIER, BIDDER_ID, SUBCONTRACTOR_NAME, 'Subcontracted_Line_Item', ITEM_NUMBERS, 'Percent', 'Subcontractor_License_Number']
+    assert list(sc.df.columns) == list(pd.DataFrame(sc.rows).columns) == columns
+    
+
+
+def test_items_batch(tmp_path, monkeypatch):
+    # one scan over the sections of many contracts gives the same rows as parsing them one by one
+    file_contents = read_file(TEST_DATA / 'doc_3073.txt')
+    portions = [Items(text, key) for key, text in split_contract(file_contents, '3073').items()]
+    sections = [(portion.identifier, text) for portion in portions for text in portion.preprocess(Items.NARROW_REGEX)]
+    sections.append(('test', read_test_file('items', 1)))
+    assert Items.parse_batch(sections) == [Items._parse(text, identifier) for identifier, text in sections]
+    Items.extract_batch(portions)
+    for portion in portions:
+        expected = [row for text in portion.preprocess(Items.NARROW_REGEX) for row in Items._parse(text, portion.identifier)]
+        assert portion.rows == expected
+    
+    # in an Experiment, also with the cache, an empty contract and a type 2 contract in the batches
+    filepath = (TEST_DATA / 'doc_3073.txt').resolve()
+    records = [ContractRecord('t1_' + key, 1, str(filepath), start, end, True) for key, (start, end) in split_contract_positions(map_file(filepath), '3073').items()]
+    records.insert(3, ContractRecord('t1_3073_empty', 1, str(filepath), 0, 0, True))
+    (tmp_path / 't2_test.txt').write_text(read_test_file('items', 2))
+    records.insert(5, ContractRecord('t2_test', 2, str(tmp_path / 't2_test.txt'), 0, (tmp_path / 't2_test.txt').stat().st_size, False))
+    monkeypatch.chdir(tmp_path)
+    
+    def run(**kwargs):
+        return [(filepath, {name: [dict(row) for row in rows] for name, rows in tables.items()}) 
+                for filepath, tables, _ in Experiment(records, **kwargs)._process_all()]
+    
+    expected = run()
+    assert sum(len(tables['Items']) for _, tables in expected) > 0
+    assert run(items_batch=4) == expected
+    assert run(items_batch=4, cache=True) == run(items_batch=4, cache=True) == expected
+    # a failed batch falls back to the contracts one by one
+    monkeypatch.setattr(Items, 'extract_batch', classmethod(lambda cls, portions: 1 / 0))
+    assert run(items_batch=4) == expected
+    
+
+
+def test_info_batch(tmp_path):
+    # column-wise extraction over all the headers gives the same table as parsing them one by one
+    filepath = TEST_DATA / 'doc_3073.txt'
+    positions = split_contract_positions(map_file(filepath), '3073')
+    records = [ContractRecord('t1_' + key, 1, str(filepath), start, end, True) for key, (start, end) in positions.items()]
+    rows = []
+    for record in records:
+        contract = Contract(record.stem, record=record)
+        contract.info.extract()
+        rows += contract.info.rows
+    info, errors = extract_info(records)
+    assert info.equals(rows_to_frame(rows)) and errors.empty
+    # memory-mapped files, errors have the columns of the Errors table of an Experiment
+    (tmp_path / f'{records[0].stem}.txt').write_bytes(records[0].read(mapped=True))
+    (tmp_path / 't1_empty.txt').write_bytes(b'')
+    info, errors = extract_info([tmp_path / f'{records[0].stem}.txt', tmp_path / 't1_empty.txt'], mapped=True)
+    assert info.equals(rows_to_frame(rows[:1]))
+    assert list(errors.columns) == [IDENTIFIER, ERROR, CONTRACT_TYPE] and errors[IDENTIFIER].tolist() == ['t1_empty']
+    
+    # both fixtures
+    headers = [('01-AAAAAA_1234', read_test_file('info', 1))]
+    assert Info.parse_batch(headers).equals(rows_to_frame(Info._parse(headers[0][1], headers[0][0])))
+    headers = [('test', x) for x in re.findall(r'(?s)Bid Summary(.*?)Bid Rank', read_test_file('info', 2))]
+    expected = rows_to_frame([Info2._parse(text, identifier)[0] for identifier, text in headers])
+    assert Info2.parse_batch(headers).equals(expected)
+    
+
+
+def test_prefetch(tmp_path, monkeypatch):
+    # contracts read ahead on threads give the same results as reading them one by one, failed reads included
+    filepath = (TEST_DATA / 'doc_3073.txt').resolve()
+    positions = split_contract_positions(map_file(filepath), '3073')
+    records = [ContractRecord('t1_' + key, 1, str(filepath), start, end, True) for key, (start, end) in positions.items()]
+    records.insert(1, ContractRecord('t3_unsupported', 1, str(filepath), 0, 100, False))
+    missing = records + [ContractRecord('t1_missing', 1, str(tmp_path / 'missing.txt'), 0, 100, False)]
+    monkeypatch.chdir(tmp_path)
+    for mapped in (False, True):
+        serial = list(Experiment(missing, mapped=mapped)._process_all())
+        with ThreadPoolExecutor(2) as io_pool:
+            prefetched = list(Experiment(missing, mapped=mapped, prefetch=2)._process_all(io_pool))
+        assert [filepath for filepath, _, _ in prefetched] == missing
+        for (_, expected, _), (_, tables, _) in zip(serial, prefetched):
+            assert {name: len(rows) for name, rows in tables.items()} == {name: len(rows) for name, rows in expected.items()}
+            assert [str(error[ERROR]) for error in tables['Errors']] == [str(error[ERROR]) for error in expected['Errors']]
+    
+    experiment = Experiment(records, prefetch=2)
+    experiment.run()
+    assert (experiment.outliers_path / 't3_unsupported.txt').exists()
+    assert len(experiment.info) == len(records) - 1
+    
+
+
+def test_subcontracted_items():
+    subcontractors = pd.DataFrame({
+        IDENTIFIER: ['1', '1', '1', '2'],
+        BIDDER_ID: ['01', '01', '02', '01'],
+        SUBCONTRACTOR_NAME: ['A', 'B', 'C', 'D'],
+        ITEM_NUMBERS: [' 6 - 8 , 13 ', np.nan, ' 2', ' 0074'],
+    })
+    items = pd.DataFrame({
+        IDENTIFIER: ['1'] * 5 + ['2'],
+        ITEM_NUMBER: ['2', '6', '7', '8', '13', '0074'],
+        ITEM_DOLLAR_AMOUNT: ['1.00', '6.00', '7.00', '8.00', '13.00', '74.00'],
+    })
+    long = expand_item_numbers(subcontractors)
+    assert long[ITEM_NUMBER].tolist() == [6, 7, 8, 13, 2, 74]
+    assert long.index.tolist() == [0, 0, 0, 0, 2, 3]
+    
+    joined = subcontracted_items(subcontractors, items)
+    assert joined[SUBCONTRACTOR_NAME].tolist() == ['A'] * 4 + ['C', 'D']
+    assert joined[ITEM_DOLLAR_AMOUNT].tolist() == ['6.00', '7.00', '8.00', '13.00', '1.00', '74.00']
+    # item numbers the contract doesn't have are kept
+    subcontractors.loc[1, ITEM_NUMBERS] = '99'
+    assert subcontracted_items(subcontractors, items)[ITEM_DOLLAR_AMOUNT].isna().sum() == 1
+    
+
+
+def test_result_store(tmp_path, monkeypatch):
+    filepath = (TEST_DATA / 'doc_3073.txt').resolve()
+    positions = split_contract_positions(map_file(filepath), '3073')
+    records = [ContractRecord('t1_' + key, 1, str(filepath), start, end, True) for key, (start, end) in positions.items()]
+    monkeypatch.chdir(tmp_path)
+    experiments = [Experiment(records, store=tmp_path / 'results.sqlite', chunk_size=5) for _ in range(2)]
+    for experiment in experiments:
+        experiment.run()
+    
+    store = ResultStore(tmp_path / 'results.sqlite')
+    runs = store.runs()
+    assert runs['run_id'].tolist() == [1, 2] and runs['finished'].notna().all()
+    for name, rows in (('Info', experiments[0].info), ('Bids', experiments[0].bids), ('Items', experiments[0].items)):
+        assert store.query(f'SELECT COUNT(*) AS n FROM {name} WHERE run_id = 2')['n'][0] == len(rows)
+    bid = experiments[0].bids[0]
+    bids = store.lookup('Bids', BIDDER_ID, bid[BIDDER_ID], run_id=1)
+    assert len(bids) == sum(x[BIDDER_ID] == bid[BIDDER_ID] for x in experiments[0].bids)
+    assert bid[IDENTIFIER] in bids[IDENTIFIER].tolist()
+    indexes = store.query("SELECT name FROM sqlite_master WHERE type = 'index' AND tbl_name = 'Bids'")['name'].tolist()
+    assert f'ix_Bids_{BIDDER_ID}' in indexes and 'ix_Bids_CSLB_Number' in indexes
+    store.close()
+    
+
+
+def test_excel_export(tmp_path):
+    items = pd.DataFrame({IDENTIFIER: ['1'] * 5, ITEM_NUMBER: range(5), ITEM_DOLLAR_AMOUNT: ['1.00', np.nan, '3.00', '4.00', '5.00']})
+    info = pd.DataFrame({IDENTIFIER: ['1'], CONTRACT_NUMBER: ['01-1234']})
+    path = tmp_path / 'results.xlsx'
+    sheets = write_excel(path, {'Info': [info], 'Items': [items[:3], items[3:]], 'Errors': []}, max_rows=3)
+    assert sheets == {'Info': ['Info'], 'Items': ['Items_1', 'Items_2', 'Items_3']}
+    
+    excel = pd.read_excel(path, sheet_name=None, dtype=str)
+    assert list(excel) == ['Info', 'Items_1', 'Items_2', 'Items_3']
+    assert all(len(excel[f'Items_{i}']) <= 2 for i in (1, 2, 3))
+    pd.testing.assert_frame_equal(pd.concat([excel[f'Items_{i}'] for i in (1, 2, 3)], ignore_index=True), items.astype(str).replace('nan', np.nan))
+    
+    info.to_csv(tmp_path / 'Info.csv', index=False)
+    csv_to_excel(tmp_path)
+    assert pd.read_excel(path, sheet_name=None).keys() == {'Info'}
+    
+    # CSV values are not inferred: leading zeros and trailing decimal zeros stay, empty fields are empty cells
+    pd.DataFrame({ITEM_CODE: ['074016', '1'], BID_TOTAL: ['16.40', ''], BIDDER_ID: ['02', '10']}).to_csv(tmp_path / 'Items.csv', index=False)
+    csv_to_excel(tmp_path, chunk_size=1)
+    sheet = load_workbook(path)['Items']
+    assert [[cell.value for cell in row] for row in sheet.iter_rows()] == [[ITEM_CODE, BID_TOTAL, BIDDER_ID], ['074016', '16.40', '02'], ['1', None, '10']]
+    
+
+
+def test_stream_excel_matches_memory(tmp_path, monkeypatch):
+    filepath = (TEST_DATA / 'doc_3073.txt').resolve()
+    positions = split_contract_positions(map_file(filepath), '3073')
+    records = [ContractRecord('t1_' + key, 1, str(filepath), start, end, True) for key, (start, end) in positions.items()]
+    
+    def run(folder, **kwargs):
+        (tmp_path / folder).mkdir()
+        monkeypatch.chdir(tmp_path / folder)
+        experiment = Experiment(records, **kwargs)
+        experiment.run()
+        workbook = load_workbook(experiment.results_path / 'results.xlsx', read_only=True)
+        return {sheet.title: [list(row) for row in sheet.iter_rows(values_only=True)] for sheet in workbook}
+    
+    memory, stream = run('memory'), run('stream', stream=True, chunk_size=2)
+    assert stream == memory
+    item_codes = [row[memory['Items'][0].index(ITEM_CODE)] for row in memory['Items'][1:]]
+    assert '074016' in item_codes
+
+
+def test_parallel_sort_contracts(tmp_path, monkeypatch, capsys):
+    # same files, contract types and messages with a pool of workers, duplicated identifiers included
+    generate_corpus(30, tmp_path / 'raw_data', seed=1, doc_share=0.5, contracts_per_doc=(2, 4))
+    for folder in ('lineprinter', 'table'):
+        for filepath in sorted((tmp_path / 'raw_data' / folder).glob('*.txt'))[:3]:
+            shutil.copy(filepath, filepath.with_name('ZZ-' + filepath.name.split('-', 1)[1]))
+    doc = sorted((tmp_path / 'raw_data' / 'doc').glob('*.txt'))[0]
+    shutil.copy(doc, doc.with_name('ZZ-' + doc.name.split('-', 1)[1]))
+    capsys.readouterr()
+    
+    outputs = []
+    for workers in (1, 2):
+        monkeypatch.chdir(tmp_path)
+        sort_contracts(workers=workers)
+        messages = [line for line in capsys.readouterr().out.splitlines() if 'identifier' in line]
+        sorted_files = {x.name: x.read_bytes() for x in (tmp_path / 'sorted_data').iterdir()}
+        contract_types = (tmp_path / 'results' / 'contract_types.csv').read_text()
+        outputs.append((messages, sorted_files, contract_types))
+        shutil.rmtree(tmp_path / 'sorted_data')
+    assert any('Duplicated' in line for line in outputs[0][0])
+    assert outputs[0] == outputs[1]
+    
+
+
+def test_classify_file(tmp_path, monkeypatch):
+    import experiment
+    filepath = tmp_path / 'contract.txt'
+    # reading stops at the second contract number of a multi-contract document
+    filepath.write_bytes((TEST_DATA / 'doc_3073.txt').read_bytes())
+    matches, bytes_read = classify_file(filepath)
+    assert matches == 2 and bytes_read < filepath.stat().st_size
+    
+    # chunks that end in a contract number, the number takes the CONTRACT that follows it, same count as re.findall
+    monkeypatch.setattr(experiment, 'CLASSIFY_PREFIX', 4)
+    monkeypatch.setattr(experiment, 'CLASSIFY_CHUNK_SIZE', 3)
+    for text in ('CONTRACT NUMBER 01-AB', 'x CONTRACT NUMBER\r\n 01-ABCONTRACT NUMBER 02', 'CONTRACT NUMBER 01 CONTRACT NUMBER\n02', 'CONTRACT NUMBER\n'):
+        filepath.write_bytes(text.encode('ISO-8859-1'))
+        expected = min(2, len(re.findall(CONTRACT_NUMBER_REGEX, read_file(filepath))))
+        matches, bytes_read = classify_file(filepath)
+        assert matches == expected
+        # files with less than two have to be read to the end
+        assert matches == 2 or bytes_read == len(text)
+    
+
+
+def test_extraction_service(tmp_path):
+    file_contents = read_file(TEST_DATA / 'doc_3073.txt')
+    text = split_contract(file_contents, '3073')['3073_01']
+    _, expected, _ = process_contract(Path('t1_3073_01.txt'), contents=text)
+    
+    service = ExtractionService(workers=2)
+    unix_path = str(tmp_path / 'service.sock')
+    loop = asyncio.new_event_loop()
+    task = loop.create_task(service.serve(unix_path=unix_path))
+    
+    def run():
+        try:
+            loop.run_until_complete(task)
+        except asyncio.CancelledError:
+            pass
+    
+    thread = threading.Thread(target=run)
+    thread.start()
+    try:
+        for _ in range(300):
+            if Path(unix_path).exists():
+                break
+            time.sleep(0.1)
+        result = extract_remote('t1_3073_01', text=text, unix_path=unix_path)
+        assert len(result['Bids']) == len(expected['Bids']) > 0
+        assert result['Items'] == [dict(row) for row in expected['Items']]
+        # concurrent requests in one call, a missing contract is an error row
+        results = extract_remote(requests=[{'identifier': 't1_3073_01', 'text': text}, {'identifier': 't1_missing'}], unix_path=unix_path)
+        assert results[0] == result
+        assert results[1]['Errors'][0][IDENTIFIER] == 't1_missing'
+        # a batch is split over the workers
+        assert extract_remote(requests=[{'identifier': 't1_3073_01', 'text': text}] * 5, unix_path=unix_path) == [result] * 5
+        # identifiers are file names in sorted_data, not paths
+        for identifier in ('../t1_3073_01', 't1_a/b', 't1_a\\b'):
+            with pytest.raises(RuntimeError, match='400'):
+                extract_remote(identifier, unix_path=unix_path)
+    finally:
+        loop.call_soon_threadsafe(task.cancel)
+        thread.join()
+        loop.close()
+    
+
+
+def test_keyword_search():
+    # the first occurrence of a keyword does not always match, i.e. the estimate is on a later line
+    text = "ENGINEERS EST    N/A\n ENGINEERS EST  1,234.56\n12\n   CONTRACT ITEMS  7 CONTRACT ITEMS\n"
+    pattern = re.compile(r"ENGINEERS EST\s+([\d,]+\.\d{2})")
+    assert search_keyword(text, 'ENGINEERS EST', pattern).group(1) == pattern.search(text).group(1) == '1,234.56'
+    assert search_keyword(text, 'AMOUNT OVER', pattern) is None
+    assert search_number_before(text, 'CONTRACT ITEMS') == re.search(r"(\d+)\s+CONTRACT ITEMS", text).group(1) == '12'
+    assert search_number_before('CONTRACT ITEMS 12', 'CONTRACT ITEMS') == ''
+    
+    # (.+) is greedy, two "Number of Items:" on one line give everything up to the second one
+    text = "A Number of Items: x Number of Items: 12\n  Second line\nNumber of Items: 3\n"
+    expected = re.search(r"(.+)Number of Items:\s+\d+\n\s*(.*)\n", text).groups()
+    assert Info2._search_description(text) == expected == ('A Number of Items: x ', 'Second line')
+    assert Info2._search_description("Number of Items: 12\n\n") == ""
+    
+    
+def test_line_index():
+    text = "first\n   \n\n  second\n\t\nthird\n \n"
+    line_index = LineIndex(text)
+    assert line_index.lines == text.split('\n')
+    assert list(line_index.blank) == [0, 1, 1, 0, 1, 0, 1, 1]
+    # the next line that is not blank, the number of lines if there is none
+    assert [line_index.next_line(i) for i in range(-1, 9)] == [0, 3, 3, 3, 5, 5, 8, 8, 8, 9]
     
     
 # TODO # extra tests
@@ -0,0 +1,217 @@
+import argparse
+import csv
+import os
+from collections import defaultdict
+from pathlib import Path
+from typing import Dict, Iterable, List
+
+import pandas as pd
+
+from constants import *
+from rows import columns_of
+
+
+TABLE_NAMES = ('Info', 'Bids', 'Subcontractors', 'Items', 'Errors')
+
+# rows of an Excel sheet, including the header
+EXCEL_MAX_ROWS = 1048576
+
+# typed columns for the columnar (parquet) output, everything else is a string
+MONEY_COLUMNS = [BID_TOTAL, ENGINEERS_EST, ITEM_DOLLAR_AMOUNT, AMOUNT_OVER, AMOUNT_UNDER, AMOUNT_OVER_UNDER]  # integer cents
+DATE_COLUMNS = [BID_OPENING_DATE, CONTRACT_DATE]
+INTEGER_COLUMNS = [NUMBER_OF_BIDDERS, CONTRACT_ITEMS, TOTAL_NUMBER_OF_WORKING_DAYS, POSTPONED_CONTRACT, 
+                   BID_RANK, A_PLUS_B_INDICATOR, HAS_THIRD_ROW, WRONG_INDENTATION, ITEM_NUMBER]
+FLOAT_COLUMNS = [PERCENT_OVER_EST, PERCENT_UNDER_EST, PERCENT_OVER_UNDER_EST]
+
+
+class StreamingWriter:
+    """
+    Writes rows to <results_path>/<name>.csv in chunks of chunk_size rows as contracts finish, so memory does not grow with the number of contracts.
+
+    Rows don't all have the same columns (i.e. only some subcontractors have ITEM_NUMBERS), and a CSV header can't be changed once written,
+    so chunks are first appended to <name>.csv.part and the final CSV, with a header for all the columns seen, is assembled on close (again line by line).
+    Column order is the order of first appearance, same as pd.DataFrame(rows) (see rows.columns_of).
+    """
+
+    def __init__(self, results_path: Path, chunk_size: int = 10000):
+        self.results_path = Path(results_path)
+        self.chunk_size = chunk_size
+        self.columns: Dict[str, dict] = defaultdict(dict)  # name: ordered columns (dict keys, values are not used)
+        self.buffers: Dict[str, List[dict]] = defaultdict(list)
+        self.counts: Dict[str, int] = defaultdict(int)
+
+    def _part_path(self, name: str) -> Path:
+        return self.results_path / f'{name}.csv.part'
+
+    def write(self, name: str, rows: List[dict]):
+        buffer = self.buffers[name]
+        buffer.extend(rows)
+        if len(buffer) >= self.chunk_size:
+            self.flush(name)
+
+    def flush(self, name: str):
+        rows = self.buffers[name]
+        if not rows:
+            return
+        columns = self.columns[name]
+        for column in columns_of(rows):
+            columns.setdefault(column)
+
+        with open(self._part_path(name), 'a', newline='', encoding='utf-8') as file:
+            writer = csv.writer(file, lineterminator=os.linesep)
+            # .get so that defaultdict rows don't grow
+            writer.writerows([row.get(column) for column in columns] for row in rows)
+
+        self.counts[name] += len(rows)
+        rows.clear()
+
+    def close(self) -> List[Path]:
+        """
+        Flushes what is left and writes the final CSV files, returns their paths. Empty tables are not written.
+        """
+        paths = []
+        for name in list(self.buffers):
+            self.flush(name)
+
+        for name in TABLE_NAMES + tuple(x for x in self.columns if x not in TABLE_NAMES):
+            if not self.counts[name]:
+                continue
+            print(f'Writing {name} ...')
+            columns = list(self.columns[name])
+            path = self.results_path / f'{name}.csv'
+            with open(self._part_path(name), newline='', encoding='utf-8') as part, open(path, 'w', newline='', encoding='utf-8') as file:
+                writer = csv.writer(file, lineterminator=os.linesep)
+                writer.writerow(columns)
+                for line in csv.reader(part):
+                    # rows written before a column was first seen are shorter
+                    writer.writerow(line + [''] * (len(columns) - len(line)))
+            self._part_path(name).unlink()
+            paths.append(path)
+        return paths
+
+
+def to_cents(s: pd.Series) -> pd.Series:
+    """
+    Converts amounts like "1,234,567.89" to integer cents (123456789), anything else becomes <NA>.
+    """
+    s = s.astype('string').str.strip()
+    cents = s.where(s.str.fullmatch(r'-?[\d,]+\.\d{2}')).str.replace(r'[,.]', '', regex=True)
+    return pd.to_numeric(cents, errors='coerce').astype('Int64')
+
+
+def to_date(s: pd.Series) -> pd.Series:
+    # type 1 contracts use 2 digit years (03/14/19), type 2 use 4 digit years (03/14/2019)
+    dates = pd.to_datetime(s, format='%m/%d/%y', errors='coerce')
+    return dates.fillna(pd.to_datetime(s, format='%m/%d/%Y', errors='coerce'))
+
+
+def to_typed(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Converts a results table read as strings into proper dtypes, see MONEY_COLUMNS, DATE_COLUMNS, INTEGER_COLUMNS and FLOAT_COLUMNS.
+    """
+    df = df.copy()
+    for column in df.columns:
+        if column in MONEY_COLUMNS:
+            df[column] = to_cents(df[column])
+        elif column in DATE_COLUMNS:
+            df[column] = to_date(df[column])
+        elif column in INTEGER_COLUMNS:
+            df[column] = pd.to_numeric(df[column], errors='coerce').astype('Int64')
+        elif column in FLOAT_COLUMNS:
+            df[column] = pd.to_numeric(df[column], errors='coerce').astype('Float64')
+        else:
+            df[column] = df[column].astype('string')
+    return df
+
+
+def csv_to_parquet(results_path: Path, chunk_size: int = 100000) -> List[Path]:
+    """
+    Converts the <name>.csv results in results_path to typed <name>.parquet files (see to_typed), chunk by chunk. Requires pyarrow.
+    
+    Read back with pd.read_parquet(results_path / 'Items.parquet').
+    """
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise ImportError('Parquet output requires pyarrow, install it with: pip install pyarrow')
+    
+    results_path = Path(results_path)
+    paths = []
+    for name in TABLE_NAMES:
+        csv_path = results_path / f'{name}.csv'
+        if not csv_path.exists():
+            continue
+        print(f'Writing {name}.parquet ...')
+        path = results_path / f'{name}.parquet'
+        writer = None
+        for chunk in pd.read_csv(csv_path, dtype=str, chunksize=chunk_size):
+            table = pa.Table.from_pandas(to_typed(chunk), preserve_index=False)
+            if writer is None:
+                writer = pq.ParquetWriter(path, table.schema)
+            writer.write_table(table.cast(writer.schema))
+        if writer:
+            writer.close()
+            paths.append(path)
+    return paths
+
+
+def write_excel(path: Path, tables: Dict[str, Iterable[pd.DataFrame]], max_rows: int = EXCEL_MAX_ROWS) -> Dict[str, List[str]]:
+    """
+    Writes tables (name: DataFrame chunks, i.e. from pd.read_csv(..., chunksize=...)) to the Excel file path, one sheet per table. 
+    Uses openpyxl in write-only mode, rows are streamed to the file so only a chunk is in memory at a time.
+    A table with more rows than fit on a sheet is split over <name>_1, <name>_2, ... sheets, each with the header. Empty tables are left out.
+    Returns a dict: table name: its sheet names.
+    """
+    from openpyxl import Workbook
+    
+    workbook = Workbook(write_only=True)
+    sheets = {}
+    for name, chunks in tables.items():
+        sheets[name] = []
+        sheet, rows = None, 0
+        for chunk in chunks:
+            header = list(chunk.columns)
+            # missing values are empty cells, same as DataFrame.to_excel
+            values = chunk.astype(object).where(chunk.notna(), None).itertuples(index=False, name=None)
+            for row in values:
+                if sheet is None or rows == max_rows:
+                    sheet = workbook.create_sheet(f'{name}_{len(sheets[name]) + 1}')
+                    sheet.append(header)
+                    sheets[name].append(sheet)
+                    rows = 1
+                sheet.append(row)
+                rows += 1
+        if len(sheets[name]) == 1:
+            sheets[name][0].title = name
+    workbook.save(path)
+    return {name: [sheet.title for sheet in x] for name, x in sheets.items() if x}
+
+
+def csv_to_excel(results_path: Path, chunk_size: int = 100000) -> Path:
+    """
+    Makes <results_path>/results.xlsx from the <name>.csv results already written there (see write_excel), 
+    can be run any time after an experiment (i.e. Experiment(excel=False) or python writers.py <results_path>).
+    """
+    results_path = Path(results_path)
+    # values are kept as written (no type inference, i.e. item code 074016 and bid 16.40 stay as they are, and every chunk gets the same types),
+    # only empty fields are missing, they become empty cells
+    tables = {name: pd.read_csv(results_path / f'{name}.csv', dtype=str, keep_default_na=False, na_values=[''], chunksize=chunk_size) 
+              for name in TABLE_NAMES if (results_path / f'{name}.csv').exists()}
+    path = results_path / 'results.xlsx'
+    print(f'Writing {path} ...')
+    for name, sheets in write_excel(path, tables).items():
+        if len(sheets) > 1:
+            print(f'{name} is split over {len(sheets)} sheets.')
+    return path
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Makes results.xlsx (and optionally parquet files) from the CSV results of an experiment.')
+    parser.add_argument('results_path', type=Path, help='results folder of an experiment')
+    parser.add_argument('--parquet', action='store_true', help='also write the typed parquet files')
+    args = parser.parse_args()
+    
+    csv_to_excel(args.results_path)
+    if args.parquet:
+        csv_to_parquet(args.results_path)